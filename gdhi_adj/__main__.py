@@ -0,0 +1,178 @@
+"""Run the GDHI adjustment pipeline from the command line.
+
+python -m gdhi_adj run --config config/config.toml
+python -m gdhi_adj preprocess --set start_year=2012
+python -m gdhi_adj adjust --set user_settings.imputation_method=interpolate
+python -m gdhi_adj validate-config
+python -m gdhi_adj bench run --scales 1x
+
+The pipeline and benchmark modules, and pandas with them, are only
+imported by the commands that use them, so --help and validate-config
+start quickly.
+"""
+
+import argparse
+import sys
+
+from gdhi_adj import __version__
+from gdhi_adj.utils.config import (
+    apply_overrides,
+    load_toml_config,
+    validate_config,
+)
+
+# Settings forced by the commands that run one part of the pipeline
+SECTION_OVERRIDES = {
+    "run": [],
+    "preprocess": [
+        "user_settings.preprocessing=true",
+        "user_settings.adjustment=false",
+    ],
+    "adjust": [
+        "user_settings.preprocessing=false",
+        "user_settings.adjustment=true",
+    ],
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Build the parser of the command line arguments.
+
+    Returns:
+        argparse.ArgumentParser: Parser with a subcommand per action.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m gdhi_adj",
+        description="Run the GDHI manual adjustment pipeline.",
+    )
+    parser.add_argument(
+        "--version", action="version", version=f"gdhi_adj {__version__}"
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    config_options = argparse.ArgumentParser(add_help=False)
+    config_options.add_argument(
+        "--config", default="config/config.toml", help="path to config.toml"
+    )
+    config_options.add_argument(
+        "--set",
+        dest="overrides",
+        metavar="KEY=VALUE",
+        action="append",
+        default=[],
+        help="override a setting, e.g. start_year=2012 or "
+        'global.platform="shared", user_settings if no section is given',
+    )
+
+    run_options = argparse.ArgumentParser(add_help=False)
+    run_options.add_argument(
+        "--resume",
+        metavar="RUN_ID",
+        help="resume a previous run from its checkpoints",
+    )
+    run_options.add_argument(
+        "--profile",
+        nargs="+",
+        choices=["cpu", "memory"],
+        help="profile each step with cProfile (cpu) and/or tracemalloc "
+        "(memory), reports are saved under logs/run_logs/profiles/RUN_ID",
+    )
+    run_options.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="run every step instead of reusing outputs of earlier runs",
+    )
+
+    for name, help_text in (
+        ("run", "run the steps turned on in the config"),
+        ("preprocess", "run preprocessing only"),
+        ("adjust", "run adjustment only"),
+    ):
+        commands.add_parser(
+            name, help=help_text, parents=[config_options, run_options]
+        )
+    commands.add_parser(
+        "validate-config",
+        help="check the config without running the pipeline",
+        parents=[config_options],
+    )
+    commands.add_parser(
+        "bench", help="run the benchmarks, see python -m gdhi_adj bench -h"
+    )
+
+    return parser
+
+
+def load_config(args: argparse.Namespace) -> tuple:
+    """
+    Load the config with overrides from the command line and check it.
+
+    Args:
+        args (argparse.Namespace): Parsed command line arguments.
+
+    Returns:
+        tuple: The config, None if it could not be loaded, and a list of
+        problems with it.
+    """
+    config = load_toml_config(args.config)
+    if config is None:
+        return None, [f"Could not load config from {args.config}."]
+    try:
+        apply_overrides(
+            config,
+            args.overrides + SECTION_OVERRIDES.get(args.command, []),
+        )
+    except ValueError as e:
+        return None, [str(e)]
+    return config, validate_config(config)
+
+
+def main(argv: list = None) -> int:
+    """
+    Parse command line arguments and run the command.
+
+    Args:
+        argv (list, optional): Command line arguments, sys.argv if not given.
+
+    Returns:
+        int: Exit code, 1 if the config is invalid or the run failed.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["bench"]:
+        # Passed on before parsing so that bench --help reaches the
+        # benchmark parser
+        from gdhi_adj.bench.__main__ import main as bench_main
+
+        return bench_main(argv[1:])
+
+    args = build_parser().parse_args(argv)
+
+    config, errors = load_config(args)
+    if errors:
+        print(
+            f"Config {args.config} is not valid:\n"
+            + "\n".join(f"  - {error}" for error in errors),
+            file=sys.stderr,
+        )
+        return 1
+    if args.command == "validate-config":
+        print(f"Config {args.config} is valid.")
+        return 0
+
+    from gdhi_adj.pipeline import run_pipeline
+
+    overrides = args.overrides + SECTION_OVERRIDES[args.command]
+    if args.no_cache:
+        overrides.append("user_settings.use_cache=false")
+    outcome = run_pipeline(
+        args.config,
+        resume_run_id=args.resume,
+        profile=args.profile,
+        overrides=overrides,
+    )
+    return 0 if outcome == "completed" else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,60 +2,80 @@
 
 import numpy as np
 import pandas as pd
-from pandas.api.types import is_list_like
 
+from gdhi_adj.adjustment.mask_adjustment import year_mask_contains
 
-def calc_midpoint_val(df: pd.DataFrame) -> pd.DataFrame:
+
+def neighbour_values(
+    df: pd.DataFrame, val_col: str, offset: int
+) -> np.ndarray:
     """
-    Calculate the midpoint value for a given LSOA code.
+    Look up the value of the same LSOA a given number of years away.
+
+    Rows are ordered by (lsoa_code, year) once, and neighbours are read by
+    shifting positions within that order. A neighbour only counts if it
+    belongs to the same LSOA and is exactly `offset` years away, otherwise
+    NaN is returned.
 
     Args:
-        df (pd.DataFrame): DataFrame containing data to calculate midpoint.
+        df (pd.DataFrame): DataFrame with lsoa_code, year and value columns.
+        val_col (str): The column to read neighbouring values from.
+        offset (int): Year offset of the neighbour, e.g. -1 or 1.
 
     Returns:
-        pd.DataFrame: DataFrame containing outlier midpoints.
+        np.ndarray: Neighbouring values aligned to the rows of df.
     """
-
-    # ensure year_to_adjust is list-like and normalize missing
-    def ensure_list(x):
-        # handle list-like first — avoids calling pd.isna on arrays/Series
-        if is_list_like(x) and not isinstance(x, (str, bytes)):
-            return list(x)
-        elif pd.isna(x):
-            return []
-        elif isinstance(x, (list, tuple, set)):
-            return list(x)
+    lsoa = df["lsoa_code"].to_numpy()
+    year = df["year"].to_numpy()
+    values = df[val_col].to_numpy(dtype="float64")
+
+    order = np.lexsort((year, lsoa))
+    lsoa, year, values = lsoa[order], year[order], values[order]
+
+    shift = abs(offset)
+    shifted = np.full(len(order), np.nan)
+    if len(order) > shift:
+        if offset < 0:
+            match = (lsoa[shift:] == lsoa[:-shift]) & (
+                year[shift:] + offset == year[:-shift]
+            )
+            shifted[shift:] = np.where(match, values[:-shift], np.nan)
         else:
-            return [x]
+            match = (lsoa[:-shift] == lsoa[shift:]) & (
+                year[:-shift] + offset == year[shift:]
+            )
+            shifted[:-shift] = np.where(match, values[shift:], np.nan)
 
-    df["year_to_adjust"] = df["year_to_adjust"].apply(ensure_list)
+    # Scatter the sorted neighbours back to the original row positions
+    result = np.empty(len(order))
+    result[order] = shifted
 
-    mask = df.apply(lambda r: (r["year"] in r["year_to_adjust"]), axis=1)
+    return result
 
-    midpoint_df = df.loc[mask].copy()
 
-    # prepare lookup table of values by (lsoa_code, year)
-    lookup = df[["lsoa_code", "year", "con_gdhi"]].copy()
+def calc_midpoint_val(df: pd.DataFrame, start_year: int) -> pd.DataFrame:
+    """
+    Calculate the midpoint value for a given LSOA code.
 
-    # join previous year value
-    midpoint_df["prev_year"] = midpoint_df["year"] - 1
-    midpoint_df = midpoint_df.merge(
-        lookup.rename(
-            columns={"year": "prev_year", "con_gdhi": "prev_con_gdhi"}
-        ),
-        on=["lsoa_code", "prev_year"],
-        how="left",
-    )
+    Args:
+        df (pd.DataFrame): DataFrame containing data to calculate midpoint,
+            with year_to_adjust as a year bitmask.
+        start_year (int): Year stored in bit 0 of the year bitmask.
+
+    Returns:
+        pd.DataFrame: DataFrame containing outlier midpoints.
+    """
+    mask = year_mask_contains(df["year_to_adjust"], df["year"], start_year)
 
-    # join next year value
+    prev_con_gdhi = neighbour_values(df, "con_gdhi", -1)
+    next_con_gdhi = neighbour_values(df, "con_gdhi", 1)
+
+    midpoint_df = df.loc[mask].reset_index(drop=True)
+
+    midpoint_df["prev_year"] = midpoint_df["year"] - 1
+    midpoint_df["prev_con_gdhi"] = prev_con_gdhi[mask]
     midpoint_df["next_year"] = midpoint_df["year"] + 1
-    midpoint_df = midpoint_df.merge(
-        lookup.rename(
-            columns={"year": "next_year", "con_gdhi": "next_con_gdhi"}
-        ),
-        on=["lsoa_code", "next_year"],
-        how="left",
-    )
+    midpoint_df["next_con_gdhi"] = next_con_gdhi[mask]
 
     # midpoint: average of prev and next (NaN if either missing)
     midpoint_df["midpoint"] = midpoint_df[
@@ -101,22 +121,185 @@ def calc_midpoint_adjustment(
     return adjustment_df
 
 
-def apportion_adjustment(df: pd.DataFrame) -> pd.DataFrame:
+class AdjustmentCheckError(ValueError):
+    """
+    Raised when LAD totals are not conserved by an adjustment.
+
+    Attributes:
+        failures (pd.DataFrame): One row per failing (lad_code, year) with
+            the sums before and after adjustment and their difference.
+    """
+
+    def __init__(self, failures: pd.DataFrame):
+        self.failures = failures
+        super().__init__(
+            "Adjustment check failed: LAD sums do not match after adjustment"
+            f" for {len(failures)} (lad_code, year) group(s):\n"
+            + failures.to_string(index=False)
+        )
+
+
+def check_lad_totals(
+    df: pd.DataFrame,
+    group_codes: np.ndarray,
+    tolerance: float = 0.000001,
+) -> pd.DataFrame:
+    """
+    Check that sums by (lad_code, year) match pre- and post-adjustment.
+
+    The check is computed on the group level only, so the size of the
+    DataFrame returned is the number of (lad_code, year) groups.
+
+    Args:
+        df (pd.DataFrame): DataFrame with con_gdhi and adjusted_con_gdhi.
+        group_codes (np.ndarray): (lad_code, year) group number of each row,
+            numbered in order of first appearance.
+        tolerance (float): Largest absolute difference allowed between sums.
+
+    Returns:
+        pd.DataFrame: LSOA count, sums before and after adjustment and their
+        difference for each (lad_code, year).
+
+    Raises:
+        AdjustmentCheckError: If any (lad_code, year) sums do not match.
+    """
+    first_rows = np.unique(group_codes, return_index=True)[1]
+
+    totals = df[["lad_code", "year"]].iloc[first_rows].reset_index(drop=True)
+    totals["lsoa_count"] = np.bincount(
+        group_codes, weights=df["lsoa_code"].notna()
+    ).astype("int64")
+    totals["unadjusted_sum"] = np.bincount(
+        group_codes,
+        weights=np.nan_to_num(df["con_gdhi"].to_numpy(dtype="float64")),
+    )
+    totals["adjusted_sum"] = np.bincount(
+        group_codes,
+        weights=np.nan_to_num(
+            df["adjusted_con_gdhi"].to_numpy(dtype="float64")
+        ),
+    )
+    totals["adjustment_check"] = (
+        totals["adjusted_sum"] - totals["unadjusted_sum"]
+    )
+
+    failures = totals[totals["adjustment_check"].abs() > tolerance]
+    if not failures.empty:
+        raise AdjustmentCheckError(failures.reset_index(drop=True))
+
+    return totals
+
+
+def _equal_basis(df: pd.DataFrame) -> np.ndarray:
+    """Give every LSOA in the group the same share."""
+    return df["lsoa_code"].notna().to_numpy(dtype="float64")
+
+
+def _gdhi_basis(df: pd.DataFrame) -> np.ndarray:
+    """Share in proportion to constrained GDHI after imputing outliers."""
+    return np.where(
+        df["midpoint"].notna(), df["midpoint"], df["con_gdhi"]
+    ).astype("float64")
+
+
+def _unconstrained_basis(df: pd.DataFrame) -> np.ndarray:
+    """Share in proportion to unconstrained GDHI."""
+    return df["uncon_gdhi"].to_numpy(dtype="float64")
+
+
+def _exclude_adjusted_basis(df: pd.DataFrame) -> np.ndarray:
+    """Share equally between LSOAs that did not have a value imputed."""
+    return (df["lsoa_code"].notna() & df["midpoint"].isna()).to_numpy(
+        dtype="float64"
+    )
+
+
+# Each strategy returns a basis per row, which is divided by its
+# (lad_code, year) total to give the share of the adjustment for that row.
+APPORTION_STRATEGIES = {
+    "equal": _equal_basis,
+    "gdhi": _gdhi_basis,
+    "unconstrained": _unconstrained_basis,
+    "exclude_adjusted": _exclude_adjusted_basis,
+}
+
+
+def calc_apportion_weights(
+    df: pd.DataFrame, group_codes: np.ndarray, strategy: str = "equal"
+) -> np.ndarray:
+    """
+    Calculate the share of the LAD adjustment given to each row.
+
+    Weights are the strategy basis divided by its (lad_code, year) total,
+    so they sum to one within each group. Groups where the basis totals
+    zero or is missing, e.g. every LSOA was adjusted under
+    "exclude_adjusted", fall back to equal shares.
+
+    Args:
+        df (pd.DataFrame): DataFrame containing data to adjust.
+        group_codes (np.ndarray): (lad_code, year) group number of each row.
+        strategy (str): Name of the strategy in APPORTION_STRATEGIES.
+
+    Returns:
+        np.ndarray: Apportionment weight for each row.
+    """
+    if strategy not in APPORTION_STRATEGIES:
+        raise ValueError(
+            f"Apportion strategy '{strategy}' is not one of "
+            f"{list(APPORTION_STRATEGIES)}."
+        )
+
+    basis = np.nan_to_num(APPORTION_STRATEGIES[strategy](df))
+    basis_total = np.bincount(group_codes, weights=basis)
+
+    equal = _equal_basis(df)
+    equal_total = np.bincount(group_codes, weights=equal)
+
+    use_basis = (basis_total != 0)[group_codes]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(
+            use_basis,
+            basis / basis_total[group_codes],
+            equal / equal_total[group_codes],
+        )
+
+
+def apportion_adjustment(
+    df: pd.DataFrame, strategy: str = "equal"
+) -> pd.DataFrame:
     """
     Apportion the adjustment values to all years for each LSOA.
 
     Args:
         df (pd.DataFrame): DataFrame containing data to adjust.
+        strategy (str): How the adjustment is shared between LSOAs, one of
+            APPORTION_STRATEGIES. Defaults to "equal".
 
     Returns:
         pd.DataFrame: DataFrame with outlier values imputed and adjustment
-        values apportioned accross all years within LSOA.
+        values apportioned accross all years within LSOA, sorted by
+        lad_code and year.
+
+    Raises:
+        AdjustmentCheckError: If LAD sums do not match after adjustment.
     """
-    adjusted_df = df.copy()
+    # New columns are added to a shallow copy, so the input is never
+    # modified and its data is not copied until the rows are sorted
+    adjusted_df = df.copy(deep=False)
+
+    # Rows missing a lad_code or year form their own groups rather than
+    # being left out
+    group_codes = (
+        adjusted_df.groupby(["lad_code", "year"], sort=False, dropna=False)
+        .ngroup()
+        .to_numpy()
+    )
+    lsoa_count = np.bincount(
+        group_codes, weights=adjusted_df["lsoa_code"].notna()
+    ).astype("int64")
+    adjusted_df["lsoa_count"] = lsoa_count[group_codes]
 
-    adjusted_df["lsoa_count"] = adjusted_df.groupby(["lad_code", "year"])[
-        "lsoa_code"
-    ].transform("count")
+    weights = calc_apportion_weights(adjusted_df, group_codes, strategy)
 
     adjusted_df["adjusted_con_gdhi"] = np.where(
         adjusted_df["midpoint"].notna(),
@@ -126,34 +309,193 @@ def apportion_adjustment(df: pd.DataFrame) -> pd.DataFrame:
 
     adjusted_df["adjusted_con_gdhi"] += np.where(
         adjusted_df["adjustment_val"].notna(),
-        adjusted_df["adjustment_val"] / adjusted_df["lsoa_count"],
+        adjusted_df["adjustment_val"] * weights,
         0,
     )
 
     # Adjustment check: sums by (lad_code, year) should match pre- and post-
     # adjustment
-    adjusted_df_check = adjusted_df.copy()
-    adjusted_df_check["unadjusted_sum"] = adjusted_df.groupby(
-        ["lad_code", "year"]
-    )["con_gdhi"].transform("sum")
+    check_lad_totals(adjusted_df, group_codes)
 
-    adjusted_df_check["adjusted_sum"] = adjusted_df_check.groupby(
-        ["lad_code", "year"]
-    )["adjusted_con_gdhi"].transform("sum")
+    return adjusted_df.sort_values(by=["lad_code", "year"]).reset_index(
+        drop=True
+    )
+
+
+EDGE_POLICIES = ("carry", "extrapolate", "skip")
+
+
+def _anchor_positions(
+    lsoa: np.ndarray, is_anchor: np.ndarray, forward: bool
+) -> np.ndarray:
+    """
+    Find the position of the nearest anchor row for every row.
+
+    Rows must already be ordered by (lsoa_code, year). The search looks
+    backwards in time unless forward is True, and never crosses into a
+    different LSOA.
+
+    Args:
+        lsoa (np.ndarray): Sorted LSOA codes.
+        is_anchor (np.ndarray): Boolean mask of rows that can be anchors.
+        forward (bool): If True, find the next anchor, else the previous.
+
+    Returns:
+        np.ndarray: Anchor positions, -1 where no anchor exists.
+    """
+    n = len(lsoa)
+    pos = np.arange(n)
+    if forward:
+        found = np.minimum.accumulate(np.where(is_anchor, pos, n)[::-1])[::-1]
+        found = np.where(found < n, found, -1)
+    else:
+        found = np.maximum.accumulate(np.where(is_anchor, pos, -1))
 
-    adjusted_df_check["adjustment_check"] = abs(
-        adjusted_df_check["unadjusted_sum"] - adjusted_df_check["adjusted_sum"]
+    same_lsoa = found >= 0
+    same_lsoa[same_lsoa] = lsoa[found[same_lsoa]] == lsoa[same_lsoa]
+
+    return np.where(same_lsoa, found, -1)
+
+
+def _second_anchor(
+    lsoa: np.ndarray, anchor_pos: np.ndarray, forward: bool
+) -> np.ndarray:
+    """
+    Find the anchor beyond the nearest anchor, in the same direction.
+
+    Args:
+        lsoa (np.ndarray): Sorted LSOA codes.
+        anchor_pos (np.ndarray): Nearest anchor positions from
+            _anchor_positions, with the same direction.
+        forward (bool): If True, step forward in time, else backwards.
+
+    Returns:
+        np.ndarray: Second anchor positions, -1 where no anchor exists.
+    """
+    n = len(lsoa)
+    step = 1 if forward else -1
+    beyond = anchor_pos + step
+    valid = (anchor_pos >= 0) & (beyond >= 0) & (beyond < n)
+
+    found = np.where(valid, anchor_pos[np.clip(beyond, 0, n - 1)], -1)
+    valid = found >= 0
+    valid[valid] = lsoa[found[valid]] == lsoa[valid]
+
+    return np.where(valid, found, -1)
+
+
+def _take_or_nan(values: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """Take values at positions as floats, returning NaN where -1."""
+    return np.where(
+        positions >= 0, values[np.maximum(positions, 0)].astype(float), np.nan
     )
 
-    adjusted_df_check = adjusted_df_check[
-        adjusted_df_check["adjustment_check"] > 0.000001
-    ]
 
-    if not adjusted_df_check.empty:
+def calc_interpolated_val(
+    df: pd.DataFrame, start_year: int, edge_policy: str = "carry"
+) -> pd.DataFrame:
+    """
+    Interpolate outlier years across runs of consecutive flagged years.
+
+    Flagged years are grouped into runs per LSOA using run-length encoding,
+    and each flagged year is linearly interpolated between the nearest
+    non-flagged years with a value (anchors) either side of its run. A run
+    of one year between two anchors gives the same value as the midpoint.
+
+    Runs at the start or end of a series only have one anchor, and are
+    handled by the edge policy:
+    - "carry": carry the single anchor value across the run.
+    - "extrapolate": extend the line through the two nearest anchors on the
+      available side, carrying the anchor value if there is only one.
+    - "skip": leave the run unadjusted.
+
+    The imputed value is stored in the midpoint column so that the result
+    can be passed to calc_midpoint_adjustment in place of calc_midpoint_val.
+
+    Args:
+        df (pd.DataFrame): DataFrame containing data to interpolate, with
+            year_to_adjust as a year bitmask.
+        start_year (int): Year stored in bit 0 of the year bitmask.
+        edge_policy (str): How to impute runs with only one anchor.
+
+    Returns:
+        pd.DataFrame: DataFrame containing interpolated outlier values.
+    """
+    if edge_policy not in EDGE_POLICIES:
         raise ValueError(
-            "Adjustment check failed: LAD sums do not match after adjustment."
+            f"Edge policy '{edge_policy}' is not one of {EDGE_POLICIES}."
         )
 
-    return adjusted_df.sort_values(by=["lad_code", "year"]).reset_index(
-        drop=True
-    )
+    mask = year_mask_contains(df["year_to_adjust"], df["year"], start_year)
+
+    order = np.lexsort((df["year"].to_numpy(), df["lsoa_code"].to_numpy()))
+    lsoa = df["lsoa_code"].to_numpy()[order]
+    year = df["year"].to_numpy()[order]
+    values = df["con_gdhi"].to_numpy(dtype="float64")[order]
+    flagged = mask[order]
+
+    # Run-length encode flagged years: a run starts at a flagged row whose
+    # predecessor is unflagged or belongs to another LSOA
+    new_lsoa = np.r_[True, lsoa[1:] != lsoa[:-1]]
+    run_start = flagged & (new_lsoa | ~np.r_[False, flagged[:-1]])
+    run_id = np.where(flagged, np.cumsum(run_start), 0)
+    run_length = np.bincount(run_id)[run_id]
+
+    is_anchor = ~flagged & ~np.isnan(values)
+    prev_pos = _anchor_positions(lsoa, is_anchor, forward=False)
+    next_pos = _anchor_positions(lsoa, is_anchor, forward=True)
+
+    prev_year = _take_or_nan(year, prev_pos)
+    prev_val = _take_or_nan(values, prev_pos)
+    next_year = _take_or_nan(year, next_pos)
+    next_val = _take_or_nan(values, next_pos)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        imputed = prev_val + (next_val - prev_val) * (year - prev_year) / (
+            next_year - prev_year
+        )
+
+        only_prev = (prev_pos >= 0) & (next_pos < 0)
+        only_next = (next_pos >= 0) & (prev_pos < 0)
+
+        if edge_policy == "carry":
+            imputed = np.where(only_prev, prev_val, imputed)
+            imputed = np.where(only_next, next_val, imputed)
+
+        elif edge_policy == "extrapolate":
+            # Second anchor on the same side as the only available anchor
+            prev2_pos = _second_anchor(lsoa, prev_pos, forward=False)
+            next2_pos = _second_anchor(lsoa, next_pos, forward=True)
+
+            prev2_year = _take_or_nan(year, prev2_pos)
+            next2_year = _take_or_nan(year, next2_pos)
+            trail = prev_val + (prev_val - _take_or_nan(values, prev2_pos)) * (
+                year - prev_year
+            ) / (prev_year - prev2_year)
+            lead = next_val + (_take_or_nan(values, next2_pos) - next_val) * (
+                year - next_year
+            ) / (next2_year - next_year)
+
+            imputed = np.where(
+                only_prev, np.where(prev2_pos >= 0, trail, prev_val), imputed
+            )
+            imputed = np.where(
+                only_next, np.where(next2_pos >= 0, lead, next_val), imputed
+            )
+
+    # Scatter the sorted results back to the original row positions
+    def _unsort(arr: np.ndarray) -> np.ndarray:
+        out = np.empty(len(order), dtype=arr.dtype)
+        out[order] = arr
+        return out[mask]
+
+    midpoint_df = df.loc[mask].reset_index(drop=True)
+
+    midpoint_df["run_length"] = _unsort(run_length)
+    midpoint_df["prev_anchor_year"] = _unsort(prev_year)
+    midpoint_df["prev_anchor_con_gdhi"] = _unsort(prev_val)
+    midpoint_df["next_anchor_year"] = _unsort(next_year)
+    midpoint_df["next_anchor_con_gdhi"] = _unsort(next_val)
+    midpoint_df["midpoint"] = _unsort(imputed)
+
+    return midpoint_df
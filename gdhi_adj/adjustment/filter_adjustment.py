@@ -66,21 +66,43 @@ def filter_component(
         pd.DataFrame: Filtered DataFrame containing only rows matching the
         specified component codes.
     """
-    if sas_code_filter not in df["sas_code"].unique():
+    # Each code is compared once, and the same masks are used for the check
+    # and the filter
+    sas_mask = df["sas_code"] == sas_code_filter
+    cord_mask = df["cord_code"] == cord_code_filter
+    credit_debit_mask = df["credit_debit"] == credit_debit_filter
+
+    if not sas_mask.any():
         raise ValueError(f"SAS code '{sas_code_filter}' not found in data.")
-    if cord_code_filter not in df["cord_code"].unique():
+    if not cord_mask.any():
         raise ValueError(f"CORD code '{cord_code_filter}' not found in data.")
-    if credit_debit_filter not in df["credit_debit"].unique():
+    if not credit_debit_mask.any():
         raise ValueError(
             f"Credit/Debit code '{credit_debit_filter}' not found in data."
         )
 
-    df = df[
-        (df["sas_code"] == sas_code_filter)
-        & (df["cord_code"] == cord_code_filter)
-        & (df["credit_debit"] == credit_debit_filter)
-    ]
+    df = df[sas_mask & cord_mask & credit_debit_mask]
 
     df = df.reset_index(drop=True)
 
     return df
+
+
+COMPONENT_COLS = ["sas_code", "cord_code", "credit_debit"]
+
+
+def partition_components(df: pd.DataFrame) -> dict:
+    """
+    Split DataFrame into one DataFrame per component in a single pass.
+
+    Args:
+        df (pd.DataFrame): Constrained DataFrame with component code data.
+
+    Returns:
+        dict: DataFrames keyed by (sas_code, cord_code, credit_debit), in
+        sorted key order.
+    """
+    return {
+        key: part.reset_index(drop=True)
+        for key, part in df.groupby(COMPONENT_COLS, sort=True, dropna=False)
+    }
@@ -1,11 +1,132 @@
 """Module for joining adjustment data in the gdhi_adj project."""
 
+import numpy as np
 import pandas as pd
 
 
+class JoinKeyError(ValueError):
+    """
+    Raised when join keys are duplicated or cannot be matched.
+
+    Attributes:
+        diagnostics (pd.DataFrame): The offending keys, with a row count for
+            duplicated keys.
+    """
+
+    def __init__(self, message: str, diagnostics: pd.DataFrame):
+        self.diagnostics = diagnostics
+        super().__init__(f"{message}\n" + diagnostics.to_string(index=False))
+
+
+def build_join_index(
+    df: pd.DataFrame, keys: list, name: str = "analyst"
+) -> pd.MultiIndex:
+    """
+    Build a unique index of join keys for joining by position.
+
+    The index can be built once and passed to several joins against the
+    same DataFrame.
+
+    Args:
+        df (pd.DataFrame): DataFrame to be joined on to other data.
+        keys (list): Columns that uniquely identify a row of df.
+        name (str): Description of df used in error messages.
+
+    Returns:
+        pd.MultiIndex: Join keys of df, in row order.
+
+    Raises:
+        JoinKeyError: If any keys appear more than once, listing each
+        duplicated key with its number of rows.
+    """
+    index = pd.MultiIndex.from_frame(df[keys])
+
+    if not index.is_unique:
+        duplicates = (
+            df.loc[index.duplicated(keep=False), keys]
+            .value_counts(sort=False)
+            .reset_index(name="row_count")
+        )
+        raise JoinKeyError(
+            f"Duplicate ({', '.join(keys)}) keys found in {name} data, "
+            "joining would increase the number of rows:",
+            duplicates,
+        )
+
+    return index
+
+
+def join_by_index(
+    df: pd.DataFrame,
+    df_right: pd.DataFrame,
+    right_index: pd.MultiIndex,
+    keys: list,
+) -> tuple[pd.DataFrame, np.ndarray]:
+    """
+    Left join df_right on to df by looking up positions in right_index.
+
+    Rows of df without a match get missing values, as with a left merge.
+
+    Args:
+        df (pd.DataFrame): Left DataFrame, all rows are kept in order.
+        df_right (pd.DataFrame): Right DataFrame.
+        right_index (pd.MultiIndex): Unique join keys of df_right, from
+            build_join_index.
+        keys (list): Columns of df to look up in right_index.
+
+    Returns:
+        tuple[pd.DataFrame, np.ndarray]: The joined DataFrame, and a boolean
+        array of which rows of df_right were matched.
+    """
+    positions = right_index.get_indexer(pd.MultiIndex.from_frame(df[keys]))
+    matched = positions >= 0
+
+    right_cols = [col for col in df_right.columns if col not in keys]
+    if df_right.empty:
+        # Nothing to take from, every row of df is unmatched
+        taken = pd.DataFrame(index=pd.RangeIndex(len(df)), columns=right_cols)
+    else:
+        taken = (
+            df_right[right_cols]
+            .take(np.where(matched, positions, 0))
+            .reset_index(drop=True)
+        )
+    if not matched.all():
+        taken = taken.where(np.broadcast_to(matched[:, None], taken.shape))
+
+    right_matched = np.zeros(len(df_right), dtype=bool)
+    right_matched[positions[matched]] = True
+
+    joined = pd.concat([df.reset_index(drop=True), taken], axis=1)
+
+    return joined, right_matched
+
+
+def find_unmatched_adjustments(
+    df_right: pd.DataFrame, right_matched: np.ndarray, keys: list
+) -> pd.DataFrame:
+    """
+    List rows marked for adjustment that did not match in a join.
+
+    Args:
+        df_right (pd.DataFrame): Right DataFrame of the join, with adjust.
+        right_matched (np.ndarray): Which rows of df_right were matched.
+        keys (list): Join key columns.
+
+    Returns:
+        pd.DataFrame: Join keys of the unmatched rows to adjust.
+    """
+    to_adjust = df_right["adjust"].astype("boolean").fillna(False).to_numpy()
+
+    return df_right.loc[to_adjust & ~right_matched, keys].reset_index(
+        drop=True
+    )
+
+
 def join_analyst_constrained_data(
     df_constrained: pd.DataFrame,
     df_analyst: pd.DataFrame,
+    analyst_index: pd.MultiIndex = None,
 ) -> pd.DataFrame:
     """
     Join analyst data to constrained data based on LSOA code and LAD code.
@@ -13,16 +134,33 @@ def join_analyst_constrained_data(
     Args:
         df_constrained (pd.DataFrame): DataFrame containing constrained data.
         df_analyst (pd.DataFrame): DataFrame containing analyst data.
+        analyst_index (pd.MultiIndex, optional): Index of the analyst data
+            from build_join_index, built here if not given.
 
     Returns:
         pd.DataFrame: Joined DataFrame with relevant columns.
+
+    Raises:
+        JoinKeyError: If analyst keys are duplicated, or analyst rows to
+        adjust are not found in the constrained data.
     """
-    df = df_constrained.merge(
-        df_analyst,
-        on=["lsoa_code", "lad_code"],
-        how="left",
+    keys = ["lsoa_code", "lad_code"]
+    if analyst_index is None:
+        analyst_index = build_join_index(df_analyst, keys)
+
+    df, analyst_matched = join_by_index(
+        df_constrained, df_analyst, analyst_index, keys
     )
 
+    unmatched = find_unmatched_adjustments(df_analyst, analyst_matched, keys)
+    if not unmatched.empty:
+        raise JoinKeyError(
+            "Number of rows to adjust between analyst and constrained data"
+            " do not match. Analyst rows to adjust not found in constrained"
+            " data:",
+            unmatched,
+        )
+
     # Obtain list of columns to rename
     exclude_cols = [
         "lsoa_code",
@@ -45,16 +183,13 @@ def join_analyst_constrained_data(
             " do not match."
         )
 
-    if df.shape[0] != df_constrained.shape[0]:
-        raise ValueError(
-            "Number of rows of constrained data after join has increased."
-        )
-
     return df
 
 
 def join_analyst_unconstrained_data(
-    df_unconstrained: pd.DataFrame, df_analyst: pd.DataFrame
+    df_unconstrained: pd.DataFrame,
+    df_analyst: pd.DataFrame,
+    analyst_index: pd.MultiIndex = None,
 ) -> pd.DataFrame:
     """
     Join analyst data to unconstrained data based on LSOA code and LAD code.
@@ -62,16 +197,33 @@ def join_analyst_unconstrained_data(
     Args:
         df_unconstrained (pd.DataFrame): DataFrame with unconstrained data.
         df_analyst (pd.DataFrame): DataFrame containing analyst data.
+        analyst_index (pd.MultiIndex, optional): Index of the analyst data
+            from build_join_index, built here if not given.
 
     Returns:
         pd.DataFrame: Joined DataFrame with relevant columns.
+
+    Raises:
+        JoinKeyError: If analyst keys are duplicated, or analyst rows to
+        adjust are not found in the unconstrained data.
     """
-    df = df_unconstrained.merge(
-        df_analyst,
-        on=["lsoa_code", "lsoa_name", "lad_code", "lad_name"],
-        how="left",
+    keys = ["lsoa_code", "lsoa_name", "lad_code", "lad_name"]
+    if analyst_index is None:
+        analyst_index = build_join_index(df_analyst, keys)
+
+    df, analyst_matched = join_by_index(
+        df_unconstrained, df_analyst, analyst_index, keys
     )
 
+    unmatched = find_unmatched_adjustments(df_analyst, analyst_matched, keys)
+    if not unmatched.empty:
+        raise JoinKeyError(
+            "Number of rows to adjust between analyst and unconstrained data"
+            " do not match. Analyst rows to adjust not found in"
+            " unconstrained data:",
+            unmatched,
+        )
+
     df["adjust"] = df["adjust"].where(pd.notnull(df["adjust"]), False)
 
     if df["adjust"].sum() != df_analyst["adjust"].sum():
@@ -80,9 +232,4 @@ def join_analyst_unconstrained_data(
             " do not match."
         )
 
-    if df.shape[0] != df_unconstrained.shape[0]:
-        raise ValueError(
-            "Number of rows of unconstrained data after join has increased."
-        )
-
     return df
@@ -0,0 +1,137 @@
+"""Module for year bitmasks of adjustment data in the gdhi_adj project.
+
+Years to adjust are stored as an integer bitmask per row, where bit n is set
+if start_year + n is to be adjusted. This keeps the adjustment frame free of
+object columns holding lists or tuples of years.
+"""
+
+import numpy as np
+import pandas as pd
+
+# Bits available in a signed int64, leaving the sign bit unused
+MAX_MASK_YEARS = 63
+
+
+def check_mask_range(start_year: int, end_year: int):
+    """
+    Check a year range fits in an int64 year bitmask.
+
+    Args:
+        start_year (int): First year of the range (inclusive).
+        end_year (int): Last year of the range (inclusive).
+
+    Raises:
+        ValueError: If the range covers more than MAX_MASK_YEARS years.
+    """
+    if end_year - start_year + 1 > MAX_MASK_YEARS:
+        raise ValueError(
+            f"Year range {start_year}-{end_year} is longer than "
+            f"{MAX_MASK_YEARS} years and cannot be stored as a year mask."
+        )
+
+
+def encode_year_mask(
+    rows: pd.Series, years: pd.Series, index: pd.Index, start_year: int
+) -> pd.Series:
+    """
+    Encode a long (row, year) table as one year bitmask per row.
+
+    Args:
+        rows (pd.Series): Row label for each year.
+        years (pd.Series): Year to set in the mask of that row.
+        index (pd.Index): Row labels of the returned Series.
+        start_year (int): Year stored in bit 0.
+
+    Returns:
+        pd.Series: int64 year bitmask for each row label in index, 0 for rows
+        without any years.
+    """
+    mask = np.zeros(len(index), dtype="int64")
+    positions = index.get_indexer(rows)
+    bits = np.left_shift(
+        1, years.to_numpy(dtype="int64") - start_year, dtype="int64"
+    )
+    np.bitwise_or.at(mask, positions, bits)
+
+    return pd.Series(mask, index=index, dtype="int64")
+
+
+def year_mask_contains(
+    mask: pd.Series, years: pd.Series, start_year: int
+) -> np.ndarray:
+    """
+    Test whether each row's year is set in that row's year bitmask.
+
+    Args:
+        mask (pd.Series): Year bitmask for each row.
+        years (pd.Series): Year to test for each row.
+        start_year (int): Year stored in bit 0.
+
+    Returns:
+        np.ndarray: Boolean array, True where the year is in the mask.
+    """
+    offset = years.to_numpy(dtype="int64") - start_year
+    in_range = (offset >= 0) & (offset < MAX_MASK_YEARS)
+    shifted = np.right_shift(
+        mask.to_numpy(dtype="int64"), np.where(in_range, offset, 0)
+    )
+
+    return in_range & (shifted & 1).astype(bool)
+
+
+def union_year_masks(*masks: pd.Series) -> pd.Series:
+    """
+    Combine year bitmasks so that a year is set if set in any of them.
+
+    Args:
+        *masks (pd.Series): Aligned year bitmasks.
+
+    Returns:
+        pd.Series: Union of the year bitmasks.
+    """
+    return pd.Series(
+        np.bitwise_or.reduce([m.to_numpy(dtype="int64") for m in masks]),
+        index=masks[0].index,
+        dtype="int64",
+    )
+
+
+def count_year_mask(mask: pd.Series) -> pd.Series:
+    """
+    Count the number of years set in each year bitmask.
+
+    Args:
+        mask (pd.Series): Year bitmask for each row.
+
+    Returns:
+        pd.Series: Number of years set in each mask.
+    """
+    values = mask.to_numpy(dtype="int64")
+    count = np.zeros(len(values), dtype="int64")
+    for bit in range(MAX_MASK_YEARS):
+        count += np.right_shift(values, bit) & 1
+
+    return pd.Series(count, index=mask.index)
+
+
+def decode_year_mask(mask: pd.Series, start_year: int) -> pd.Series:
+    """
+    Decode year bitmasks back to the analyst comma separated year format.
+
+    Args:
+        mask (pd.Series): Year bitmask for each row.
+        start_year (int): Year stored in bit 0.
+
+    Returns:
+        pd.Series: Comma separated years, e.g. "2015,2016", or an empty
+        string where no years are set.
+    """
+    values = mask.to_numpy(dtype="int64")
+    decoded = np.full(len(values), "", dtype=object)
+
+    n_bits = int(values.max()).bit_length() if len(values) else 0
+    for bit in range(n_bits):
+        is_set = (np.right_shift(values, bit) & 1).astype(bool)
+        decoded[is_set] = decoded[is_set] + f"{start_year + bit},"
+
+    return pd.Series(decoded, index=mask.index).str.rstrip(",")
@@ -17,7 +17,11 @@ def pivot_adjustment_long(df: pd.DataFrame) -> pd.DataFrame:
     uncon_cols = [col for col in df.columns if col[0].isdigit()]
     con_cols = [col for col in df.columns if col.startswith("CON_")]
 
-    df.rename(columns={"year": "year_to_adjust"}, inplace=True)
+    # Rows not joined to analyst data have no years to adjust
+    df = df.rename(columns={"year": "year_to_adjust"}, copy=False)
+    df["year_to_adjust"] = (
+        pd.to_numeric(df["year_to_adjust"]).fillna(0).astype("int64")
+    )
 
     df_uncon = df.melt(
         id_vars=[
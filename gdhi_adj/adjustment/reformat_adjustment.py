@@ -1,10 +1,13 @@
 """Module for joining adjustment data in the gdhi_adj project."""
 
-from typing import Any, List
-
 import numpy as np
 import pandas as pd
 
+from gdhi_adj.adjustment.mask_adjustment import (
+    check_mask_range,
+    encode_year_mask,
+)
+
 
 def reformat_adjust_col(df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -14,10 +17,14 @@ def reformat_adjust_col(df: pd.DataFrame) -> pd.DataFrame:
         df (pd.DataFrame): Input DataFrame to be reformatted.
 
     Returns:
-        pd.DataFrame: DataFrame with reformatted columns.
+        pd.DataFrame: DataFrame with reformatted columns, df is left
+        unchanged.
     """
-    conditions = [df["adjust"] == "TRUE"]
+    # read_csv parses TRUE and FALSE as booleans, which the schema then
+    # converts to "True" and "False"
+    conditions = [df["adjust"].astype(str).str.upper() == "TRUE"]
     descriptors = [True]
+    df = df.copy(deep=False)
     df["adjust"] = np.select(conditions, descriptors, default=False)
 
     df["adjust"] = df["adjust"].astype("bool")
@@ -25,93 +32,142 @@ def reformat_adjust_col(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def to_int_list(cell: Any) -> List[int]:
+class YearColumnError(ValueError):
     """
-    Convert a cell to a list of ints.
-    Accepts:
-      - a comma-separated string like "2010,2011, 2012"
-      - a list/tuple of strings or numbers
-      - NaN/None -> returns []
-    Raises ValueError if an item cannot be converted to int.
+    Raised when analyst year lists contain invalid years.
+
+    Attributes:
+        errors (pd.DataFrame): One row per problem found, with the row label,
+            the offending value and a description of the problem.
     """
-    parts: List[str] = []
-    # If already a list/tuple/ndarray (e.g. after split), iterate items
-    if isinstance(cell, (list, tuple, np.ndarray, pd.Series)):
-        for it in cell:
-            if pd.isna(it):
-                continue
-            s = str(it).strip()
-            if s == "" or s.lower() == "nan":
-                continue
-            parts.append(s)
-    else:
-        # treat as string otherwise
-        s = str(cell).strip()
-        if s == "" or s.lower() == "nan":
-            return []
-        # remove surrounding brackets optionally: "[2001,2002]" -> "2001,2002"
-        parts = [p.strip() for p in s.split(",") if p.strip() != ""]
-
-    out: List[int] = []
-    for token in parts:
-        try:
-            out.append(int(token))
-        except ValueError:
-            try:
-                out.append(int(float(token)))
-            except Exception:
-                raise ValueError(
-                    f"Cannot convert value {token!r} to int in cell {cell!r}"
-                )
-    return out
 
+    def __init__(self, errors: pd.DataFrame):
+        self.errors = errors
+        lines = [
+            f"row {row}"
+            + (f" ({lsoa})" if isinstance(lsoa, str) else "")
+            + f": {problem}"
+            for row, lsoa, problem in zip(
+                errors["row"], errors["lsoa_code"], errors["problem"]
+            )
+        ]
+        super().__init__(
+            f"Invalid years found in year column in {errors['row'].nunique()}"
+            " row(s):\n" + "\n".join(lines)
+        )
 
-def reformat_year_col(
-    df: pd.DataFrame, start_year: int, end_year: int
-) -> pd.DataFrame:
+
+def parse_year_lists(years: pd.Series) -> pd.DataFrame:
     """
-    Reformat data within the year column.
+    Parse comma separated year lists into a long (row, year) table.
+
+    Spaces are removed, cells are split on commas and exploded in one pass.
+    Empty and missing cells produce no rows, and tokens that cannot be read
+    as numbers are kept with a missing year so they can be reported.
 
     Args:
-        df (pd.DataFrame): Input DataFrame to be reformatted.
+        years (pd.Series): Year lists, e.g. "2010, 2011" or 2010.
 
     Returns:
-        pd.DataFrame: DataFrame with reformatted columns.
+        pd.DataFrame: Table with the row label, original token and year.
     """
+    tokens = (
+        years.astype("string")
+        .str.replace(" ", "", regex=False)
+        .str.split(",")
+        .explode()
+    )
+    tokens = tokens[
+        tokens.notna() & (tokens != "") & (tokens.str.lower() != "nan")
+    ]
+
+    return pd.DataFrame(
+        {
+            "row": tokens.index,
+            "token": tokens.to_numpy(dtype=object),
+            "year": pd.to_numeric(tokens, errors="coerce").to_numpy(),
+        }
+    )
 
-    # Normalize year cells safely (handle NaN and non-string values)
-    def _normalize_year_cell(x: Any) -> str:
-        if x is None or pd.isna(x):
-            return ""
-        return str(x).replace(" ", "")
 
-    df["year"] = df["year"].apply(_normalize_year_cell)
-    df["year"] = df["year"].apply(lambda x: x.split(",") if x != "" else [])
-    df["year"] = df["year"].apply(to_int_list)
+def find_year_errors(
+    year_table: pd.DataFrame, start_year: int, end_year: int
+) -> pd.DataFrame:
+    """
+    Find invalid, duplicate and out of range years in a parsed year table.
 
-    df["year"] = df["year"].apply(
-        lambda x: tuple(x) if isinstance(x, (list, tuple, np.ndarray)) else x
-    )
+    Args:
+        year_table (pd.DataFrame): Output of parse_year_lists.
+        start_year (int): First valid year (inclusive).
+        end_year (int): Last valid year (inclusive).
 
-    def _ensure_no_duplicates(seq):
-        if len(seq) != len(set(seq)):
-            raise ValueError(
-                "Duplicate years found in year column within LSOA."
-            )
+    Returns:
+        pd.DataFrame: One row per problem with the row label, token and
+        problem description, empty if all years are valid.
+    """
+    invalid = year_table["year"].isna()
+    duplicate = ~invalid & year_table.duplicated(["row", "year"], keep="first")
+    out_of_range = ~invalid & ~year_table["year"].between(start_year, end_year)
+
+    problems = [
+        year_table.loc[invalid].assign(
+            problem=lambda x: "Cannot convert value "
+            + x["token"].map(repr)
+            + " to int."
+        ),
+        year_table.loc[duplicate].assign(
+            problem="Duplicate years found in year column within LSOA."
+        ),
+        year_table.loc[out_of_range].assign(
+            problem=lambda x: "Year "
+            + x["token"]
+            + f" in year column is out of valid range {start_year}-{end_year}."
+        ),
+    ]
+
+    errors = pd.concat(problems).sort_index(kind="stable")
+
+    return errors[["row", "token", "problem"]].reset_index(drop=True)
+
+
+def reformat_year_col(
+    df: pd.DataFrame, start_year: int, end_year: int
+) -> pd.DataFrame:
+    """
+    Reformat data within the year column.
 
-    df["year"].apply(_ensure_no_duplicates)
+    Every row is checked before raising, so all invalid years in the
+    analyst file are reported together.
+
+    Args:
+        df (pd.DataFrame): Input DataFrame to be reformatted.
+        start_year (int): First valid year (inclusive).
+        end_year (int): Last valid year (inclusive).
 
-    # Check that all years specified for adjustment are within valid range
-    def _ensure_years_in_range(years, start_year, end_year):
-        for year in years:
-            if year < start_year or year > end_year:
-                raise ValueError(
-                    f"Year {year} in year column is out of valid range "
-                    f"{start_year}-{end_year}."
-                )
+    Returns:
+        pd.DataFrame: DataFrame with the year column as a year bitmask, see
+        gdhi_adj.adjustment.mask_adjustment.
 
-    df["year"].apply(
-        lambda years: _ensure_years_in_range(years, start_year, end_year)
-    )
+    Raises:
+        YearColumnError: If any year cannot be read, is duplicated within a
+        row or is outside of start_year to end_year.
+    """
+    check_mask_range(start_year, end_year)
+
+    year_table = parse_year_lists(df["year"])
+
+    errors = find_year_errors(year_table, start_year, end_year)
+    if not errors.empty:
+        if "lsoa_code" in df.columns:
+            errors["lsoa_code"] = df.loc[errors["row"], "lsoa_code"].to_numpy()
+        else:
+            errors["lsoa_code"] = None
+        raise YearColumnError(errors)
+
+    # Nullable so that the mask stays exact when missing after a left join
+    df = df.copy(deep=False)
+    df["year"] = encode_year_mask(
+        year_table["row"], year_table["year"], df.index, start_year
+    ).astype("Int64")
 
     return df
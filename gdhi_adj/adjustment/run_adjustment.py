@@ -1,23 +1,28 @@
 """Module for adjusting data in the gdhi_adj project."""
 
-import os
+from concurrent.futures import ProcessPoolExecutor
 
 import pandas as pd
 
 from gdhi_adj.adjustment.calc_adjustment import (
     apportion_adjustment,
+    calc_interpolated_val,
     calc_midpoint_adjustment,
     calc_midpoint_val,
 )
 from gdhi_adj.adjustment.filter_adjustment import (
+    COMPONENT_COLS,
     filter_adjust,
     filter_component,
     filter_year,
+    partition_components,
 )
 from gdhi_adj.adjustment.join_adjustment import (
+    build_join_index,
     join_analyst_constrained_data,
     join_analyst_unconstrained_data,
 )
+from gdhi_adj.adjustment.mask_adjustment import decode_year_mask
 from gdhi_adj.adjustment.pivot_adjustment import (
     pivot_adjustment_long,
     pivot_wide_final_dataframe,
@@ -26,181 +31,811 @@ from gdhi_adj.adjustment.reformat_adjustment import (
     reformat_adjust_col,
     reformat_year_col,
 )
-from gdhi_adj.utils.helpers import read_with_schema, write_with_schema
+from gdhi_adj.utils.checkpoint import Checkpointer
+from gdhi_adj.utils.helpers import (
+    get_user_dir,
+    read_with_schema,
+    write_with_schema,
+)
 from gdhi_adj.utils.logger import GDHI_adj_logger
+from gdhi_adj.utils.stage_recorder import StageRecorder
 
 GDHI_adj_LOGGER = GDHI_adj_logger(__name__)
 logger = GDHI_adj_LOGGER.logger
 
 
-def run_adjustment(config: dict) -> None:
+def impute_outlier_years(
+    df: pd.DataFrame,
+    imputation_method: str,
+    start_year: int,
+    edge_policy: str,
+) -> pd.DataFrame:
     """
-    Run the adjustment steps for the GDHI adjustment project.
+    Calculate the imputed value of each outlier year.
 
-    This function performs the following steps:
-    1. Load the configuration settings.
-    2. Load the input data.
-    3. Reformat adjust and year columns.
-    4. Filter of data for adjustment.
-    5. Join analyst output with constrained and unconstrained data.
-    6. Pivot the DataFrame to long format for manipulation.
-    7. Filter data by the specified year range.
-    8. Calculate the midpoints for outlier years.
-    9. Calculate adjustment values based on midpoints.
-    10. Apportion adjustment values to all years.
-    11. Save interim data with all calculated values.
-    12. Pivot data to wide format for PowerBI QA reiteration.
-    13. Pivot final DataFrame to wide format for exporting.
-    14. Save the final adjusted data.
+    Args:
+        df (pd.DataFrame): Long DataFrame filtered to the years to adjust.
+        imputation_method (str): "midpoint" or "interpolate".
+        start_year (int): First year to adjust (inclusive).
+        edge_policy (str): Edge policy for interpolated runs.
+
+    Returns:
+        pd.DataFrame: Imputed values of the outlier years.
+
+    Raises:
+        ValueError: If the imputation method is not recognised.
+    """
+    if imputation_method == "interpolate":
+        logger.info("Interpolating outlier years across consecutive runs")
+        return calc_interpolated_val(df, start_year, edge_policy)
+    elif imputation_method == "midpoint":
+        logger.info("Calculating outlier year midpoints")
+        return calc_midpoint_val(df, start_year)
+    else:
+        raise ValueError(
+            f"Imputation method '{imputation_method}' is not recognised."
+        )
+
+
+def adjust_component(
+    df_constrained: pd.DataFrame,
+    df_analyst: pd.DataFrame,
+    df_unconstrained: pd.DataFrame,
+    start_year: int,
+    end_year: int,
+    imputation_method: str = "midpoint",
+    edge_policy: str = "carry",
+    apportion_strategy: str = "equal",
+    analyst_index: pd.MultiIndex = None,
+    recorder: StageRecorder = None,
+    checkpoints: Checkpointer = None,
+    input_stages: tuple = (),
+) -> pd.DataFrame:
+    """
+    Adjust the constrained data of one component using analyst decisions.
 
+    This function performs steps 5 to 10 of run_adjustment: joining, pivoting
+    long, filtering years, imputing outlier years, calculating adjustment
+    values and apportioning them.
 
     Args:
-        config (dict): Configuration dictionary containing user settings and
-        pipeline settings.
+        df_constrained (pd.DataFrame): Constrained data of one component.
+        df_analyst (pd.DataFrame): Reformatted and filtered analyst data.
+        df_unconstrained (pd.DataFrame): Unconstrained data.
+        start_year (int): First year to adjust (inclusive).
+        end_year (int): Last year to adjust (inclusive).
+        imputation_method (str): "midpoint" or "interpolate".
+        edge_policy (str): Edge policy for interpolated runs.
+        apportion_strategy (str): Strategy for apportioning adjustments.
+        analyst_index (pd.MultiIndex, optional): Prebuilt analyst join index.
+        recorder (StageRecorder, optional): Recorder to measure each step
+            with, steps are not measured if not given.
+        checkpoints (Checkpointer, optional): Checkpointer to save and reuse
+            the output of each step, steps always run if not given.
+        input_stages (tuple): Names of the checkpointed stages that produced
+            the three input DataFrames.
+
     Returns:
-        None: The function does not return any value. It saves the processed
-        DataFrame to a CSV file.
+        pd.DataFrame: Long DataFrame with all calculated adjustment values.
     """
-    logger.info("Adjustment started")
+    recorder = recorder or StageRecorder(enabled=False)
+    checkpoints = checkpoints or Checkpointer(enabled=False)
 
-    logger.info("Loading configuration settings")
-    local_or_shared = config["user_settings"]["local_or_shared"]
-    filepath_dict = config[f"adjustment_{local_or_shared}_settings"]
-    schema_path = config["pipeline_settings"]["schema_path"]
+    logger.info("Joining analyst output and constrained DAP output")
+    with recorder.stage("join_constrained", df_constrained) as stage:
+        df = checkpoints.run(
+            "join_constrained",
+            join_analyst_constrained_data,
+            df_constrained,
+            df_analyst,
+            analyst_index,
+            depends_on=input_stages,
+        )
+        stage.output(df)
 
-    input_adj_file_path = (
-        "C:/Users/" + os.getlogin() + filepath_dict["input_adj_file_path"]
-    )
-    input_constrained_file_path = (
-        "C:/Users/"
-        + os.getlogin()
-        + filepath_dict["input_constrained_file_path"]
-    )
-    input_unconstrained_file_path = (
-        "C:/Users/"
-        + os.getlogin()
-        + filepath_dict["input_unconstrained_file_path"]
-    )
+    logger.info("Joining analyst output and unconstrained DAP output")
+    with recorder.stage("join_unconstrained", df_unconstrained) as stage:
+        df = checkpoints.run(
+            "join_unconstrained",
+            join_analyst_unconstrained_data,
+            df_unconstrained,
+            df,
+            depends_on=("join_constrained",),
+        )
+        stage.output(df)
 
-    # match = re.search(
-    #     r".*GDHI_Disclosure_(.*?)_[^_]+\.csv", input_unconstrained_file_path
-    # )
+    logger.info("Pivoting DataFrame long")
+    with recorder.stage("pivot_long", df) as stage:
+        df = checkpoints.run(
+            "pivot_long",
+            pivot_adjustment_long,
+            df,
+            depends_on=("join_unconstrained",),
+        )
+        stage.output(df)
 
-    # if match:
-    #     gdhi_suffix = match.group(1) + "_"
-    gdhi_suffix = config["user_settings"]["output_data_prefix"] + "_"
+    logger.info("Filtering data for specified years")
+    with recorder.stage("filter_year", df) as stage:
+        df = checkpoints.run(
+            "filter_year",
+            filter_year,
+            df,
+            start_year,
+            end_year,
+            depends_on=("pivot_long",),
+            settings=[start_year, end_year],
+        )
+        stage.output(df)
+
+    with recorder.stage("impute", df) as stage:
+        midpoint_df = checkpoints.run(
+            "impute",
+            impute_outlier_years,
+            df,
+            imputation_method,
+            start_year,
+            edge_policy,
+            depends_on=("filter_year",),
+            settings=[imputation_method, start_year, edge_policy],
+        )
+        stage.output(midpoint_df)
 
-    input_adj_schema_path = (
-        schema_path + config["pipeline_settings"]["input_adj_schema_name"]
-    )
-    input_constrained_schema_path = (
-        schema_path
-        + config["pipeline_settings"]["input_constrained_schema_name"]
-    )
-    input_unconstrained_schema_path = (
-        schema_path
-        + config["pipeline_settings"]["input_unconstrained_schema_name"]
-    )
+    logger.info("Calculating adjustment values based on midpoints")
+    with recorder.stage("calc_adjustment", df) as stage:
+        df = checkpoints.run(
+            "calc_adjustment",
+            calc_midpoint_adjustment,
+            df,
+            midpoint_df,
+            depends_on=("filter_year", "impute"),
+        )
+        stage.output(df)
 
-    start_year = config["user_settings"]["start_year"]
-    end_year = config["user_settings"]["end_year"]
+    logger.info("Apportioning adjustment values to all years")
+    with recorder.stage("apportion", df) as stage:
+        df = checkpoints.run(
+            "apportion",
+            apportion_adjustment,
+            df,
+            apportion_strategy,
+            depends_on=("calc_adjustment",),
+            settings=apportion_strategy,
+        )
+        stage.output(df)
 
-    sas_code_filter = config["user_settings"]["sas_code_filter"]
-    cord_code_filter = config["user_settings"]["cord_code_filter"]
-    credit_debit_filter = config["user_settings"]["credit_debit_filter"]
+    return df
 
-    output_dir = "C:/Users/" + os.getlogin() + filepath_dict["output_dir"]
-    output_schema_path = (
-        schema_path
-        + config["pipeline_settings"]["output_adjustment_schema_path"]
-    )
-    interim_filename = gdhi_suffix + filepath_dict.get(
-        "interim_filename", None
-    )
-    new_filename = gdhi_suffix + filepath_dict.get("output_filename", None)
 
-    logger.info("Reading in data with schemas")
-    df_powerbi_output = read_with_schema(
-        input_adj_file_path, input_adj_schema_path
-    )
-    df_constrained = read_with_schema(
-        input_constrained_file_path, input_constrained_schema_path
+def pivot_adjusted_wide(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Keep adjusted constrained values and pivot them wide for exporting.
+
+    Args:
+        df (pd.DataFrame): Long DataFrame from adjust_component.
+
+    Returns:
+        pd.DataFrame: Wide DataFrame of adjusted constrained GDHI.
+    """
+    df = df.drop(
+        columns=[
+            "con_gdhi",
+            "midpoint",
+            "midpoint_diff",
+            "adjustment_val",
+            "lsoa_count",
+        ]
+    ).rename(columns={"adjusted_con_gdhi": "con_gdhi"})
+
+    return pivot_wide_final_dataframe(df)
+
+
+# Inputs shared by every component of a batch, set once per worker process
+_BATCH_INPUTS: dict = {}
+
+
+def _init_batch_worker(batch_inputs: dict):
+    """Store the shared batch inputs in a worker process."""
+    _BATCH_INPUTS.update(batch_inputs)
+
+
+def _adjust_batch_component(
+    key: tuple, df_constrained: pd.DataFrame, batch_inputs: dict = None
+) -> tuple:
+    """Adjust one component, returning the error message if it fails."""
+    try:
+        df = adjust_component(
+            df_constrained, **(batch_inputs or _BATCH_INPUTS)
+        )
+        return key, df, None
+    except Exception as e:
+        return key, None, f"{type(e).__name__}: {e}"
+
+
+def summarise_component(
+    key: tuple, df: pd.DataFrame, error: str = None
+) -> dict:
+    """
+    Summarise the adjustment of one component for the batch QA summary.
+
+    Args:
+        key (tuple): (sas_code, cord_code, credit_debit) of the component.
+        df (pd.DataFrame): Long DataFrame from adjust_component, None if the
+            component failed.
+        error (str, optional): Error message if the component failed.
+
+    Returns:
+        dict: One row of the batch QA summary.
+    """
+    summary = dict(zip(COMPONENT_COLS, key))
+    if error is not None:
+        return {**summary, "status": f"failed: {error}"}
+
+    imputed = df["midpoint"].notna()
+    return {
+        **summary,
+        "status": "adjusted",
+        "lsoa_count": df["lsoa_code"].nunique(),
+        "lsoas_adjusted": df.loc[imputed, "lsoa_code"].nunique(),
+        "years_imputed": int(imputed.sum()),
+        "total_abs_adjustment": df["midpoint_diff"].abs().sum(),
+    }
+
+
+def adjust_components(
+    partitions: dict,
+    df_analyst: pd.DataFrame,
+    df_unconstrained: pd.DataFrame,
+    max_workers: int = 1,
+    **settings,
+) -> tuple[dict, pd.DataFrame]:
+    """
+    Adjust every constrained component, optionally on a process pool.
+
+    The analyst and unconstrained data are shared by all components. With a
+    process pool they are sent once to each worker rather than with every
+    component. A component that fails is recorded in the QA summary and does
+    not stop the others.
+
+    Args:
+        partitions (dict): Constrained data keyed by component, from
+            partition_components.
+        df_analyst (pd.DataFrame): Reformatted and filtered analyst data.
+        df_unconstrained (pd.DataFrame): Unconstrained data.
+        max_workers (int): Number of worker processes, 1 runs in process.
+        **settings: Keyword arguments passed on to adjust_component.
+
+    Returns:
+        tuple[dict, pd.DataFrame]: Long adjusted DataFrames keyed by
+        component, for components that succeeded, and the QA summary.
+    """
+    batch_inputs = {
+        "df_analyst": df_analyst,
+        "df_unconstrained": df_unconstrained,
+        "analyst_index": build_join_index(
+            df_analyst, ["lsoa_code", "lad_code"]
+        ),
+        **settings,
+    }
+
+    if max_workers == 1:
+        results = [
+            _adjust_batch_component(key, part, batch_inputs)
+            for key, part in partitions.items()
+        ]
+    else:
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_batch_worker,
+            initargs=(batch_inputs,),
+        ) as executor:
+            results = list(
+                executor.map(
+                    _adjust_batch_component,
+                    partitions.keys(),
+                    partitions.values(),
+                )
+            )
+
+    adjusted = {key: df for key, df, error in results if error is None}
+    qa_summary = pd.DataFrame(
+        [summarise_component(key, df, error) for key, df, error in results]
     )
-    df_unconstrained = read_with_schema(
-        input_unconstrained_file_path, input_unconstrained_schema_path
+
+    return adjusted, qa_summary
+
+
+def decode_interim(df: pd.DataFrame, start_year: int) -> pd.DataFrame:
+    """
+    Decode the years to adjust of a long adjusted DataFrame for QA.
+
+    Args:
+        df (pd.DataFrame): Long DataFrame from adjust_component.
+        start_year (int): Year stored in bit 0 of the year bitmask.
+
+    Returns:
+        pd.DataFrame: Copy of df with year_to_adjust as comma separated
+        years, as in the analyst file.
+    """
+    return df.assign(
+        year_to_adjust=decode_year_mask(df["year_to_adjust"], start_year)
     )
 
-    logger.info("Reformatting adjust and year columns.")
-    df_powerbi_output = reformat_adjust_col(df_powerbi_output)
 
-    df_powerbi_output = reformat_year_col(
-        df_powerbi_output, start_year, end_year
+def save_adjustment_outputs(
+    df: pd.DataFrame,
+    output_dir: str,
+    interim_filename: str,
+    new_filename: str,
+    output_schema_path: str,
+    start_year: int,
+    output_data: bool,
+):
+    """
+    Save the interim QA data and, if required, the final wide output.
+
+    Args:
+        df (pd.DataFrame): Long DataFrame from adjust_component.
+        output_dir (str): Directory to save outputs to.
+        interim_filename (str): Filename of the interim QA data.
+        new_filename (str): Filename of the final output.
+        output_schema_path (str): Path to the output schema.
+        start_year (int): Year stored in bit 0 of the year bitmask.
+        output_data (bool): Whether to save the final output.
+    """
+    logger.info(f"{output_dir + interim_filename}")
+    decode_interim(df, start_year).to_csv(
+        output_dir + interim_filename,
+        index=False,
     )
+    logger.info("Data saved successfully")
 
-    logger.info("Filtering for data that requires adjustment.")
-    df_powerbi_output = filter_adjust(df_powerbi_output)
-    df_constrained = filter_component(
-        df_constrained, sas_code_filter, cord_code_filter, credit_debit_filter
+    logger.info("Pivoting final DataFrame wide for exporting")
+    df = pivot_adjusted_wide(df)
+
+    # Save output file with new filename if specified
+    if output_data:
+        # Write DataFrame to CSV
+        write_with_schema(df, output_schema_path, output_dir, new_filename)
+
+
+def save_batch_outputs(
+    adjusted: dict,
+    qa_summary: pd.DataFrame,
+    start_year: int,
+    output_dir: str,
+    gdhi_suffix: str,
+    filepath_dict: dict,
+    output_schema_path: str,
+    output_data: bool,
+) -> None:
+    """
+    Save the outputs of every adjusted component and the batch QA summary.
+
+    Each component's outputs are prefixed with its
+    sas_code_cord_code_credit_debit, and the QA summary of all components is
+    saved alongside them.
+
+    Args:
+        adjusted (dict): Long adjusted DataFrames keyed by component, from
+            adjust_components.
+        qa_summary (pd.DataFrame): QA summary from adjust_components.
+        start_year (int): Year stored in bit 0 of the year bitmask.
+        output_dir (str): Directory to save outputs to.
+        gdhi_suffix (str): Prefix for all output filenames.
+        filepath_dict (dict): Adjustment file path settings from config.
+        output_schema_path (str): Path to the output schema.
+        output_data (bool): Whether to save the final outputs.
+
+    Raises:
+        ValueError: If any component failed to adjust, after the components
+        that succeeded have been saved.
+    """
+    for key, df in adjusted.items():
+        component_prefix = gdhi_suffix + "_".join(map(str, key)) + "_"
+        logger.info(f"Saving outputs for component {key}")
+        save_adjustment_outputs(
+            df,
+            output_dir,
+            component_prefix + filepath_dict["interim_filename"],
+            component_prefix + filepath_dict["output_filename"],
+            output_schema_path,
+            start_year,
+            output_data,
+        )
+
+    logger.info("Saving batch QA summary")
+    qa_summary.to_csv(
+        output_dir + gdhi_suffix + "manual_adj_adjustments_batch_summary.csv",
+        index=False,
     )
 
-    logger.info("Joining analyst output and constrained DAP output")
-    df = join_analyst_constrained_data(df_constrained, df_powerbi_output)
+    failed = qa_summary[qa_summary["status"] != "adjusted"]
+    if not failed.empty:
+        raise ValueError(
+            f"{len(failed)} of {len(qa_summary)} components failed to adjust:"
+            "\n" + failed.to_string(index=False)
+        )
 
-    logger.info("Joining analyst output and unconstrained DAP output")
-    df = join_analyst_unconstrained_data(df_unconstrained, df)
 
-    logger.info("Pivoting DataFrame long")
-    df = pivot_adjustment_long(df)
+def load_adjustment_settings(user_settings: dict) -> dict:
+    """
+    Resolve the adjustment settings from the user settings.
 
-    logger.info("Filtering data for specified years")
-    df = filter_year(df, start_year, end_year)
+    Args:
+        user_settings (dict): The user_settings section of the config.
 
-    logger.info("Calculating outlier year midpoints")
-    midpoint_df = calc_midpoint_val(df)
+    Returns:
+        dict: The component filters, the settings passed on to
+        adjust_component, and whether and on how many worker processes to
+        adjust every component.
+    """
+    return {
+        "component_filters": (
+            user_settings["sas_code_filter"],
+            user_settings["cord_code_filter"],
+            user_settings["credit_debit_filter"],
+        ),
+        "settings": {
+            "start_year": user_settings["start_year"],
+            "end_year": user_settings["end_year"],
+            "imputation_method": user_settings.get(
+                "imputation_method", "midpoint"
+            ),
+            "edge_policy": user_settings.get("edge_policy", "carry"),
+            "apportion_strategy": user_settings.get(
+                "apportion_strategy", "equal"
+            ),
+        },
+        "batch_components": user_settings.get("batch_components", False),
+        "batch_workers": user_settings.get("batch_workers", 1),
+    }
+
+
+def load_adjustment_config(config: dict) -> dict:
+    """
+    Resolve the adjustment file paths and settings from the config.
 
-    logger.info("Calculating adjustment values based on midpoints")
-    df = calc_midpoint_adjustment(df, midpoint_df)
+    Args:
+        config (dict): Configuration dictionary containing user settings and
+        pipeline settings.
 
-    logger.info("Apportioning adjustment values to all years")
-    df = apportion_adjustment(df)
+    Returns:
+        dict: Input, schema and output paths, and the settings from
+        load_adjustment_settings.
+    """
+    user_settings = config["user_settings"]
+    local_or_shared = user_settings["local_or_shared"]
+    filepath_dict = config[f"adjustment_{local_or_shared}_settings"]
+    schema_path = config["pipeline_settings"]["schema_path"]
+    user_dir = get_user_dir(config)
 
-    logger.info("Saving interim data")
+    # match = re.search(
+    #     r".*GDHI_Disclosure_(.*?)_[^_]+\.csv", input_unconstrained_file_path
+    # )
+
+    # if match:
+    #     gdhi_suffix = match.group(1) + "_"
+    gdhi_suffix = user_settings["output_data_prefix"] + "_"
+
+    return {
+        "filepath_dict": filepath_dict,
+        "input_adj_file_path": user_dir + filepath_dict["input_adj_file_path"],
+        "input_constrained_file_path": (
+            user_dir + filepath_dict["input_constrained_file_path"]
+        ),
+        "input_unconstrained_file_path": (
+            user_dir + filepath_dict["input_unconstrained_file_path"]
+        ),
+        "input_adj_schema_path": (
+            schema_path + config["pipeline_settings"]["input_adj_schema_name"]
+        ),
+        "input_constrained_schema_path": (
+            schema_path
+            + config["pipeline_settings"]["input_constrained_schema_name"]
+        ),
+        "input_unconstrained_schema_path": (
+            schema_path
+            + config["pipeline_settings"]["input_unconstrained_schema_name"]
+        ),
+        "gdhi_suffix": gdhi_suffix,
+        "output_dir": user_dir + filepath_dict["output_dir"],
+        "output_schema_path": (
+            schema_path
+            + config["pipeline_settings"]["output_adjustment_schema_path"]
+        ),
+        "interim_filename": gdhi_suffix + filepath_dict["interim_filename"],
+        "new_filename": gdhi_suffix + filepath_dict["output_filename"],
+        "output_data": user_settings["output_data"],
+        **load_adjustment_settings(user_settings),
+    }
+
+
+def prepare_analyst_data(
+    df: pd.DataFrame, start_year: int, end_year: int
+) -> pd.DataFrame:
+    """
+    Reformat the analyst data and keep only the rows to adjust.
+
+    Args:
+        df (pd.DataFrame): Analyst assessment data read with its schema.
+        start_year (int): First year to adjust (inclusive).
+        end_year (int): Last year to adjust (inclusive).
+
+    Returns:
+        pd.DataFrame: Analyst rows to adjust, with years as a year bitmask.
+    """
+    logger.info("Reformatting adjust and year columns.")
+    df = reformat_adjust_col(df)
+
+    df = reformat_year_col(df, start_year, end_year)
+
+    logger.info("Filtering for data that requires adjustment.")
+    return filter_adjust(df)
+
+
+def save_adjustment_config(adj_config: dict):
+    """
+    Save the component filters and settings used for a run as a text file.
+
+    Args:
+        adj_config (dict): Adjustment config from load_adjustment_config.
+    """
+    sas_code_filter, cord_code_filter, credit_debit_filter = adj_config[
+        "component_filters"
+    ]
+    settings = adj_config["settings"]
     qa_df = pd.DataFrame(
         {
             "config": [
                 f"sas_code_filter = {sas_code_filter}",
                 f"cord_code_filter = {cord_code_filter}",
                 f"credit_debit_filter = {credit_debit_filter}",
+                f"imputation_method = {settings['imputation_method']}",
+                f"edge_policy = {settings['edge_policy']}",
+                f"apportion_strategy = {settings['apportion_strategy']}",
             ],
         }
     )
     qa_df.to_csv(
-        output_dir + gdhi_suffix + "manual_adj_adjustments_config.txt",
+        adj_config["output_dir"]
+        + adj_config["gdhi_suffix"]
+        + "manual_adj_adjustments_config.txt",
         index=False,
         header=False,
     )
 
-    logger.info(f"{output_dir + interim_filename}")
-    df.to_csv(
-        output_dir + interim_filename,
-        index=False,
+
+def adjust_frames(
+    df_analyst: pd.DataFrame,
+    df_constrained: pd.DataFrame,
+    df_unconstrained: pd.DataFrame,
+    adj_settings: dict,
+    recorder: StageRecorder = None,
+    checkpoints: Checkpointer = None,
+    input_stages: tuple = (
+        "read_adj",
+        "read_constrained",
+        "read_unconstrained",
+    ),
+) -> dict:
+    """
+    Run steps 3 to 10 of run_adjustment on data read with its schemas.
+
+    The constrained data is filtered to the component given by the filters,
+    or every component is adjusted if batch_components is set. The input
+    DataFrames are not changed and no files are written.
+
+    Args:
+        df_analyst (pd.DataFrame): Analyst assessment data.
+        df_constrained (pd.DataFrame): Constrained data of all components.
+        df_unconstrained (pd.DataFrame): Unconstrained data.
+        adj_settings (dict): Settings from load_adjustment_settings.
+        recorder (StageRecorder, optional): Recorder to measure each step
+            with, steps are not measured if not given.
+        checkpoints (Checkpointer, optional): Checkpointer to save and reuse
+            the output of each step, steps always run if not given.
+        input_stages (tuple): Names of the checkpointed stages that produced
+            the three input DataFrames.
+
+    Returns:
+        dict: Long adjusted DataFrames keyed by component under
+        "components", for components that succeeded, and the QA summary of
+        every component under "qa_summary".
+
+    Raises:
+        ValueError: If the component given by the filters fails to adjust.
+        A failed component in a batch is only recorded in the QA summary.
+    """
+    recorder = recorder or StageRecorder(enabled=False)
+    checkpoints = checkpoints or Checkpointer(enabled=False)
+    settings = adj_settings["settings"]
+    start_year = settings["start_year"]
+    read_adj, read_constrained, read_unconstrained = input_stages
+
+    with recorder.stage("prepare_analyst_data", df_analyst) as stage:
+        df_analyst = checkpoints.run(
+            "prepare_analyst_data",
+            prepare_analyst_data,
+            df_analyst,
+            start_year,
+            settings["end_year"],
+            depends_on=(read_adj,),
+            settings=[start_year, settings["end_year"]],
+        )
+        stage.output(df_analyst)
+
+    if adj_settings["batch_components"]:
+        with recorder.stage("batch_adjustment", df_constrained):
+            logger.info("Partitioning constrained data by component")
+            partitions = partition_components(df_constrained)
+            logger.info(
+                f"Adjusting {len(partitions)} components with"
+                f" {adj_settings['batch_workers']} worker process(es)"
+            )
+            adjusted, qa_summary = adjust_components(
+                partitions,
+                df_analyst,
+                df_unconstrained,
+                max_workers=adj_settings["batch_workers"],
+                **settings,
+            )
+        return {"components": adjusted, "qa_summary": qa_summary}
+
+    component_filters = adj_settings["component_filters"]
+    with recorder.stage("filter_component", df_constrained) as stage:
+        df_constrained = checkpoints.run(
+            "filter_component",
+            filter_component,
+            df_constrained,
+            *component_filters,
+            depends_on=(read_constrained,),
+            settings=component_filters,
+        )
+        stage.output(df_constrained)
+
+    logger.info("Checking analyst output for duplicate LSOAs")
+    analyst_index = build_join_index(df_analyst, ["lsoa_code", "lad_code"])
+
+    df = adjust_component(
+        df_constrained,
+        df_analyst,
+        df_unconstrained,
+        analyst_index=analyst_index,
+        recorder=recorder,
+        checkpoints=checkpoints,
+        input_stages=(
+            "filter_component",
+            "prepare_analyst_data",
+            read_unconstrained,
+        ),
+        **settings,
     )
-    logger.info("Data saved successfully")
 
-    df = df.drop(
-        columns=[
-            "con_gdhi",
-            "midpoint",
-            "midpoint_diff",
-            "adjustment_val",
-            "lsoa_count",
-        ]
-    ).rename(columns={"adjusted_con_gdhi": "con_gdhi"})
+    return {
+        "components": {component_filters: df},
+        "qa_summary": pd.DataFrame(
+            [summarise_component(component_filters, df)]
+        ),
+    }
 
-    logger.info("Pivoting final DataFrame wide for exporting")
-    df = pivot_wide_final_dataframe(df)
 
-    # Save output file with new filename if specified
-    if config["user_settings"]["output_data"]:
-        # Write DataFrame to CSV
-        write_with_schema(df, output_schema_path, output_dir, new_filename)
+def run_adjustment(
+    config: dict,
+    recorder: StageRecorder = None,
+    checkpoints: Checkpointer = None,
+    frames: dict = None,
+) -> dict:
+    """
+    Run the adjustment steps for the GDHI adjustment project.
+
+    This function performs the following steps:
+    1. Load the configuration settings.
+    2. Load the input data.
+    3. Reformat adjust and year columns.
+    4. Filter of data for adjustment.
+    5. Join analyst output with constrained and unconstrained data.
+    6. Pivot the DataFrame to long format for manipulation.
+    7. Filter data by the specified year range.
+    8. Calculate the midpoints (or interpolated values) for outlier years.
+    9. Calculate adjustment values based on midpoints.
+    10. Apportion adjustment values to all years.
+    11. Save interim data with all calculated values.
+    12. Pivot data to wide format for PowerBI QA reiteration.
+    13. Pivot final DataFrame to wide format for exporting.
+    14. Save the final adjusted data.
+
+    If batch_components is set, steps 5 to 14 are repeated for every
+    component of the constrained data instead of the single component given
+    by the filters, and a QA summary of all components is saved. Steps 3 to
+    10 are in adjust_frames.
+
+    Args:
+        config (dict): Configuration dictionary containing user settings and
+        pipeline settings.
+        recorder (StageRecorder, optional): Recorder to measure each step
+        with, steps are not measured if not given.
+        checkpoints (Checkpointer, optional): Checkpointer to save and reuse
+        the output of each step, steps always run if not given.
+        frames (dict, optional): Inputs already read with their schemas,
+        keyed by "analyst", "constrained" or "unconstrained", used instead
+        of reading their files. With checkpoints, link the read_<input>
+        stage of each to the stage that read it, see Checkpointer.link.
+    Returns:
+        dict: The outputs of adjust_frames.
+    """
+    logger.info("Adjustment started")
+    recorder = recorder or StageRecorder(enabled=False)
+    checkpoints = checkpoints or Checkpointer(enabled=False)
+
+    logger.info("Loading configuration settings")
+    adj_config = load_adjustment_config(config)
+    start_year = adj_config["settings"]["start_year"]
+    output_dir = adj_config["output_dir"]
+    output_schema_path = adj_config["output_schema_path"]
+    output_data = adj_config["output_data"]
+
+    frames = frames or {}
+    inputs = {}
+    logger.info("Reading in data with schemas")
+    with recorder.stage("read_inputs") as stage:
+        for name, frame_name in [
+            ("adj", "analyst"),
+            ("constrained", "constrained"),
+            ("unconstrained", "unconstrained"),
+        ]:
+            if frame_name in frames:
+                logger.info(f"Using the {frame_name} data already in memory")
+                inputs[name] = frames[frame_name]
+                continue
+            file_path = adj_config[f"input_{name}_file_path"]
+            schema_path = adj_config[f"input_{name}_schema_path"]
+            inputs[name] = checkpoints.run(
+                f"read_{name}",
+                read_with_schema,
+                file_path,
+                schema_path,
+                files=[file_path, schema_path],
+            )
+            recorder.record_input(file_path)
+        stage.output(inputs["constrained"])
+
+    results = adjust_frames(
+        inputs["adj"],
+        inputs["constrained"],
+        inputs["unconstrained"],
+        adj_config,
+        recorder,
+        checkpoints,
+    )
+
+    if adj_config["batch_components"]:
+        with recorder.stage("save_outputs"):
+            save_batch_outputs(
+                results["components"],
+                results["qa_summary"],
+                start_year,
+                output_dir,
+                adj_config["gdhi_suffix"],
+                adj_config["filepath_dict"],
+                output_schema_path,
+                output_data,
+            )
+        return results
+
+    (df,) = results["components"].values()
+
+    logger.info("Saving interim data")
+    save_adjustment_config(adj_config)
+
+    with recorder.stage("save_outputs", df):
+        save_adjustment_outputs(
+            df,
+            output_dir,
+            adj_config["interim_filename"],
+            adj_config["new_filename"],
+            output_schema_path,
+            start_year,
+            output_data,
+        )
+
+    return results
@@ -0,0 +1,388 @@
+"""Module for repeated adjustment in one session in the gdhi_adj project.
+
+Analysts iterate on the PowerBI assessment file and re-run the adjustment
+after each edit. A session reads the constrained and unconstrained data once
+and keeps them in memory, so each re-run only reads the analyst file and
+repeats the adjustment steps for the LADs whose analyst rows changed.
+"""
+
+import hashlib
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from gdhi_adj.adjustment.filter_adjustment import filter_component
+from gdhi_adj.adjustment.join_adjustment import JoinKeyError, build_join_index
+from gdhi_adj.adjustment.run_adjustment import (
+    adjust_component,
+    load_adjustment_config,
+    pivot_adjusted_wide,
+    prepare_analyst_data,
+    save_adjustment_config,
+    save_adjustment_outputs,
+)
+from gdhi_adj.utils.helpers import read_with_schema
+from gdhi_adj.utils.logger import GDHI_adj_logger
+
+GDHI_adj_LOGGER = GDHI_adj_logger(__name__)
+logger = GDHI_adj_LOGGER.logger
+
+LSOA_KEYS = ["lsoa_code", "lsoa_name", "lad_code", "lad_name"]
+
+
+def diff_adjusted_output(
+    previous: pd.DataFrame, current: pd.DataFrame
+) -> pd.DataFrame:
+    """
+    List the LSOAs whose adjusted values differ between two wide outputs.
+
+    Args:
+        previous (pd.DataFrame): Wide output of the previous adjustment.
+        current (pd.DataFrame): Wide output of the current adjustment.
+
+    Returns:
+        pd.DataFrame: One row per changed LSOA with its geography columns,
+        the change ("changed", "added" or "removed"), the years whose value
+        changed, and the largest absolute change.
+    """
+    year_cols = [col for col in current.columns if col not in LSOA_KEYS]
+    merged = previous.merge(
+        current,
+        on=LSOA_KEYS,
+        how="outer",
+        suffixes=("_previous", "_current"),
+        indicator=True,
+    )
+
+    before = merged[[f"{col}_previous" for col in year_cols]].to_numpy(
+        dtype="float64"
+    )
+    after = merged[[f"{col}_current" for col in year_cols]].to_numpy(
+        dtype="float64"
+    )
+    differs = (before != after) & ~(np.isnan(before) & np.isnan(after))
+
+    merged["change"] = merged["_merge"].map(
+        {"both": "changed", "left_only": "removed", "right_only": "added"}
+    )
+    merged["changed_years"] = [
+        ",".join(str(col) for col in np.asarray(year_cols)[row])
+        for row in differs
+    ]
+    merged["max_abs_change"] = np.nanmax(
+        np.where(differs, np.abs(after - before), 0.0), axis=1, initial=0.0
+    )
+
+    changed = differs.any(axis=1) | (merged["_merge"] != "both").to_numpy()
+
+    return merged.loc[
+        changed, LSOA_KEYS + ["change", "changed_years", "max_abs_change"]
+    ].reset_index(drop=True)
+
+
+def hash_frame(df: pd.DataFrame) -> str:
+    """
+    Hash the column names and values of a DataFrame, ignoring its index.
+
+    Args:
+        df (pd.DataFrame): DataFrame to hash.
+
+    Returns:
+        str: Hex digest that changes if any column name or value changes.
+    """
+    digest = hashlib.sha1(repr(list(df.columns)).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy())
+
+    return digest.hexdigest()
+
+
+def partition_lads(df: pd.DataFrame) -> dict:
+    """
+    Split a DataFrame into one DataFrame per LAD.
+
+    Args:
+        df (pd.DataFrame): DataFrame with a lad_code column.
+
+    Returns:
+        dict: DataFrames keyed by lad_code, in lad_code order.
+    """
+    return {
+        lad_code: part.reset_index(drop=True)
+        for lad_code, part in df.groupby("lad_code", sort=True)
+    }
+
+
+class AdjustmentSession:
+    """
+    Constrained and unconstrained data held in memory for repeated
+    adjustment of one component.
+
+    Every step of the adjustment is scoped to a LAD, so the session holds
+    the inputs split by LAD and caches the adjusted result of each LAD. A
+    LAD is only adjusted again when its analyst rows change.
+
+    Attributes:
+        constrained_lads (dict): Constrained data of the component by LAD.
+        unconstrained_lads (dict): Unconstrained data by LAD.
+        settings (dict): Keyword arguments passed on to adjust_component.
+        lad_cache (dict): (key, long DataFrame, wide DataFrame) of the last
+            adjustment of each LAD, keyed by lad_code.
+        recomputed_lads (list): LADs adjusted by the last call to adjust.
+    """
+
+    def __init__(
+        self,
+        df_constrained: pd.DataFrame,
+        df_unconstrained: pd.DataFrame,
+        settings: dict,
+    ):
+        self.constrained_lads = partition_lads(df_constrained)
+        self.unconstrained_lads = partition_lads(df_unconstrained)
+        self.settings = settings
+        self.lad_cache = {}
+        self.recomputed_lads = []
+
+        # Inputs are fixed for the session, so each LAD's input slices are
+        # hashed once and combined with the hash of its analyst rows
+        self._empty_unconstrained = df_unconstrained.iloc[:0]
+        self._input_hashes = {
+            lad_code: (
+                hash_frame(constrained)
+                + hash_frame(
+                    self.unconstrained_lads.get(
+                        lad_code, self._empty_unconstrained
+                    )
+                )
+                + repr(sorted(settings.items()))
+            )
+            for lad_code, constrained in self.constrained_lads.items()
+        }
+
+    @classmethod
+    def from_config(cls, adj_config: dict) -> "AdjustmentSession":
+        """
+        Read the constrained and unconstrained data for a session.
+
+        Args:
+            adj_config (dict): Adjustment config from load_adjustment_config.
+
+        Returns:
+            AdjustmentSession: Session for the component given by the
+            component filters.
+        """
+        logger.info("Reading in constrained and unconstrained data")
+        df_constrained = read_with_schema(
+            adj_config["input_constrained_file_path"],
+            adj_config["input_constrained_schema_path"],
+        )
+        df_unconstrained = read_with_schema(
+            adj_config["input_unconstrained_file_path"],
+            adj_config["input_unconstrained_schema_path"],
+        )
+        df_constrained = filter_component(
+            df_constrained, *adj_config["component_filters"]
+        )
+
+        return cls(df_constrained, df_unconstrained, adj_config["settings"])
+
+    def _adjust_lad(self, lad_code: str, df_analyst: pd.DataFrame) -> tuple:
+        """Adjust one LAD, or return its cached result if unchanged."""
+        key = self._input_hashes[lad_code] + hash_frame(df_analyst)
+        cached = self.lad_cache.get(lad_code)
+        if cached is not None and cached[0] == key:
+            return cached
+
+        df = adjust_component(
+            self.constrained_lads[lad_code],
+            df_analyst,
+            self.unconstrained_lads.get(lad_code, self._empty_unconstrained),
+            **self.settings,
+        )
+        self.lad_cache[lad_code] = (key, df, pivot_adjusted_wide(df))
+        self.recomputed_lads.append(lad_code)
+
+        return self.lad_cache[lad_code]
+
+    @staticmethod
+    def _empty_output(results: dict) -> pd.DataFrame:
+        """Wide output columns with no rows."""
+        return next(iter(results.values()))[2].iloc[:0]
+
+    def adjust(
+        self, df_analyst: pd.DataFrame
+    ) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Adjust the session data with a new version of the analyst data.
+
+        Only LADs whose analyst rows changed since the previous adjustment
+        are adjusted again, the rest are taken from the cache.
+
+        Args:
+            df_analyst (pd.DataFrame): Analyst data read with its schema.
+
+        Returns:
+            tuple[pd.DataFrame, pd.DataFrame]: Long DataFrame as from
+            adjust_component, and the LSOAs whose adjusted values changed
+            since the previous adjustment (every LSOA on the first).
+
+        Raises:
+            JoinKeyError: If analyst keys are duplicated, or analyst rows to
+            adjust are in LADs that are not in the constrained data.
+        """
+        df_analyst = prepare_analyst_data(
+            df_analyst, self.settings["start_year"], self.settings["end_year"]
+        )
+
+        keys = ["lsoa_code", "lad_code"]
+        build_join_index(df_analyst, keys)
+        unknown = df_analyst[
+            ~df_analyst["lad_code"].isin(self.constrained_lads.keys())
+        ]
+        if not unknown.empty:
+            raise JoinKeyError(
+                "Number of rows to adjust between analyst and constrained"
+                " data do not match. Analyst rows to adjust not found in"
+                " constrained data:",
+                unknown[keys].reset_index(drop=True),
+            )
+
+        analyst_lads = partition_lads(df_analyst)
+        empty_analyst = df_analyst.iloc[:0]
+
+        previous = {
+            lad_code: cached[2] for lad_code, cached in self.lad_cache.items()
+        }
+        self.recomputed_lads = []
+        results = {
+            lad_code: self._adjust_lad(
+                lad_code, analyst_lads.get(lad_code, empty_analyst)
+            )
+            for lad_code in self.constrained_lads
+        }
+
+        df = pd.concat(
+            [cached[1] for cached in results.values()], ignore_index=True
+        )
+
+        # Only recomputed LADs can have changed, so only they are compared
+        empty_output = self._empty_output(results)
+        previous_output = [
+            previous.get(lad_code, empty_output)
+            for lad_code in self.recomputed_lads
+        ]
+        current_output = [
+            results[lad_code][2] for lad_code in self.recomputed_lads
+        ]
+        if self.recomputed_lads:
+            changes = diff_adjusted_output(
+                pd.concat(previous_output, ignore_index=True),
+                pd.concat(current_output, ignore_index=True),
+            )
+        else:
+            changes = diff_adjusted_output(empty_output, empty_output)
+
+        return df, changes
+
+
+def watch_adjustment(
+    config: dict, poll_interval: float = 1.0, max_runs: int = None
+):
+    """
+    Re-run the adjustment each time the analyst file is saved.
+
+    The constrained and unconstrained data are read once. The analyst file
+    is polled for changes, and after each save the adjustment outputs are
+    written along with a CSV of the LSOAs that changed. Errors in the
+    analyst file are logged and the watch continues. Files that cannot be
+    read or written for a moment, e.g. while an editor replaces the analyst
+    file or an output is open in Excel, are tried again on the next poll.
+    Outputs that could not be written are retried before the analyst file
+    is read again, so no adjustment's changes are lost.
+
+    Args:
+        config (dict): Configuration dictionary containing user settings and
+        pipeline settings.
+        poll_interval (float): Seconds between checks of the analyst file.
+        max_runs (int, optional): Stop after this many adjustments, watch
+            until interrupted if not given.
+    """
+    adj_config = load_adjustment_config(config)
+    session = AdjustmentSession.from_config(adj_config)
+    save_adjustment_config(adj_config)
+
+    analyst_path = adj_config["input_adj_file_path"]
+    changes_path = (
+        adj_config["output_dir"]
+        + adj_config["gdhi_suffix"]
+        + "manual_adj_adjustments_changes.csv"
+    )
+
+    logger.info(f"Watching {analyst_path} for changes, Ctrl+C to stop")
+    last_modified = None
+    # Outputs adjusted but not yet written, with their changes
+    unsaved = None
+    runs = 0
+    try:
+        while max_runs is None or runs < max_runs or unsaved is not None:
+            # The session has already moved on to the unsaved outputs, so
+            # they are written before the analyst file is read again, and
+            # each changes CSV is against the outputs last written
+            if unsaved is not None:
+                df, changes = unsaved
+                try:
+                    save_adjustment_outputs(
+                        df,
+                        adj_config["output_dir"],
+                        adj_config["interim_filename"],
+                        adj_config["new_filename"],
+                        adj_config["output_schema_path"],
+                        session.settings["start_year"],
+                        adj_config["output_data"],
+                    )
+                    changes.to_csv(changes_path, index=False)
+                except OSError as e:
+                    logger.error(f"Outputs could not be saved, retrying: {e}")
+                    time.sleep(poll_interval)
+                    continue
+                unsaved = None
+                logger.info(f"Outputs saved, {len(changes)} LSOA(s) changed")
+                if not changes.empty:
+                    logger.info("\n" + changes.to_string(index=False))
+                continue
+
+            try:
+                modified = os.path.getmtime(analyst_path)
+            except OSError as e:
+                logger.warning(f"Analyst file not found, retrying: {e}")
+                time.sleep(poll_interval)
+                continue
+            if modified == last_modified:
+                time.sleep(poll_interval)
+                continue
+
+            start_time = time.time()
+            # A file that is locked or only partly written is read again on
+            # the next poll rather than waiting for the next save
+            try:
+                df_analyst = read_with_schema(
+                    analyst_path, adj_config["input_adj_schema_path"]
+                )
+            except (OSError, pd.errors.EmptyDataError) as e:
+                logger.warning(
+                    f"Analyst file could not be read, retrying: {e}"
+                )
+                time.sleep(poll_interval)
+                continue
+            last_modified = modified
+            runs += 1
+
+            try:
+                unsaved = session.adjust(df_analyst)
+            except Exception as e:
+                logger.error(f"Adjustment failed, waiting for next save: {e}")
+                continue
+            logger.info(f"Adjusted in {time.time() - start_time:.2f} seconds")
+    except KeyboardInterrupt:
+        logger.info("Stopped watching analyst file")
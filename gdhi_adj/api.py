@@ -0,0 +1,96 @@
+"""Run preprocessing and adjustment on DataFrames already in memory.
+
+preprocess and adjust take the input DataFrames as read by read_with_schema
+and settings named as in the user_settings section of the config. They
+return their outputs instead of writing files and never change the input
+DataFrames, so runs with different settings can share one copy of the
+inputs, including on several threads:
+
+    frames = {"unconstrained": df, "ra_lad": ra_lad}
+    with ThreadPoolExecutor() as executor:
+        results = list(
+            executor.map(lambda settings: preprocess(frames, settings), runs)
+        )
+
+preprocess_workers and batch_workers start process pools, so leave them at 1
+when running on threads.
+"""
+
+from gdhi_adj.adjustment.run_adjustment import (
+    adjust_frames,
+    decode_interim,
+    load_adjustment_settings,
+    pivot_adjusted_wide,
+)
+from gdhi_adj.preprocess.run_preprocess import (
+    load_preprocessing_settings,
+    preprocess_frames,
+)
+
+
+def preprocess(frames: dict, settings: dict) -> dict:
+    """
+    Flag outliers in unconstrained GDHI and constrain them to regional
+    accounts.
+
+    Args:
+        frames (dict): Wide unconstrained GDHI by LSOA under "unconstrained"
+            and wide regional accounts by LAD under "ra_lad".
+        settings (dict): Settings as in the user_settings section of the
+            config.
+
+    Returns:
+        dict: The long interim DataFrame with scores and flags, the long
+        constrained outliers and the wide output for PowerBI, keyed by
+        "interim", "constrained" and "output".
+    """
+    return preprocess_frames(
+        frames["unconstrained"],
+        frames["ra_lad"],
+        load_preprocessing_settings(settings),
+    )
+
+
+def adjust(frames: dict, settings: dict) -> dict:
+    """
+    Adjust constrained GDHI using analyst decisions.
+
+    The component given by the filters in settings is adjusted, or every
+    component if batch_components is set.
+
+    Args:
+        frames (dict): Analyst assessment data under "analyst", constrained
+            data of all components under "constrained" and unconstrained data
+            under "unconstrained".
+        settings (dict): Settings as in the user_settings section of the
+            config.
+
+    Returns:
+        dict: The long interim QA DataFrames under "interim" and the wide
+        adjusted outputs under "output", both keyed by component, and the QA
+        summary of every component under "qa_summary".
+
+    Raises:
+        ValueError: If the component given by the filters fails to adjust.
+        A failed component in a batch is only recorded in the QA summary.
+    """
+    adj_settings = load_adjustment_settings(settings)
+    results = adjust_frames(
+        frames["analyst"],
+        frames["constrained"],
+        frames["unconstrained"],
+        adj_settings,
+    )
+    start_year = adj_settings["settings"]["start_year"]
+
+    return {
+        "interim": {
+            key: decode_interim(df, start_year)
+            for key, df in results["components"].items()
+        },
+        "output": {
+            key: pivot_adjusted_wide(df)
+            for key, df in results["components"].items()
+        },
+        "qa_summary": results["qa_summary"],
+    }
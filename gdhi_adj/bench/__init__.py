@@ -0,0 +1 @@
+"""Benchmarks of the gdhi_adj pipeline functions on synthetic data."""
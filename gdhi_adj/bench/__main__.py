@@ -0,0 +1,166 @@
+"""Run the benchmarks from the command line.
+
+python -m gdhi_adj.bench run --scales 1x 10x national --repeats 5
+python -m gdhi_adj.bench run --save-baseline
+python -m gdhi_adj.bench compare
+"""
+
+import argparse
+import os
+import sys
+
+from gdhi_adj.bench.cases import CASES, SCALES
+from gdhi_adj.bench.compare import (
+    baseline_path,
+    compare_results,
+    format_comparison,
+)
+from gdhi_adj.bench.runner import (
+    load_results,
+    machine_info,
+    results_table,
+    run_benchmarks,
+    save_results,
+)
+from gdhi_adj.utils.config import load_toml_config
+
+BASELINE_DIR = "benchmarks/baselines"
+
+
+def add_run_arguments(parser: argparse.ArgumentParser, default_scales):
+    """
+    Add the arguments that choose which benchmarks to run.
+
+    Args:
+        parser (argparse.ArgumentParser): Parser of a benchmark command.
+        default_scales (list): Scales to run if none are given.
+    """
+    parser.add_argument("--config", default="config/config.toml")
+    parser.add_argument(
+        "--scales", nargs="+", default=default_scales, choices=list(SCALES)
+    )
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument(
+        "--cases", nargs="+", choices=list(CASES), help="default all"
+    )
+    parser.add_argument(
+        "--work-dir", help="keep the synthetic files in this directory"
+    )
+    parser.add_argument("--baseline-dir", default=BASELINE_DIR)
+
+
+def main(argv: list = None) -> int:
+    """
+    Parse command line arguments and run the benchmark command.
+
+    Args:
+        argv (list, optional): Command line arguments, sys.argv if not given.
+
+    Returns:
+        int: Exit code, 1 if compare finds a regression.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m gdhi_adj.bench",
+        description="Benchmark the gdhi_adj pipeline on synthetic data.",
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="run the benchmarks")
+    add_run_arguments(run, ["1x", "10x"])
+    run.add_argument("--output", default="benchmarks/results.json")
+    run.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="also save the results as the baseline for this machine class",
+    )
+
+    compare = commands.add_parser(
+        "compare",
+        help="compare a fresh run with the baseline for this machine class",
+    )
+    add_run_arguments(compare, None)
+    compare.add_argument(
+        "--results", help="compare these saved results instead of a new run"
+    )
+    compare.add_argument(
+        "--baseline", help="default the baseline for this machine class"
+    )
+    compare.add_argument(
+        "--tolerance",
+        type=float,
+        help="relative tolerance of every case, default per case",
+    )
+
+    args = parser.parse_args(argv)
+    config = load_toml_config(args.config)
+
+    if args.command == "run":
+        results = run_benchmarks(
+            config,
+            scales=args.scales,
+            repeats=args.repeats,
+            cases=args.cases,
+            work_dir=args.work_dir,
+        )
+        save_results(results, args.output)
+        if args.save_baseline:
+            save_results(
+                results,
+                baseline_path(
+                    args.baseline_dir, results["machine"]["machine_class"]
+                ),
+            )
+        print(
+            results_table(results).to_string(
+                index=False, float_format="{:.4f}".format
+            )
+        )
+        return 0
+
+    machine_class = machine_info()["machine_class"]
+    path = args.baseline or baseline_path(args.baseline_dir, machine_class)
+    if not os.path.exists(path):
+        parser.error(
+            f"No baseline at {path}, save one with run --save-baseline"
+        )
+    baseline = load_results(path)
+
+    if args.results:
+        results = load_results(args.results)
+    else:
+        # Rerun the cases and scales of the baseline unless told otherwise
+        results = run_benchmarks(
+            config,
+            scales=args.scales
+            or list(dict.fromkeys(r["scale"] for r in baseline["results"])),
+            repeats=args.repeats,
+            cases=args.cases
+            or list(dict.fromkeys(r["case"] for r in baseline["results"])),
+            work_dir=args.work_dir,
+        )
+
+    if (
+        results["machine"]["machine_class"]
+        != baseline["machine"]["machine_class"]
+    ):
+        parser.error(
+            f"Baseline is from machine class "
+            f"{baseline['machine']['machine_class']}, results are from "
+            f"{results['machine']['machine_class']}"
+        )
+
+    comparison = compare_results(baseline, results, tolerance=args.tolerance)
+    print(format_comparison(comparison))
+
+    regressed = comparison[comparison["status"] == "regressed"]
+    if not regressed.empty:
+        print(
+            f"\n{len(regressed)} case(s) regressed beyond tolerance: "
+            + ", ".join(regressed["case"] + " (" + regressed["scale"] + ")")
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
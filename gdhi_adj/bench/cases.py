@@ -0,0 +1,391 @@
+"""Define the benchmark cases and the synthetic inputs they run on.
+
+Each case is a function that takes the prepared inputs of a scale and
+returns the function to time with its arguments. Inputs are prepared once
+per scale by running the pipeline steps before each benchmarked function,
+so every case is timed on the DataFrame it would receive in a real run.
+"""
+
+import copy
+import os
+
+import pandas as pd
+
+from gdhi_adj.adjustment.calc_adjustment import (
+    apportion_adjustment,
+    calc_interpolated_val,
+    calc_midpoint_adjustment,
+    calc_midpoint_val,
+)
+from gdhi_adj.adjustment.filter_adjustment import (
+    filter_component,
+)
+from gdhi_adj.adjustment.filter_adjustment import (
+    filter_year as filter_adjustment_year,
+)
+from gdhi_adj.adjustment.join_adjustment import (
+    join_analyst_constrained_data,
+    join_analyst_unconstrained_data,
+)
+from gdhi_adj.adjustment.pivot_adjustment import (
+    pivot_adjustment_long,
+    pivot_wide_final_dataframe,
+)
+from gdhi_adj.adjustment.run_adjustment import (
+    pivot_adjusted_wide,
+    prepare_analyst_data,
+    run_adjustment,
+)
+from gdhi_adj.preprocess.calc_preprocess import (
+    calc_iqr,
+    calc_lad_mean,
+    calc_rate_of_change,
+    calc_zscores,
+    iqr_columns,
+    zscore_columns,
+)
+from gdhi_adj.preprocess.flag_preprocess import create_master_flag
+from gdhi_adj.preprocess.join_preprocess import (
+    concat_wide_dataframes,
+    constrain_to_reg_acc,
+)
+from gdhi_adj.preprocess.pivot_preprocess import (
+    pivot_output_long,
+    pivot_wide_dataframe,
+    pivot_years_long_dataframe,
+)
+from gdhi_adj.preprocess.run_preprocess import (
+    calc_rates_of_change,
+    flag_outliers,
+    run_preprocessing,
+)
+from gdhi_adj.utils.helpers import read_with_schema
+from gdhi_adj.utils.synthetic_data import (
+    NATIONAL_SCALE,
+    generate_dataset,
+    write_dataset,
+)
+
+SCALES = {
+    "1x": {"n_lads": 10, "lsoas_per_lad": 20},
+    "10x": {"n_lads": 40, "lsoas_per_lad": 50},
+    "national": NATIONAL_SCALE,
+}
+
+
+def bench_config(config: dict, work_dir: str) -> dict:
+    """
+    Point a pipeline config at synthetic files in a work directory.
+
+    Args:
+        config (dict): Pipeline config, e.g. from config/config.toml.
+        work_dir (str): Directory with the files from write_dataset.
+
+    Returns:
+        dict: Copy of the config running both modules locally on the
+        synthetic files, writing outputs to work_dir/output.
+    """
+    config = copy.deepcopy(config)
+    config["user_settings"].update(
+        user_dir=work_dir,
+        local_or_shared="local",
+        output_data=True,
+        batch_components=False,
+        watch_adjustment=False,
+    )
+    config["preprocessing_local_settings"].update(
+        input_dir="/",
+        input_unconstrained_file_path="synthetic_unconstrained.csv",
+        input_ra_lad_file_path="synthetic_regional_accounts.csv",
+        output_dir="/output/",
+    )
+    config["adjustment_local_settings"].update(
+        input_adj_file_path="/synthetic_analyst.csv",
+        input_constrained_file_path="/synthetic_constrained.csv",
+        input_unconstrained_file_path="/synthetic_unconstrained.csv",
+        output_dir="/output/",
+    )
+    os.makedirs(os.path.join(work_dir, "output"), exist_ok=True)
+
+    return config
+
+
+def prepare_inputs(config: dict, scale: dict, work_dir: str) -> dict:
+    """
+    Generate synthetic data at a scale and the input of every case.
+
+    Args:
+        config (dict): Pipeline config, e.g. from config/config.toml.
+        scale (dict): Keyword arguments of generate_dataset, e.g. a value
+            of SCALES.
+        work_dir (str): Directory to write the synthetic files to.
+
+    Returns:
+        dict: Config, file paths and intermediate DataFrames of the
+        preprocessing and adjustment steps.
+    """
+    user_settings = config["user_settings"]
+    schema_path = config["pipeline_settings"]["schema_path"]
+    start_year = user_settings["start_year"]
+    end_year = user_settings["end_year"]
+
+    paths = write_dataset(
+        generate_dataset(
+            **scale,
+            start_year=start_year,
+            end_year=end_year,
+            transaction_name=user_settings["transaction_name"],
+        ),
+        work_dir,
+    )
+    data = {
+        "config": bench_config(config, work_dir),
+        "paths": paths,
+        "schema_path": schema_path,
+    }
+
+    def read(name, schema_name):
+        return read_with_schema(
+            paths[name], schema_path + config["pipeline_settings"][schema_name]
+        )
+
+    # Preprocessing
+    data["uncon_wide"] = read("unconstrained", "input_gdhi_schema_name")
+    ra_lad = read("regional_accounts", "input_ra_lad_schema_name")
+    data["ra_lad"] = pivot_years_long_dataframe(ra_lad, "year", "uncon_gdhi")
+    df = pivot_years_long_dataframe(
+        data["uncon_wide"].copy(), "year", "uncon_gdhi"
+    )
+    data["pre_long"] = filter_adjustment_year(df, start_year, end_year)
+    data["pre_rates"] = calc_rates_of_change(data["pre_long"].copy())
+
+    flag_settings = {
+        "zscore_upper_threshold": user_settings["zscore_upper_threshold"],
+        "zscore_lower_threshold": user_settings["zscore_lower_threshold"],
+    }
+    iqr_settings = {
+        "iqr_lower_quantile": user_settings["iqr_lower_quantile"],
+        "iqr_upper_quantile": user_settings["iqr_upper_quantile"],
+        "iqr_multiplier": user_settings["iqr_multiplier"],
+    }
+    data["flag_settings"] = flag_settings
+    data["iqr_settings"] = iqr_settings
+    data["pre_scores"] = pd.concat(
+        [
+            data["pre_rates"],
+            zscore_columns(
+                data["pre_rates"],
+                "bkwd",
+                "lad_code",
+                "backward_pct_change",
+                **flag_settings,
+            ),
+            zscore_columns(
+                data["pre_rates"],
+                "frwd",
+                "lad_code",
+                "forward_pct_change",
+                **flag_settings,
+            ),
+            iqr_columns(
+                data["pre_rates"],
+                "raw",
+                ["lad_code", "year"],
+                "uncon_gdhi",
+                **iqr_settings,
+            ),
+        ],
+        axis=1,
+    )
+    df = flag_outliers(
+        data["pre_rates"].copy(), True, True, **flag_settings, **iqr_settings
+    )
+    data["pre_flagged"] = df[
+        [
+            "lsoa_code",
+            "lsoa_name",
+            "lad_code",
+            "lad_name",
+            "year",
+            "uncon_gdhi",
+        ]
+        + [col for col in df.columns if col.startswith("master_")]
+    ]
+    data["pre_lad_mean"] = calc_lad_mean(data["pre_flagged"].copy())
+    data["pre_constrained"] = constrain_to_reg_acc(
+        data["pre_lad_mean"].copy(),
+        data["ra_lad"],
+        user_settings["transaction_name"],
+    )
+    data["pre_outlier_long"] = pivot_output_long(
+        data["pre_constrained"].drop(
+            columns=["mean_non_out_gdhi", "conlsoa_mean"]
+        ),
+        "uncon_gdhi",
+        "conlsoa_gdhi",
+    )
+    data["pre_outlier_wide"] = pivot_wide_dataframe(
+        data["pre_outlier_long"].copy()
+    )
+    df_mean = pivot_wide_dataframe(
+        pivot_output_long(
+            data["pre_constrained"].drop(
+                columns=["uncon_gdhi", "conlsoa_gdhi"]
+            ),
+            "mean_non_out_gdhi",
+            "conlsoa_mean",
+        )
+    )
+    df_mean["master_flag"] = "MEAN"
+    data["pre_mean_wide"] = df_mean
+
+    # Adjustment
+    data["analyst"] = prepare_analyst_data(
+        read("analyst", "input_adj_schema_name"), start_year, end_year
+    )
+    data["constrained"] = filter_component(
+        read("constrained", "input_constrained_schema_name"),
+        user_settings["sas_code_filter"],
+        user_settings["cord_code_filter"],
+        user_settings["credit_debit_filter"],
+    )
+    data["uncon"] = read("unconstrained", "input_unconstrained_schema_name")
+    data["adj_joined_con"] = join_analyst_constrained_data(
+        data["constrained"], data["analyst"]
+    )
+    data["adj_joined"] = join_analyst_unconstrained_data(
+        data["uncon"], data["adj_joined_con"]
+    )
+    df = pivot_adjustment_long(data["adj_joined"].copy())
+    data["adj_long"] = filter_adjustment_year(df, start_year, end_year)
+    data["adj_midpoint"] = calc_midpoint_val(data["adj_long"], start_year)
+    data["adj_calc"] = calc_midpoint_adjustment(
+        data["adj_long"].copy(), data["adj_midpoint"]
+    )
+    data["adjusted"] = apportion_adjustment(data["adj_calc"].copy())
+    data["adj_final_long"] = (
+        data["adjusted"]
+        .drop(
+            columns=[
+                "con_gdhi",
+                "midpoint",
+                "midpoint_diff",
+                "adjustment_val",
+                "lsoa_count",
+            ]
+        )
+        .rename(columns={"adjusted_con_gdhi": "con_gdhi"})
+    )
+
+    return data
+
+
+CASES = {
+    "read_with_schema": lambda data: (
+        read_with_schema,
+        [
+            data["paths"]["unconstrained"],
+            data["schema_path"]
+            + data["config"]["pipeline_settings"]["input_gdhi_schema_name"],
+        ],
+    ),
+    "pivot_years_long_dataframe": lambda data: (
+        pivot_years_long_dataframe,
+        [data["uncon_wide"], "year", "uncon_gdhi"],
+    ),
+    "calc_rate_of_change": lambda data: (
+        calc_rate_of_change,
+        [
+            data["pre_long"],
+            False,
+            ["lsoa_code", "year"],
+            "lsoa_code",
+            "uncon_gdhi",
+        ],
+    ),
+    "calc_zscores": lambda data: (
+        calc_zscores,
+        [data["pre_rates"], "bkwd", "lad_code", "backward_pct_change"],
+        data["flag_settings"],
+    ),
+    "calc_iqr": lambda data: (
+        calc_iqr,
+        [data["pre_rates"], "raw", ["lad_code", "year"], "uncon_gdhi"],
+        data["iqr_settings"],
+    ),
+    "create_master_flag": lambda data: (
+        create_master_flag,
+        [data["pre_scores"], True, True],
+    ),
+    "calc_lad_mean": lambda data: (calc_lad_mean, [data["pre_flagged"]]),
+    "constrain_to_reg_acc": lambda data: (
+        constrain_to_reg_acc,
+        [
+            data["pre_lad_mean"],
+            data["ra_lad"],
+            data["config"]["user_settings"]["transaction_name"],
+        ],
+    ),
+    "pivot_output_long": lambda data: (
+        pivot_output_long,
+        [
+            data["pre_constrained"].drop(
+                columns=["mean_non_out_gdhi", "conlsoa_mean"]
+            ),
+            "uncon_gdhi",
+            "conlsoa_gdhi",
+        ],
+    ),
+    "pivot_wide_dataframe": lambda data: (
+        pivot_wide_dataframe,
+        [data["pre_outlier_long"]],
+    ),
+    "concat_wide_dataframes": lambda data: (
+        concat_wide_dataframes,
+        [data["pre_outlier_wide"], data["pre_mean_wide"]],
+    ),
+    "join_analyst_constrained_data": lambda data: (
+        join_analyst_constrained_data,
+        [data["constrained"], data["analyst"]],
+    ),
+    "join_analyst_unconstrained_data": lambda data: (
+        join_analyst_unconstrained_data,
+        [data["uncon"], data["adj_joined_con"]],
+    ),
+    "pivot_adjustment_long": lambda data: (
+        pivot_adjustment_long,
+        [data["adj_joined"]],
+    ),
+    "calc_midpoint_val": lambda data: (
+        calc_midpoint_val,
+        [
+            data["adj_long"],
+            data["config"]["user_settings"]["start_year"],
+        ],
+    ),
+    "calc_interpolated_val": lambda data: (
+        calc_interpolated_val,
+        [
+            data["adj_long"],
+            data["config"]["user_settings"]["start_year"],
+        ],
+    ),
+    "calc_midpoint_adjustment": lambda data: (
+        calc_midpoint_adjustment,
+        [data["adj_long"], data["adj_midpoint"]],
+    ),
+    "apportion_adjustment": lambda data: (
+        apportion_adjustment,
+        [data["adj_calc"]],
+    ),
+    "pivot_wide_final_dataframe": lambda data: (
+        pivot_wide_final_dataframe,
+        [data["adj_final_long"]],
+    ),
+    "pivot_adjusted_wide": lambda data: (
+        pivot_adjusted_wide,
+        [data["adjusted"]],
+    ),
+    "run_preprocessing": lambda data: (run_preprocessing, [data["config"]]),
+    "run_adjustment": lambda data: (run_adjustment, [data["config"]]),
+}
@@ -0,0 +1,125 @@
+"""Define the comparison of benchmark results against a stored baseline."""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+# Relative slowdown of the median time allowed before a case counts as a
+# regression. Cases that write files vary more between runs.
+DEFAULT_TOLERANCE = 0.10
+TOLERANCES = {
+    "read_with_schema": 0.25,
+    "run_preprocessing": 0.15,
+    "run_adjustment": 0.15,
+}
+
+# Changes smaller than this many seconds are treated as noise
+MIN_SECONDS = 0.001
+
+
+def baseline_path(baseline_dir: str, machine_class: str) -> str:
+    """
+    Path of the stored baseline for a machine class.
+
+    Args:
+        baseline_dir (str): Directory of the stored baselines.
+        machine_class (str): Machine class from machine_info.
+
+    Returns:
+        str: Path to the baseline JSON file.
+    """
+    return os.path.join(baseline_dir, f"{machine_class}.json")
+
+
+def compare_results(
+    baseline: dict,
+    results: dict,
+    tolerance: float = None,
+    min_seconds: float = MIN_SECONDS,
+) -> pd.DataFrame:
+    """
+    Compare the median time of each case and scale with a baseline.
+
+    A case is only slower or faster if its median changes by more than its
+    relative tolerance and by more than the noise, taken as the larger
+    interquartile range of the two runs or min_seconds.
+
+    Args:
+        baseline (dict): Baseline benchmark results.
+        results (dict): Fresh benchmark results.
+        tolerance (float, optional): Relative tolerance of every case,
+            TOLERANCES or DEFAULT_TOLERANCE if not given.
+        min_seconds (float): Smallest change in seconds that is not noise.
+
+    Returns:
+        pd.DataFrame: One row per case and scale with both medians, the
+        ratio of fresh to baseline median, the tolerance and a status of
+        "regressed", "faster", "unchanged", "new" or "missing".
+    """
+    columns = ["case", "scale", "median", "iqr"]
+    comparison = pd.DataFrame(baseline["results"], columns=columns).merge(
+        pd.DataFrame(results["results"], columns=columns),
+        on=["case", "scale"],
+        how="outer",
+        suffixes=("_baseline", ""),
+        sort=False,
+    )
+
+    comparison["ratio"] = comparison["median"] / comparison["median_baseline"]
+    comparison["tolerance"] = (
+        tolerance
+        if tolerance is not None
+        else comparison["case"].map(TOLERANCES).fillna(DEFAULT_TOLERANCE)
+    )
+
+    delta = comparison["median"] - comparison["median_baseline"]
+    noise = np.maximum(
+        comparison[["iqr_baseline", "iqr"]].max(axis=1), min_seconds
+    )
+    slower = (comparison["ratio"] > 1 + comparison["tolerance"]) & (
+        delta > noise
+    )
+    faster = (comparison["ratio"] < 1 / (1 + comparison["tolerance"])) & (
+        -delta > noise
+    )
+    comparison["status"] = np.select(
+        [
+            comparison["median_baseline"].isna(),
+            comparison["median"].isna(),
+            slower,
+            faster,
+        ],
+        ["new", "missing", "regressed", "faster"],
+        default="unchanged",
+    )
+
+    return comparison[
+        [
+            "case",
+            "scale",
+            "median_baseline",
+            "median",
+            "ratio",
+            "tolerance",
+            "status",
+        ]
+    ]
+
+
+def format_comparison(comparison: pd.DataFrame) -> str:
+    """
+    Format a comparison as a table of slowdowns and speedups.
+
+    Args:
+        comparison (pd.DataFrame): Output of compare_results.
+
+    Returns:
+        str: Table with the change in median time as a percentage.
+    """
+    table = comparison.assign(
+        change=(comparison["ratio"] - 1).map("{:+.1%}".format),
+        tolerance=comparison["tolerance"].map("{:.0%}".format),
+    ).drop(columns="ratio")
+
+    return table.to_string(index=False, float_format="{:.4f}".format)
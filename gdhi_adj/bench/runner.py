@@ -0,0 +1,195 @@
+"""Define the runner that times benchmark cases and saves the results."""
+
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from gdhi_adj import __version__
+from gdhi_adj.bench.cases import CASES, SCALES, prepare_inputs
+from gdhi_adj.utils.logger import GDHI_adj_logger
+
+GDHI_adj_LOGGER = GDHI_adj_logger(__name__)
+logger = GDHI_adj_LOGGER.logger
+
+
+def machine_info() -> dict:
+    """
+    Describe the machine the benchmarks run on.
+
+    Returns:
+        dict: Machine class, host name, platform, processor, CPU count and
+        package versions. The machine class groups machines whose timings
+        can be compared.
+    """
+    cpu_count = os.cpu_count()
+    machine_class = f"{platform.system()}-{platform.machine()}-{cpu_count}cpu"
+    return {
+        "machine_class": machine_class.lower(),
+        "host": platform.node(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": cpu_count,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "gdhi_adj": __version__,
+    }
+
+
+def time_case(case, data: dict, repeats: int) -> list:
+    """
+    Time a benchmark case on prepared inputs.
+
+    DataFrame arguments are copied before each repeat, outside the timing,
+    so functions that change their inputs see the same data every time.
+
+    Args:
+        case (Callable): Benchmark case from CASES.
+        data (dict): Inputs from prepare_inputs.
+        repeats (int): Number of times to run the function.
+
+    Returns:
+        list: Wall time in seconds of each repeat.
+    """
+    times = []
+    for _ in range(repeats):
+        func, args, *kwargs = case(data)
+        kwargs = kwargs[0] if kwargs else {}
+        args = [
+            arg.copy() if isinstance(arg, pd.DataFrame) else arg
+            for arg in args
+        ]
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        times.append(time.perf_counter() - start)
+
+    return times
+
+
+def summarise_times(times: list) -> dict:
+    """
+    Summarise the repeat times of a case.
+
+    Args:
+        times (list): Wall time in seconds of each repeat.
+
+    Returns:
+        dict: Median, minimum, maximum and interquartile range in seconds.
+    """
+    quartiles = (
+        statistics.quantiles(times, n=4) if len(times) > 1 else times * 3
+    )
+    return {
+        "median": statistics.median(times),
+        "min": min(times),
+        "max": max(times),
+        "iqr": quartiles[2] - quartiles[0],
+    }
+
+
+def run_benchmarks(
+    config: dict,
+    scales: list = ("1x", "10x"),
+    repeats: int = 5,
+    cases: list = None,
+    work_dir: str = None,
+) -> dict:
+    """
+    Run benchmark cases at each scale.
+
+    Args:
+        config (dict): Pipeline config, e.g. from config/config.toml.
+        scales (list): Names of scales in SCALES.
+        repeats (int): Number of times to run each case.
+        cases (list, optional): Names of cases in CASES, all if not given.
+        work_dir (str, optional): Directory for the synthetic files, a
+            temporary directory if not given.
+
+    Returns:
+        dict: Machine information, settings and one result per case and
+        scale with the repeat times and their summary.
+    """
+    cases = cases or list(CASES)
+    unknown = [name for name in cases if name not in CASES] + [
+        scale for scale in scales if scale not in SCALES
+    ]
+    if unknown:
+        raise ValueError(f"Unknown benchmark case(s) or scale(s): {unknown}")
+
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for scale in scales:
+            scale_dir = os.path.join(work_dir or temp_dir, scale)
+            logger.info(f"Preparing benchmark inputs at {scale} scale")
+            data = prepare_inputs(config, SCALES[scale], scale_dir)
+
+            for name in cases:
+                logger.info(f"Benchmarking {name} at {scale} scale")
+                times = time_case(CASES[name], data, repeats)
+                results.append(
+                    {
+                        "case": name,
+                        "scale": scale,
+                        # LSOA-year rows of the unconstrained data
+                        "rows": len(data["pre_long"]),
+                        "times": times,
+                        **summarise_times(times),
+                    }
+                )
+
+    return {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "machine": machine_info(),
+        "repeats": repeats,
+        "results": results,
+    }
+
+
+def results_table(results: dict) -> pd.DataFrame:
+    """
+    Summary of benchmark results as a table.
+
+    Args:
+        results (dict): Output of run_benchmarks.
+
+    Returns:
+        pd.DataFrame: One row per case and scale, without repeat times.
+    """
+    return pd.DataFrame(results["results"]).drop(columns="times")
+
+
+def save_results(results: dict, path: str):
+    """
+    Save benchmark results as JSON.
+
+    Args:
+        results (dict): Output of run_benchmarks.
+        path (str): File path of the JSON results.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as file:
+        json.dump(results, file, indent=2)
+    logger.info(f"Benchmark results saved to {path}")
+
+
+def load_results(path: str) -> dict:
+    """
+    Load benchmark results saved by save_results.
+
+    Args:
+        path (str): File path of the JSON results.
+
+    Returns:
+        dict: Benchmark results.
+    """
+    with open(path) as file:
+        return json.load(file)
@@ -1,41 +1,247 @@
 """Title for pipeline.py module"""
 
+import os
+import sqlite3
 import time
 
+from gdhi_adj import __version__
 from gdhi_adj.adjustment.run_adjustment import run_adjustment
+from gdhi_adj.adjustment.session_adjustment import watch_adjustment
 from gdhi_adj.preprocess.run_preprocess import run_preprocessing
-from gdhi_adj.utils.helpers import load_toml_config
-from gdhi_adj.utils.logger import GDHI_adj_logger
+from gdhi_adj.utils.checkpoint import Checkpointer
+from gdhi_adj.utils.config import apply_overrides, load_toml_config
+from gdhi_adj.utils.logger import (
+    GDHI_adj_logger,
+    configure_logging,
+    set_run_id,
+)
+from gdhi_adj.utils.profiler import StageProfiler
+from gdhi_adj.utils.runlog import RunLog
+from gdhi_adj.utils.stage_cache import MB, StageCache
+from gdhi_adj.utils.stage_recorder import StageRecorder
 
 # Initialize logger
 GDHI_adj_LOGGER = GDHI_adj_logger(__name__)
 logger = GDHI_adj_LOGGER.logger
 
 
-def run_pipeline(config_path):
+def create_run_log(config: dict) -> RunLog:
+    """Create a run log saving to the local file system.
+
+    Args:
+        config (dict): Configuration dictionary.
+
+    Returns:
+        RunLog: Run log for the configured platform.
+    """
+    return RunLog(
+        config,
+        __version__,
+        file_exists_func=os.path.exists,
+        mkdir_func=os.makedirs,
+        read_csv_func=None,
+        write_csv_func=None,
+    )
+
+
+def create_checkpointer(
+    config: dict, run_log: RunLog, run_id: str, resume: bool
+) -> Checkpointer:
+    """Create a checkpointer saving under the run's ID in the run logs.
+
+    Args:
+        config (dict): Configuration dictionary.
+        run_log (RunLog): Run log of the run.
+        run_id (str): ID of the run.
+        resume (bool): Whether the run resumes from existing checkpoints.
+
+    Returns:
+        Checkpointer: Checkpointer of the run, disabled if save_checkpoints
+        is false and the run is not resumed. It reuses the outputs of
+        earlier runs from the stage cache in the run logs if use_cache is
+        true.
+    """
+    settings = config["user_settings"]
+    cache = None
+    if settings.get("use_cache", False):
+        cache = StageCache(
+            os.path.join(run_log.run_logs_folder, "cache"),
+            max_bytes=settings.get("cache_max_mb", 2048) * MB,
+        )
+
+    return Checkpointer(
+        os.path.join(run_log.run_logs_folder, "checkpoints", run_id),
+        run_id,
+        config,
+        enabled=resume or settings.get("save_checkpoints", False),
+        cache=cache,
+    )
+
+
+def create_profiler(
+    config: dict, run_log: RunLog, run_id: str, profile: list = None
+) -> StageProfiler | None:
+    """Create a profiler saving under the run's ID in the run logs.
+
+    Args:
+        config (dict): Configuration dictionary.
+        run_log (RunLog): Run log of the run.
+        run_id (str): ID of the run.
+        profile (list, optional): "cpu" and/or "memory" to profile, the
+            profile_cpu and profile_memory settings if not given.
+
+    Returns:
+        StageProfiler | None: Profiler of each stage, None if profiling is
+        off.
+    """
+    settings = config["user_settings"]
+    if profile is None:
+        profile = [
+            kind
+            for kind in ("cpu", "memory")
+            if settings.get(f"profile_{kind}", False)
+        ]
+    if not profile:
+        return None
+
+    return StageProfiler(
+        os.path.join(run_log.run_logs_folder, "profiles", run_id),
+        run_id,
+        cpu="cpu" in profile,
+        memory="memory" in profile,
+        top_n=settings.get("profile_top_n", 10),
+    )
+
+
+def chained_frames(
+    config: dict, preprocessed: dict, checkpoints: Checkpointer
+) -> dict | None:
+    """Frames from preprocessing to pass on to adjustment in memory.
+
+    With chain_adjustment set, adjustment uses the unconstrained data read
+    by preprocessing instead of reading its own unconstrained file, which
+    has the same schema. Must be called in the adjustment section of the
+    checkpointer.
+
+    Args:
+        config (dict): Configuration dictionary.
+        preprocessed (dict): Output of run_preprocessing, None if
+            preprocessing did not run.
+        checkpoints (Checkpointer): Checkpointer of the run.
+
+    Returns:
+        dict | None: Frames to pass to run_adjustment, None to read every
+        input from its file.
+    """
+    if preprocessed is None or not config["user_settings"].get(
+        "chain_adjustment", False
+    ):
+        return None
+
+    logger.info("Passing unconstrained data from preprocessing to adjustment")
+    checkpoints.link("read_unconstrained", "preprocessing.read_unconstrained")
+    return {"unconstrained": preprocessed["unconstrained"]}
+
+
+def run_pipeline(
+    config_path, resume_run_id=None, profile=None, overrides=None
+):
     """Run the GDHI adjustment pipeline.
     Args:
         config_path (str): Path to the configuration file.
+        resume_run_id (str, optional): ID of a previous run to resume. Steps
+        whose inputs and settings are unchanged since they were checkpointed
+        in that run are loaded instead of run again.
+        profile (list, optional): "cpu" and/or "memory" to profile each step
+        with cProfile and/or tracemalloc, overriding the profile_cpu and
+        profile_memory settings.
+        overrides (list, optional): Config settings to override, of the form
+        section.setting=value.
+
+    Returns:
+        str: Outcome of the run, "completed" or "failed".
     """
     logger.info("Pipeline started")
     start_time = time.time()
 
     # Load config
-    config = load_toml_config(config_path)
+    config = apply_overrides(load_toml_config(config_path), overrides)
+
+    run_log = create_run_log(config)
+    run_id = resume_run_id or run_log.generate_and_save_run_id()
+    set_run_id(run_id)
+    json_log = config["user_settings"].get("json_log", False)
+    if json_log:
+        configure_logging(
+            os.path.join(
+                run_log.run_logs_folder,
+                run_id + config["log_filenames"]["json_log_suffix"],
+            )
+        )
+    if resume_run_id is None:
+        logger.info(f"Run ID: {run_id}")
+    else:
+        logger.info(f"Resuming run ID: {run_id}")
+    recorder = StageRecorder(
+        run_id,
+        profiler=create_profiler(config, run_log, run_id, profile),
+        deep_memory=config["user_settings"].get("deep_memory", False),
+    )
+    checkpoints = create_checkpointer(
+        config, run_log, run_id, resume=resume_run_id is not None
+    )
 
+    outcome, error = "completed", None
     try:
+        preprocessed = None
         if config["user_settings"]["preprocessing"]:
-            run_preprocessing(config)
+            with recorder.in_section("preprocessing"), checkpoints.in_section(
+                "preprocessing"
+            ):
+                preprocessed = run_preprocessing(config, recorder, checkpoints)
 
         if config["user_settings"]["adjustment"]:
-            run_adjustment(config)
+            if config["user_settings"].get("watch_adjustment", False):
+                watch_adjustment(config)
+            else:
+                with recorder.in_section("adjustment"), checkpoints.in_section(
+                    "adjustment"
+                ):
+                    run_adjustment(
+                        config,
+                        recorder,
+                        checkpoints,
+                        frames=chained_frames(
+                            config, preprocessed, checkpoints
+                        ),
+                    )
 
     except Exception as e:
         logger.error(
             f"An error occurred during the pipeline execution: {e}",
             exc_info=True,
         )
+        outcome, error = "failed", str(e)
+
+    recorder.log_summary()
+    # Metrics are a side output, so failing to save them does not fail the
+    # run, e.g. if the metrics database is locked
+    try:
+        recorder.save_report(
+            os.path.join(
+                run_log.run_logs_folder,
+                run_id + config["log_filenames"]["run_report_suffix"],
+            )
+        )
+        run_log.save_run_metrics(recorder.report(), outcome, error)
+    except (OSError, sqlite3.Error) as e:
+        logger.warning(f"Run metrics could not be saved: {e}")
 
     logger.info(
         f"Running time: {((time.time() - start_time) / 60):.2f} minutes."
     )
+    if json_log:
+        # Close the run's JSON-lines log
+        configure_logging()
+
+    return outcome
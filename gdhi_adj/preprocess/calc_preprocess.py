@@ -2,7 +2,6 @@
 
 import numpy as np
 import pandas as pd
-from scipy.stats import zscore
 
 
 def calc_rate_of_change(
@@ -32,7 +31,7 @@ def calc_rate_of_change(
         df = df.sort_values(by=sort_cols).reset_index(drop=True)
 
         df["forward_pct_change"] = (
-            df.groupby(group_col)[val_col].pct_change() + 1.0
+            df.groupby(group_col, observed=True)[val_col].pct_change() + 1.0
         )
 
     else:
@@ -41,13 +40,29 @@ def calc_rate_of_change(
             drop=True
         )
         df["backward_pct_change"] = (
-            df.groupby(group_col)[val_col].pct_change() + 1.0
+            df.groupby(group_col, observed=True)[val_col].pct_change() + 1.0
         )
 
     return df
 
 
-def calc_zscores(
+def group_keys(df: pd.DataFrame, group_col: str | list) -> pd.Index:
+    """
+    Row-aligned group keys of a DataFrame, for looking up group results.
+
+    Args:
+        df (pd.DataFrame): The input DataFrame.
+        group_col (str | list): Column or columns to group by.
+
+    Returns:
+        pd.Index: Group key of each row, a MultiIndex for several columns.
+    """
+    if isinstance(group_col, list):
+        return pd.MultiIndex.from_frame(df[group_col])
+    return pd.Index(df[group_col])
+
+
+def zscore_columns(
     df: pd.DataFrame,
     score_prefix: str,
     group_col: str,
@@ -56,7 +71,10 @@ def calc_zscores(
     zscore_lower_threshold: float = -3.0,
 ) -> pd.DataFrame:
     """
-    Calculates the z-scores for percent changes and raw data in DataFrame.
+    Calculate z-score columns without modifying the input DataFrame.
+
+    Group means and standard deviations use pandas' compiled groupby
+    kernels, so several of these can run concurrently on threads.
 
     Args:
         df (pd.DataFrame): The input DataFrame.
@@ -67,54 +85,99 @@ def calc_zscores(
         zscore_lower_threshold (float): The lower threshold for z-score flag.
 
     Returns:
-        pd.DataFrame: The DataFrame with an additional 'zscore' and 'threshold'
-        columns, indicating which threshold the zscore breached.
+        pd.DataFrame: The 'zscore', 'threshold' and flag columns, with the
+        index of df.
     """
     # Mask for when rollback_flag is false
     mask = ~df["rollback_flag"]
 
     # If the value column is 1, the data has been rolled back so should not be
     # flagged, else flag based on zscore
-    # Calculate z-scores when rollback_flag is false
-    df.loc[mask, f"{score_prefix}_zscore"] = (
-        df.loc[mask]
-        .groupby(group_col)[val_col]
-        .transform(lambda x: zscore(x, nan_policy="omit", ddof=1))
+    # Calculate z-scores (ddof=1, ignoring missing values) when rollback_flag
+    # is false
+    grouped = df.loc[mask].groupby(group_col, observed=True)[val_col]
+    zscores = (df.loc[mask, val_col] - grouped.transform("mean")) / (
+        grouped.transform("std")
     )
+    zscores = zscores.reindex(df.index)
 
     # Descriptor whether the zscore exceeds the upper or lower threshold
     conditions = [
-        df[f"{score_prefix}_zscore"] > zscore_upper_threshold,
-        df[f"{score_prefix}_zscore"] < zscore_lower_threshold,
+        zscores > zscore_upper_threshold,
+        zscores < zscore_lower_threshold,
     ]
     descriptors = ["upper", "lower"]
 
-    df[f"{score_prefix}_zscore_threshold"] = np.select(
-        conditions, descriptors, default=None
+    return pd.DataFrame(
+        {
+            f"{score_prefix}_zscore": zscores,
+            f"{score_prefix}_zscore_threshold": np.select(
+                conditions, descriptors, default=None
+            ),
+            f"z_{score_prefix}_flag": np.select(
+                conditions, [True, True], default=False
+            ),
+        },
+        index=df.index,
     )
-    df[f"z_{score_prefix}_flag"] = np.select(
-        conditions, [True, True], default=False
+
+
+def calc_zscores(
+    df: pd.DataFrame,
+    score_prefix: str,
+    group_col: str,
+    val_col: str,
+    zscore_upper_threshold: float = 3.0,
+    zscore_lower_threshold: float = -3.0,
+) -> pd.DataFrame:
+    """
+    Calculates the z-scores for percent changes and raw data in DataFrame.
+
+    Args:
+        df (pd.DataFrame): The input DataFrame.
+        score_prefix (str): Prefix for the zscore column names.
+        group_col (str): The column to group by for z-score calculation.
+        val_col (str): The column values to calculate zscores.
+        zscore_upper_threshold (float): The upper threshold for z-score flag.
+        zscore_lower_threshold (float): The lower threshold for z-score flag.
+
+    Returns:
+        pd.DataFrame: The DataFrame with an additional 'zscore' and 'threshold'
+        columns, indicating which threshold the zscore breached.
+    """
+    zscores = zscore_columns(
+        df,
+        score_prefix,
+        group_col,
+        val_col,
+        zscore_upper_threshold,
+        zscore_lower_threshold,
     )
+    df = df.copy(deep=False)
+    df[zscores.columns] = zscores
 
     return df
 
 
-def calc_iqr(
+def iqr_columns(
     df: pd.DataFrame,
     iqr_prefix: str,
-    group_col: str,
+    group_col: str | list,
     val_col: str,
     iqr_lower_quantile: float = 0.25,
     iqr_upper_quantile: float = 0.75,
     iqr_multiplier: float = 3.0,
 ) -> pd.DataFrame:
     """
-    Calculates the interquartile range (IQR) for each LSOA in the DataFrame.
+    Calculate IQR columns without modifying the input DataFrame.
+
+    Quartiles use pandas' compiled groupby quantile kernel, so several of
+    these can run concurrently on threads.
 
     Args:
         df (pd.DataFrame): The input DataFrame.
         iqr_prefix (str): Prefix for the IQR column names.
-        group_col (str): The column to group by for IQR calculation.
+        group_col (str | list): The column(s) to group by for IQR calculation.
         val_col (str): The column containing values to calculate IQR.
         iqr_lower_quantile (float): The lower quantile for IQR calculation.
         iqr_upper_quantile (float): The upper quantile for IQR calculation.
@@ -122,57 +185,91 @@ def calc_iqr(
             outlier bounds.
 
     Returns:
-        pd.DataFrame: The DataFrame with additional columns for IQR, outlier
-        bounds and 'threshold' columns, indicating which threshold the zscore
-        breached.
+        pd.DataFrame: The quartile, IQR, outlier bound, 'threshold' and flag
+        columns, with the index of df.
     """
     # Mask for when rollback_flag is false
     mask = ~df["rollback_flag"]
 
-    # Calculate quartiles only on unflagged data
-    quartiles = (
-        df[mask]
-        .groupby(group_col)[val_col]
-        .agg(
-            [
-                (f"{iqr_prefix}_q1", lambda x: x.quantile(iqr_lower_quantile)),
-                (f"{iqr_prefix}_q3", lambda x: x.quantile(iqr_upper_quantile)),
-            ]
-        )
-    ).reset_index()
-
-    # Assign quartiles back to the full DataFrame
-    df = df.merge(quartiles, on=group_col, how="left")
-
-    # Calculate IQR for each LSOA
-    df[f"{iqr_prefix}_iqr"] = df[f"{iqr_prefix}_q3"] - df[f"{iqr_prefix}_q1"]
+    # Calculate quartiles only on unflagged data, and look them up for every
+    # row of their group
+    grouped = df[mask].groupby(group_col, observed=True)[val_col]
+    keys = group_keys(df, group_col)
+    q1 = grouped.quantile(iqr_lower_quantile).reindex(keys).to_numpy()
+    q3 = grouped.quantile(iqr_upper_quantile).reindex(keys).to_numpy()
+
+    # Calculate IQR and the lower and upper bounds for outliers
+    iqr = q3 - q1
+    lower_bound = q1 - (iqr_multiplier * iqr)
+    upper_bound = q3 + (iqr_multiplier * iqr)
+
+    # Descriptor whether the value exceeds the upper or lower bound
+    values = df[val_col].to_numpy()
+    conditions = [values > upper_bound, values < lower_bound]
+    descriptors = ["upper", "lower"]
 
-    # Calculate lower and upper bounds for outliers for each LSOA
-    df[f"{iqr_prefix}_lower_bound"] = df[f"{iqr_prefix}_q1"] - (
-        iqr_multiplier * df[f"{iqr_prefix}_iqr"]
-    )
-    df[f"{iqr_prefix}_upper_bound"] = df[f"{iqr_prefix}_q3"] + (
-        iqr_multiplier * df[f"{iqr_prefix}_iqr"]
+    return pd.DataFrame(
+        {
+            f"{iqr_prefix}_q1": q1,
+            f"{iqr_prefix}_q3": q3,
+            f"{iqr_prefix}_iqr": iqr,
+            f"{iqr_prefix}_lower_bound": lower_bound,
+            f"{iqr_prefix}_upper_bound": upper_bound,
+            f"{iqr_prefix}_iqr_threshold": np.select(
+                conditions, descriptors, default=None
+            ),
+            f"iqr_{iqr_prefix}_flag": np.select(
+                conditions, [True, True], default=False
+            ),
+        },
+        index=df.index,
     )
 
-    # Descriptor whether the zscore exceeds the upper or lower threshold
-    conditions = [
-        df[val_col] > df[f"{iqr_prefix}_upper_bound"],
-        df[val_col] < df[f"{iqr_prefix}_lower_bound"],
-    ]
-    descriptors = ["upper", "lower"]
 
-    df[f"{iqr_prefix}_iqr_threshold"] = np.select(
-        conditions, descriptors, default=None
-    )
+def calc_iqr(
+    df: pd.DataFrame,
+    iqr_prefix: str,
+    group_col: str | list,
+    val_col: str,
+    iqr_lower_quantile: float = 0.25,
+    iqr_upper_quantile: float = 0.75,
+    iqr_multiplier: float = 3.0,
+) -> pd.DataFrame:
+    """
+    Calculates the interquartile range (IQR) for each LSOA in the DataFrame.
 
-    # If the value column is 1, the data has been rolled back so should not be
-    # flagged
-    df[f"iqr_{iqr_prefix}_flag"] = np.select(
-        conditions, [True, True], default=False
-    )
+    Args:
+        df (pd.DataFrame): The input DataFrame.
+        iqr_prefix (str): Prefix for the IQR column names.
+        group_col (str | list): The column(s) to group by for IQR calculation.
+        val_col (str): The column containing values to calculate IQR.
+        iqr_lower_quantile (float): The lower quantile for IQR calculation.
+        iqr_upper_quantile (float): The upper quantile for IQR calculation.
+        iqr_multiplier (float): The multiplier for the IQR to determine
+            outlier bounds.
 
-    return df
+    Returns:
+        pd.DataFrame: The DataFrame with additional columns for IQR, outlier
+        bounds and 'threshold' columns, indicating which threshold the zscore
+        breached.
+    """
+    df = df.reset_index(drop=True)
+
+    return pd.concat(
+        [
+            df,
+            iqr_columns(
+                df,
+                iqr_prefix,
+                group_col,
+                val_col,
+                iqr_lower_quantile,
+                iqr_upper_quantile,
+                iqr_multiplier,
+            ),
+        ],
+        axis=1,
+    )
 
 
 def calc_lad_mean(
@@ -191,9 +288,9 @@ def calc_lad_mean(
     non_outlier_df = df[~df["master_flag"]]
 
     # Aggregate GDHI values for non-outlier LSOAs by LADs
-    non_outlier_df = non_outlier_df.groupby(["lad_code", "year"]).agg(
-        mean_non_out_gdhi=("uncon_gdhi", "mean")
-    )
+    non_outlier_df = non_outlier_df.groupby(
+        ["lad_code", "year"], observed=True
+    ).agg(mean_non_out_gdhi=("uncon_gdhi", "mean"))
 
     df = df.join(non_outlier_df, on=["lad_code", "year"], how="left")
     df = df[df["master_flag"]].reset_index(drop=True)
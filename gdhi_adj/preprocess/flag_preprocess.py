@@ -21,7 +21,9 @@ def flag_rollback_years(df: pd.DataFrame) -> pd.DataFrame:
         (df["backward_pct_change"] == 1.0) | (df["forward_pct_change"] == 1.0)
     ) & (df["year"].between(2010, 2014))
 
-    # Create a new column 'rollback_flag' based on the mask
+    # Create a new column 'rollback_flag' based on the mask, on a shallow
+    # copy so that df is left unchanged
+    df = df.copy(deep=False)
     df["rollback_flag"] = np.where(rollback_mask, True, False)
 
     return df
@@ -47,7 +49,7 @@ def create_master_flag(
         z_score_cols = [col for col in df.columns if col.startswith("z_")]
         # Create a master flag that is True if any of the IQR columns are True
         # Only group by LSOA as if any year is flagged, the LSOA is flagged
-        z_count = df.groupby("lsoa_code").agg(
+        z_count = df.groupby("lsoa_code", observed=True).agg(
             {col: "sum" for col in z_score_cols}
         )
         z_count["master_z_flag"] = (z_count[z_score_cols] >= 1).sum(
@@ -63,7 +65,7 @@ def create_master_flag(
         iqr_score_cols = [col for col in df.columns if col.startswith("iqr_")]
         # Create a master flag that is True if any of the IQR columns are True
         # Only group by LSOA as if any year is flagged, the LSOA is flagged
-        iqr_count = df.groupby("lsoa_code").agg(
+        iqr_count = df.groupby("lsoa_code", observed=True).agg(
             {col: "sum" for col in iqr_score_cols}
         )
         iqr_count["master_iqr_flag"] = (iqr_count[iqr_score_cols] >= 1).sum(
@@ -77,6 +79,7 @@ def create_master_flag(
 
     # Create a master flag that is True if all master flags are True.
     flag_cols = [col for col in df.columns if col.startswith("master_")]
+    df = df.copy(deep=False)
     df["master_flag"] = df[flag_cols].all(axis=1)
 
     return df
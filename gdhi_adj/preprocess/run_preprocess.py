@@ -1,15 +1,16 @@
 """Module for pre-processing data in the gdhi_adj project."""
 
-import os
+from concurrent.futures import ProcessPoolExecutor
 
+import numpy as np
 import pandas as pd
 
 from gdhi_adj.adjustment.filter_adjustment import filter_year
 from gdhi_adj.preprocess.calc_preprocess import (
-    calc_iqr,
     calc_lad_mean,
     calc_rate_of_change,
-    calc_zscores,
+    iqr_columns,
+    zscore_columns,
 )
 from gdhi_adj.preprocess.flag_preprocess import (
     create_master_flag,
@@ -24,14 +25,518 @@ from gdhi_adj.preprocess.pivot_preprocess import (
     pivot_wide_dataframe,
     pivot_years_long_dataframe,
 )
-from gdhi_adj.utils.helpers import read_with_schema, write_with_schema
+from gdhi_adj.utils.checkpoint import Checkpointer
+from gdhi_adj.utils.dtypes import compact_dtypes, expand_dtypes
+from gdhi_adj.utils.helpers import (
+    get_user_dir,
+    read_with_schema,
+    write_with_schema,
+)
 from gdhi_adj.utils.logger import GDHI_adj_logger
+from gdhi_adj.utils.scheduler import log_stage_report, run_stages
+from gdhi_adj.utils.stage_recorder import StageRecorder
 
 GDHI_adj_LOGGER = GDHI_adj_logger(__name__)
 logger = GDHI_adj_LOGGER.logger
 
 
-def run_preprocessing(config: dict) -> None:
+def flag_outliers(
+    df: pd.DataFrame,
+    zscore_calculation: bool,
+    iqr_calculation: bool,
+    zscore_upper_threshold: float = 3.0,
+    zscore_lower_threshold: float = -3.0,
+    iqr_lower_quantile: float = 0.25,
+    iqr_upper_quantile: float = 0.75,
+    iqr_multiplier: float = 3.0,
+    detector_threads: int = 1,
+) -> pd.DataFrame:
+    """
+    Calculate z-scores and IQRs if desired, and create master flags.
+
+    Args:
+        df (pd.DataFrame): Long DataFrame with rate of change and rollback
+            flags.
+        zscore_calculation (bool): Whether to calculate z-scores.
+        iqr_calculation (bool): Whether to calculate IQRs.
+        zscore_upper_threshold (float): The upper threshold for z-score flag.
+        zscore_lower_threshold (float): The lower threshold for z-score flag.
+        iqr_lower_quantile (float): The lower quantile for IQR calculation.
+        iqr_upper_quantile (float): The upper quantile for IQR calculation.
+        iqr_multiplier (float): The multiplier for the IQR to determine
+            outlier bounds.
+        detector_threads (int): Number of threads to run the z-score and
+            IQR calculations on.
+
+    Returns:
+        pd.DataFrame: DataFrame with scores and flags.
+    """
+    # Assign prefixes
+    backward_prefix = "bkwd"
+    forward_prefix = "frwd"
+    raw_prefix = "raw"
+
+    # The detectors only read df and each returns its own columns, so they
+    # can run concurrently
+    stages = {}
+    if zscore_calculation:
+        zscore_thresholds = {
+            "zscore_upper_threshold": zscore_upper_threshold,
+            "zscore_lower_threshold": zscore_lower_threshold,
+        }
+        stages[f"{backward_prefix}_zscore"] = (
+            zscore_columns,
+            {
+                "df": df,
+                "score_prefix": backward_prefix,
+                "group_col": "lad_code",
+                "val_col": "backward_pct_change",
+                **zscore_thresholds,
+            },
+            [],
+        )
+        stages[f"{forward_prefix}_zscore"] = (
+            zscore_columns,
+            {
+                "df": df,
+                "score_prefix": forward_prefix,
+                "group_col": "lad_code",
+                "val_col": "forward_pct_change",
+                **zscore_thresholds,
+            },
+            [],
+        )
+
+    if iqr_calculation:
+        stages[f"{raw_prefix}_iqr"] = (
+            iqr_columns,
+            {
+                "df": df,
+                "iqr_prefix": raw_prefix,
+                "group_col": ["lad_code", "year"],
+                "val_col": "uncon_gdhi",
+                "iqr_lower_quantile": iqr_lower_quantile,
+                "iqr_upper_quantile": iqr_upper_quantile,
+                "iqr_multiplier": iqr_multiplier,
+            },
+            [],
+        )
+
+    logger.info(f"Flagging of outliers with {detector_threads} thread(s)")
+    results, report = run_stages(stages, max_workers=detector_threads)
+    log_stage_report(report, "Outlier detector")
+
+    # Join the column sets of every detector before creating master flags
+    df = pd.concat([df] + [results[name] for name in stages], axis=1)
+
+    return create_master_flag(df, zscore_calculation, iqr_calculation)
+
+
+def constrain_outliers(
+    df: pd.DataFrame, ra_lad: pd.DataFrame, transaction_name: str
+) -> pd.DataFrame:
+    """
+    Keep flagged LSOAs and constrain them to regional accounts.
+
+    Args:
+        df (pd.DataFrame): Long DataFrame with scores and flags.
+        ra_lad (pd.DataFrame): Long regional accounts DataFrame.
+        transaction_name (str): Transaction to filter regional accounts.
+
+    Returns:
+        pd.DataFrame: Long DataFrame of outliers with their LAD mean, and
+        constrained values of both.
+    """
+    # Keep base data and flags, dropping scores columns
+    flag_cols = [col for col in df.columns if col.startswith("master_")]
+    cols_to_keep = [
+        "lsoa_code",
+        "lsoa_name",
+        "lad_code",
+        "lad_name",
+        "year",
+        "uncon_gdhi",
+    ] + flag_cols
+
+    df = df[cols_to_keep]
+
+    logger.info("Calculating LAD mean and constraining to regional accounts")
+    df = calc_lad_mean(df)
+
+    return constrain_to_reg_acc(df, ra_lad, transaction_name)
+
+
+def preprocess_lads(
+    df: pd.DataFrame,
+    ra_lad: pd.DataFrame,
+    transaction_name: str,
+    **flag_settings,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Flag outliers and constrain them to regional accounts.
+
+    Every calculation is within an LSOA or a (LAD, year), so this can be run
+    on any set of whole LADs.
+
+    Args:
+        df (pd.DataFrame): Long DataFrame with rate of change and rollback
+            flags.
+        ra_lad (pd.DataFrame): Long regional accounts DataFrame.
+        transaction_name (str): Transaction to filter regional accounts.
+        **flag_settings: Keyword arguments passed on to flag_outliers.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: The interim DataFrame with scores
+        and flags, and the constrained outliers.
+    """
+    df = flag_outliers(df, **flag_settings)
+
+    return df, constrain_outliers(df, ra_lad, transaction_name)
+
+
+def partition_lads_balanced(df: pd.DataFrame, n_partitions: int) -> list:
+    """
+    Split a DataFrame into partitions of whole LADs with similar row counts.
+
+    LADs are assigned largest first to the partition with the fewest rows,
+    with ties broken by lad_code and partition number, so the partitions
+    are the same on every run.
+
+    Args:
+        df (pd.DataFrame): DataFrame with a lad_code column.
+        n_partitions (int): Maximum number of partitions.
+
+    Returns:
+        list: Non-empty DataFrames, each keeping the row order of df.
+    """
+    lad_rows = df.groupby("lad_code", observed=True).size()
+    lad_rows = lad_rows.iloc[
+        np.lexsort((lad_rows.index.to_numpy(), -lad_rows.to_numpy()))
+    ]
+
+    partition_rows = np.zeros(n_partitions, dtype="int64")
+    lad_partition = {}
+    for lad_code, rows in lad_rows.items():
+        partition = int(np.argmin(partition_rows))
+        lad_partition[lad_code] = partition
+        partition_rows[partition] += rows
+
+    partition_of_row = df["lad_code"].map(lad_partition)
+
+    return [
+        part
+        for _, part in df.groupby(partition_of_row, sort=True, observed=True)
+    ]
+
+
+# Regional accounts data shared by every partition, set once per worker
+_PARTITION_INPUTS: dict = {}
+
+
+def _init_partition_worker(partition_inputs: dict):
+    """Store the shared partition inputs in a worker process."""
+    _PARTITION_INPUTS.update(partition_inputs)
+
+
+def _preprocess_partition(df: pd.DataFrame) -> tuple:
+    """Preprocess one partition of LADs in a worker process."""
+    return preprocess_lads(df, **_PARTITION_INPUTS)
+
+
+def preprocess_lad_partitions(
+    df: pd.DataFrame,
+    ra_lad: pd.DataFrame,
+    transaction_name: str,
+    max_workers: int,
+    **flag_settings,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Run preprocess_lads on balanced partitions of LADs in worker processes.
+
+    The partition outputs are put back in (lsoa_code, year) order, which is
+    the order of the serial path, so the results are identical to
+    preprocess_lads on the whole DataFrame at any number of workers.
+
+    Args:
+        df (pd.DataFrame): Long DataFrame with rate of change and rollback
+            flags, sorted by lsoa_code and year.
+        ra_lad (pd.DataFrame): Long regional accounts DataFrame.
+        transaction_name (str): Transaction to filter regional accounts.
+        max_workers (int): Number of worker processes and partitions.
+        **flag_settings: Keyword arguments passed on to flag_outliers.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: The interim DataFrame with scores
+        and flags, and the constrained outliers.
+    """
+    partitions = partition_lads_balanced(df, max_workers)
+    logger.info(
+        f"Preprocessing {df['lad_code'].nunique()} LADs in"
+        f" {len(partitions)} partitions"
+    )
+
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_partition_worker,
+        initargs=(
+            {
+                "ra_lad": ra_lad,
+                "transaction_name": transaction_name,
+                **flag_settings,
+            },
+        ),
+    ) as executor:
+        results = list(executor.map(_preprocess_partition, partitions))
+
+    return tuple(
+        pd.concat(parts, ignore_index=True)
+        .sort_values(["lsoa_code", "year"], kind="stable")
+        .reset_index(drop=True)
+        for parts in zip(*results)
+    )
+
+
+def calc_rates_of_change(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Calculate backward and forward rates of change and flag rollback years.
+
+    Args:
+        df (pd.DataFrame): Long DataFrame of unconstrained GDHI by LSOA.
+
+    Returns:
+        pd.DataFrame: DataFrame with rates of change and rollback flags.
+    """
+    df = calc_rate_of_change(
+        df,
+        ascending=False,
+        sort_cols=["lsoa_code", "year"],
+        group_col="lsoa_code",
+        val_col="uncon_gdhi",
+    )
+    df = calc_rate_of_change(
+        df,
+        ascending=True,
+        sort_cols=["lsoa_code", "year"],
+        group_col="lsoa_code",
+        val_col="uncon_gdhi",
+    )
+    return flag_rollback_years(df)
+
+
+def load_preprocessing_settings(user_settings: dict) -> dict:
+    """
+    Resolve the preprocessing settings from the user settings.
+
+    Args:
+        user_settings (dict): The user_settings section of the config.
+
+    Returns:
+        dict: The year range, transaction name, number of worker
+        processes and memory budget settings, and the keyword arguments
+        passed on to flag_outliers under flag_settings.
+    """
+    return {
+        "start_year": user_settings["start_year"],
+        "end_year": user_settings["end_year"],
+        "transaction_name": user_settings["transaction_name"],
+        "preprocess_workers": user_settings.get("preprocess_workers", 1),
+        "memory_budget": user_settings.get("memory_budget", False),
+        "float32_scores": user_settings.get("float32_scores", False),
+        "flag_settings": {
+            "zscore_calculation": user_settings["zscore_calculation"],
+            "iqr_calculation": user_settings["iqr_calculation"],
+            "zscore_upper_threshold": user_settings["zscore_upper_threshold"],
+            "zscore_lower_threshold": user_settings["zscore_lower_threshold"],
+            "iqr_lower_quantile": user_settings["iqr_lower_quantile"],
+            "iqr_upper_quantile": user_settings["iqr_upper_quantile"],
+            "iqr_multiplier": user_settings["iqr_multiplier"],
+            "detector_threads": user_settings.get("detector_threads", 1),
+        },
+    }
+
+
+def pivot_preprocessed_wide(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Pivot the constrained outliers and their LAD means wide for PowerBI.
+
+    Args:
+        df (pd.DataFrame): Long DataFrame of constrained outliers from
+            constrain_outliers.
+
+    Returns:
+        pd.DataFrame: Wide DataFrame with a row of outlier values and a row
+        of LAD mean values per LSOA.
+    """
+    # Pivot outlier df
+    df_outlier = df.drop(columns=["mean_non_out_gdhi", "conlsoa_mean"])
+    df_outlier = pivot_output_long(df_outlier, "uncon_gdhi", "conlsoa_gdhi")
+    df_outlier = pivot_wide_dataframe(df_outlier)
+
+    # Pivot mean df
+    df_mean = df.drop(columns=["uncon_gdhi", "conlsoa_gdhi"])
+    df_mean = pivot_output_long(df_mean, "mean_non_out_gdhi", "conlsoa_mean")
+    df_mean = pivot_wide_dataframe(df_mean)
+    df_mean["master_flag"] = "MEAN"
+
+    return concat_wide_dataframes(df_outlier, df_mean)
+
+
+def preprocess_frames(
+    df: pd.DataFrame,
+    ra_lad: pd.DataFrame,
+    settings: dict,
+    recorder: StageRecorder = None,
+    checkpoints: Checkpointer = None,
+    input_stages: tuple = ("read_unconstrained", "read_ra_lad"),
+) -> dict:
+    """
+    Run steps 3 to 9 of run_preprocessing on data read with its schemas.
+
+    The input DataFrames are not changed and no files are written. If
+    memory_budget is set, the long frames are worked on with compact dtypes
+    from compact_dtypes. The constrained and wide outputs are expanded back
+    to the usual dtypes, while the interim DataFrame is returned compact and
+    expanded with expand_dtypes when it is saved.
+
+    Args:
+        df (pd.DataFrame): Wide unconstrained GDHI by LSOA.
+        ra_lad (pd.DataFrame): Wide regional accounts by LAD.
+        settings (dict): Settings from load_preprocessing_settings.
+        recorder (StageRecorder, optional): Recorder to measure each step
+            with, steps are not measured if not given.
+        checkpoints (Checkpointer, optional): Checkpointer to save and reuse
+            the output of each step, steps always run if not given.
+        input_stages (tuple): Names of the checkpointed stages that produced
+            the two input DataFrames.
+
+    Returns:
+        dict: The long interim DataFrame with scores and flags, the long
+        constrained outliers and the wide output for PowerBI, keyed by
+        "interim", "constrained" and "output".
+    """
+    recorder = recorder or StageRecorder(enabled=False)
+    checkpoints = checkpoints or Checkpointer(enabled=False)
+    start_year = settings["start_year"]
+    end_year = settings["end_year"]
+    transaction_name = settings["transaction_name"]
+    flag_settings = settings["flag_settings"]
+    memory_budget = settings["memory_budget"]
+    float32_scores = settings["float32_scores"]
+    read_unconstrained, read_ra_lad = input_stages
+
+    logger.info("Pivoting data to long format")
+    with recorder.stage("pivot_long", df) as stage:
+        df = checkpoints.run(
+            "pivot_long",
+            pivot_years_long_dataframe,
+            df,
+            new_var_col="year",
+            new_val_col="uncon_gdhi",
+            depends_on=(read_unconstrained,),
+        )
+        ra_lad = checkpoints.run(
+            "pivot_ra_lad_long",
+            pivot_years_long_dataframe,
+            ra_lad,
+            new_var_col="year",
+            new_val_col="uncon_gdhi",
+            depends_on=(read_ra_lad,),
+        )
+        stage.output(df)
+
+    logger.info("Filtering data for specified years")
+    with recorder.stage("filter_year", df) as stage:
+        df = checkpoints.run(
+            "filter_year",
+            filter_year,
+            df,
+            start_year,
+            end_year,
+            depends_on=("pivot_long",),
+            settings=[start_year, end_year],
+        )
+        stage.output(df)
+
+    # Compact dtypes change the outputs of the following stages, so they are
+    # only part of the checkpoint settings when used
+    compact_settings = None
+    if memory_budget:
+        with recorder.stage("compact_working_frame", df) as stage:
+            df = compact_dtypes(df)
+            stage.output(df)
+        compact_settings = {"memory_budget": True}
+
+    logger.info("Calculating rate of change")
+    with recorder.stage("rate_of_change", df) as stage:
+        df = checkpoints.run(
+            "rate_of_change",
+            calc_rates_of_change,
+            df,
+            depends_on=("filter_year",),
+            settings=compact_settings,
+        )
+        stage.output(df)
+
+    # Worker and thread counts do not change the outputs, so they are left
+    # out of the checkpoint settings
+    flag_checkpoint_settings = {
+        key: value
+        for key, value in flag_settings.items()
+        if key != "detector_threads"
+    }
+    flag_checkpoint_settings["transaction_name"] = transaction_name
+    with recorder.stage("flag_and_constrain", df) as stage:
+        if settings["preprocess_workers"] == 1:
+            df, df_constrained = checkpoints.run(
+                "flag_and_constrain",
+                preprocess_lads,
+                df,
+                ra_lad,
+                transaction_name,
+                depends_on=("rate_of_change", "pivot_ra_lad_long"),
+                settings=flag_checkpoint_settings,
+                **flag_settings,
+            )
+        else:
+            df, df_constrained = checkpoints.run(
+                "flag_and_constrain",
+                preprocess_lad_partitions,
+                df,
+                ra_lad,
+                transaction_name,
+                settings["preprocess_workers"],
+                depends_on=("rate_of_change", "pivot_ra_lad_long"),
+                settings=flag_checkpoint_settings,
+                **flag_settings,
+            )
+        stage.output(df_constrained)
+
+    if memory_budget:
+        with recorder.stage("compact_interim", df) as stage:
+            df = compact_dtypes(df, float32_scores)
+            stage.output(df)
+
+    logger.info("Pivoting data back to wide format")
+    with recorder.stage("pivot_wide", df_constrained) as stage:
+        df_output = pivot_preprocessed_wide(df_constrained)
+        stage.output(df_output)
+
+    if memory_budget:
+        df_constrained = expand_dtypes(df_constrained)
+        df_output = expand_dtypes(df_output)
+
+    return {
+        "interim": df,
+        "constrained": df_constrained,
+        "output": df_output,
+    }
+
+
+def run_preprocessing(
+    config: dict,
+    recorder: StageRecorder = None,
+    checkpoints: Checkpointer = None,
+) -> dict:
     """
     Run the preprocessing steps for the GDHI adjustment project.
 
@@ -42,35 +547,47 @@ def run_preprocessing(config: dict) -> None:
     4. Calculate percentage rate of change and flag rollback years.
     5. Calculate z-scores and IQRs if desired as per config.
     6. Create master flags.
-    7. Save interim data with all calculated values.
-    8. Calculate LAD mean GDHI.
-    9. Constrain outliers to regional accounts.
-    10. Pivot the DataFrame back to wide format.
+    7. Calculate LAD mean GDHI.
+    8. Constrain outliers to regional accounts.
+    9. Pivot the DataFrame back to wide format.
+    10. Save interim data with all calculated values.
     11. Save the preprocessed data ready for PowerBI analysis.
 
+    Steps 5 to 8 are within an LSOA or a (LAD, year), so if
+    preprocess_workers is more than 1 they run on partitions of LADs in
+    worker processes. Steps 3 to 9 are in preprocess_frames. Steps 10 and
+    11 are skipped if save_preprocessing_outputs is false, e.g. when the
+    outputs are passed on to adjustment in memory.
+
     Args:
         config (dict): Configuration dictionary containing user settings and
         pipeline settings.
+        recorder (StageRecorder, optional): Recorder to measure each step
+        with, steps are not measured if not given.
+        checkpoints (Checkpointer, optional): Checkpointer to save and reuse
+        the output of each step, steps always run if not given.
     Returns:
-        None: The function does not return any value. It saves the processed
-        DataFrame to a CSV file.
+        dict: The unconstrained and regional accounts data as read with
+        their schemas, keyed by "unconstrained" and "ra_lad", and the
+        outputs of preprocess_frames.
     """
     logger.info("Preprocessing started")
+    recorder = recorder or StageRecorder(enabled=False)
+    checkpoints = checkpoints or Checkpointer(enabled=False)
 
     logger.info("Loading configuration settings")
     local_or_shared = config["user_settings"]["local_or_shared"]
     filepath_dict = config[f"preprocessing_{local_or_shared}_settings"]
     schema_path = config["pipeline_settings"]["schema_path"]
+    user_dir = get_user_dir(config)
 
     input_unconstrained_file_path = (
-        "C:/Users/"
-        + os.getlogin()
+        user_dir
         + filepath_dict["input_dir"]
         + filepath_dict["input_unconstrained_file_path"]
     )
     input_ra_lad_file_path = (
-        "C:/Users/"
-        + os.getlogin()
+        user_dir
         + filepath_dict["input_dir"]
         + filepath_dict["input_ra_lad_file_path"]
     )
@@ -90,22 +607,10 @@ def run_preprocessing(config: dict) -> None:
         schema_path + config["pipeline_settings"]["input_ra_lad_schema_name"]
     )
 
-    start_year = config["user_settings"]["start_year"]
-    end_year = config["user_settings"]["end_year"]
-
-    zscore_calculation = config["user_settings"]["zscore_calculation"]
-    iqr_calculation = config["user_settings"]["iqr_calculation"]
-
-    zscore_upper_threshold = config["user_settings"]["zscore_upper_threshold"]
-    zscore_lower_threshold = config["user_settings"]["zscore_lower_threshold"]
-
-    iqr_lower_quantile = config["user_settings"]["iqr_lower_quantile"]
-    iqr_upper_quantile = config["user_settings"]["iqr_upper_quantile"]
-    iqr_multiplier = config["user_settings"]["iqr_multiplier"]
+    settings = load_preprocessing_settings(config["user_settings"])
+    flag_settings = settings["flag_settings"]
 
-    transaction_name = config["user_settings"]["transaction_name"]
-
-    output_dir = "C:/Users/" + os.getlogin() + filepath_dict["output_dir"]
+    output_dir = user_dir + filepath_dict["output_dir"]
     output_schema_path = (
         schema_path
         + config["pipeline_settings"]["output_preprocess_schema_path"]
@@ -117,90 +622,44 @@ def run_preprocessing(config: dict) -> None:
     logger.info("Configuration settings loaded successfully")
 
     logger.info("Reading in data with schemas")
-    df = read_with_schema(
-        input_unconstrained_file_path, input_gdhi_schema_path
-    )
-    ra_lad = read_with_schema(input_ra_lad_file_path, input_ra_lad_schema_path)
-
-    logger.info("Pivoting data to long format")
-    df = pivot_years_long_dataframe(
-        df, new_var_col="year", new_val_col="uncon_gdhi"
-    )
-    ra_lad = pivot_years_long_dataframe(
-        ra_lad, new_var_col="year", new_val_col="uncon_gdhi"
-    )
-
-    logger.info("Filtering data for specified years")
-    df = filter_year(df, start_year, end_year)
-
-    logger.info("Calculating rate of change")
-    df = calc_rate_of_change(
-        df,
-        ascending=False,
-        sort_cols=["lsoa_code", "year"],
-        group_col="lsoa_code",
-        val_col="uncon_gdhi",
-    )
-    df = calc_rate_of_change(
-        df,
-        ascending=True,
-        sort_cols=["lsoa_code", "year"],
-        group_col="lsoa_code",
-        val_col="uncon_gdhi",
-    )
-    df = flag_rollback_years(df)
-
-    # Assign prefixes
-    backward_prefix = "bkwd"
-    forward_prefix = "frwd"
-    raw_prefix = "raw"
-
-    logger.info("Flagging of outliers")
-    if zscore_calculation:
-
-        logger.info("Calculating z-scores")
-        df = calc_zscores(
-            df,
-            score_prefix=backward_prefix,
-            group_col="lad_code",
-            val_col="backward_pct_change",
-            zscore_upper_threshold=zscore_upper_threshold,
-            zscore_lower_threshold=zscore_lower_threshold,
+    with recorder.stage("read_inputs") as stage:
+        df = checkpoints.run(
+            "read_unconstrained",
+            read_with_schema,
+            input_unconstrained_file_path,
+            input_gdhi_schema_path,
+            files=[input_unconstrained_file_path, input_gdhi_schema_path],
         )
-        df = calc_zscores(
-            df,
-            score_prefix=forward_prefix,
-            group_col="lad_code",
-            val_col="forward_pct_change",
-            zscore_upper_threshold=zscore_upper_threshold,
-            zscore_lower_threshold=zscore_lower_threshold,
+        ra_lad = checkpoints.run(
+            "read_ra_lad",
+            read_with_schema,
+            input_ra_lad_file_path,
+            input_ra_lad_schema_path,
+            files=[input_ra_lad_file_path, input_ra_lad_schema_path],
         )
+        recorder.record_input(input_unconstrained_file_path)
+        recorder.record_input(input_ra_lad_file_path)
+        stage.output(df)
 
-    if iqr_calculation:
-
-        logger.info("Calculating IQRs")
-        df = calc_iqr(
-            df,
-            iqr_prefix=raw_prefix,
-            group_col=["lad_code", "year"],
-            val_col="uncon_gdhi",
-            iqr_lower_quantile=iqr_lower_quantile,
-            iqr_upper_quantile=iqr_upper_quantile,
-            iqr_multiplier=iqr_multiplier,
-        )
+    results = preprocess_frames(df, ra_lad, settings, recorder, checkpoints)
+    results.update(unconstrained=df, ra_lad=ra_lad)
 
-    df = create_master_flag(df, zscore_calculation, iqr_calculation)
+    if not config["user_settings"].get("save_preprocessing_outputs", True):
+        logger.info("Preprocessing outputs are not saved")
+        return results
 
     logger.info("Saving interim data")
     qa_df = pd.DataFrame(
         {
             "config": [
-                f"zscore_lower_threshold = {zscore_lower_threshold}",
-                f"zscore_upper_threshold = {zscore_upper_threshold}",
-                f"iqr_lower_quantile = {iqr_lower_quantile}",
-                f"iqr_upper_quantile = {iqr_upper_quantile}",
-                f"iqr_multiplier = {iqr_multiplier}",
-                f"transaction_name = {transaction_name}",
+                "zscore_lower_threshold = "
+                f"{flag_settings['zscore_lower_threshold']}",
+                "zscore_upper_threshold = "
+                f"{flag_settings['zscore_upper_threshold']}",
+                f"iqr_lower_quantile = {flag_settings['iqr_lower_quantile']}",
+                f"iqr_upper_quantile = {flag_settings['iqr_upper_quantile']}",
+                f"iqr_multiplier = {flag_settings['iqr_multiplier']}",
+                f"transaction_name = {settings['transaction_name']}",
             ],
         }
     )
@@ -211,45 +670,19 @@ def run_preprocessing(config: dict) -> None:
     )
 
     logger.info(f"{output_dir + interim_filename}")
-    df.to_csv(
-        output_dir + interim_filename,
-        index=False,
-    )
+    with recorder.stage("save_interim", results["interim"]):
+        expand_dtypes(results["interim"]).to_csv(
+            output_dir + interim_filename,
+            index=False,
+        )
     logger.info("Data saved successfully")
 
-    # Keep base data and flags, dropping scores columns
-    flag_cols = [col for col in df.columns if col.startswith("master_")]
-    cols_to_keep = [
-        "lsoa_code",
-        "lsoa_name",
-        "lad_code",
-        "lad_name",
-        "year",
-        "uncon_gdhi",
-    ] + flag_cols
-
-    df = df[cols_to_keep]
-
-    logger.info("Calculating LAD mean and constraining to regional accounts")
-    df = calc_lad_mean(df)
-
-    df = constrain_to_reg_acc(df, ra_lad, transaction_name)
-
-    logger.info("Pivoting data back to wide format")
-    # Pivot outlier df
-    df_outlier = df.drop(columns=["mean_non_out_gdhi", "conlsoa_mean"])
-    df_outlier = pivot_output_long(df_outlier, "uncon_gdhi", "conlsoa_gdhi")
-    df_outlier = pivot_wide_dataframe(df_outlier)
-
-    # Pivot mean df
-    df_mean = df.drop(columns=["uncon_gdhi", "conlsoa_gdhi"])
-    df_mean = pivot_output_long(df_mean, "mean_non_out_gdhi", "conlsoa_mean")
-    df_mean = pivot_wide_dataframe(df_mean)
-    df_mean["master_flag"] = "MEAN"
-
-    df = concat_wide_dataframes(df_outlier, df_mean)
-
     # Save output file with new filename if specified
     if config["user_settings"]["output_data"]:
         # Write DataFrame to CSV
-        write_with_schema(df, output_schema_path, output_dir, new_filename)
+        with recorder.stage("save_output", results["output"]):
+            write_with_schema(
+                results["output"], output_schema_path, output_dir, new_filename
+            )
+
+    return results
@@ -0,0 +1,286 @@
+"""Define checkpoints that let a failed pipeline run resume part way."""
+
+import hashlib
+import json
+import os
+import pickle
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable
+
+from gdhi_adj.utils.logger import GDHI_adj_logger
+from gdhi_adj.utils.stage_cache import StageCache, code_fingerprint
+
+GDHI_adj_LOGGER = GDHI_adj_logger(__name__)
+logger = GDHI_adj_LOGGER.logger
+
+MANIFEST_FILENAME = "manifest.json"
+
+MB = 1024**2
+
+
+def hash_settings(settings) -> str:
+    """
+    Hash JSON serialisable settings, independent of dictionary order.
+
+    Args:
+        settings: Settings to hash, e.g. a config dictionary.
+
+    Returns:
+        str: Hex digest of the settings.
+    """
+    return hashlib.sha1(
+        json.dumps(settings, sort_keys=True, default=str).encode()
+    ).hexdigest()
+
+
+def file_stamp(path: str) -> list:
+    """
+    Identify the version of an input file by its size and modified time.
+
+    Args:
+        path (str): Path to the file.
+
+    Returns:
+        list: Path, size in bytes and modified time in nanoseconds.
+    """
+    stat = os.stat(path)
+    return [path, stat.st_size, stat.st_mtime_ns]
+
+
+def file_digest(path: str) -> str:
+    """
+    Identify the contents of an input file.
+
+    Args:
+        path (str): Path to the file.
+
+    Returns:
+        str: Hex digest of the file's contents.
+    """
+    digest = hashlib.sha1()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(MB), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class Checkpointer:
+    """
+    Save the output of each pipeline stage and reuse it when resuming.
+
+    Each stage has a key made from its name, its settings, the contents of
+    the files it reads and the keys of the stages it depends on. A stage
+    whose key matches a checkpoint in the manifest is loaded instead of
+    run, so stages are only run again when something they depend on has
+    changed.
+
+    With a cache, a stage missing from the run's checkpoints is also looked
+    up in outputs saved by earlier runs of the same code, so rerunning with
+    unchanged inputs and settings does not recompute anything.
+
+    Attributes:
+        folder (str): Folder of the run's checkpoints and manifest.
+        run_id (str): ID of the run the checkpoints belong to.
+        enabled (bool): Whether outputs are saved and loaded.
+        cache (StageCache): Outputs shared between runs, None to not cache.
+        keys (dict): Key of each stage run or loaded in this run.
+        section (str): Part of the pipeline the next stages belong to.
+    """
+
+    def __init__(
+        self,
+        folder: str = None,
+        run_id: str = None,
+        config: dict = None,
+        enabled: bool = True,
+        cache: StageCache = None,
+    ):
+        self.folder = folder
+        self.run_id = run_id
+        self.enabled = enabled
+        self.cache = cache
+        self.keys = {}
+        self.section = None
+        self._file_digests = {}
+
+        self.manifest = {
+            "run_id": run_id,
+            "config_hash": hash_settings(config),
+            "stages": {},
+        }
+        if not enabled:
+            return
+
+        manifest_path = os.path.join(folder, MANIFEST_FILENAME)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as file:
+                self.manifest["stages"] = json.load(file)["stages"]
+            logger.info(
+                f"Found {len(self.manifest['stages'])} checkpoint(s) for run"
+                f" {run_id}"
+            )
+
+    @contextmanager
+    def in_section(self, section: str):
+        """
+        Prefix the names of stages inside the with block with a section.
+
+        Args:
+            section (str): Part of the pipeline, e.g. "preprocessing".
+        """
+        previous, self.section = self.section, section
+        try:
+            yield self
+        finally:
+            self.section = previous
+
+    def _full_name(self, name: str) -> str:
+        """Stage name prefixed with the current section."""
+        return name if self.section is None else f"{self.section}.{name}"
+
+    def stage_key(
+        self,
+        name: str,
+        depends_on: list = (),
+        files: list = (),
+        settings=None,
+    ) -> str:
+        """
+        Calculate the key of a stage.
+
+        Args:
+            name (str): Name of the stage.
+            depends_on (list): Names of stages whose outputs are inputs.
+            files (list): Paths of files the stage reads.
+            settings: JSON serialisable settings used by the stage.
+
+        Returns:
+            str: Hex digest identifying the stage and its inputs.
+
+        Raises:
+            KeyError: If a stage depended on has not run yet.
+        """
+        return hash_settings(
+            {
+                "stage": self._full_name(name),
+                "depends_on": [
+                    self.keys[self._full_name(dep)] for dep in depends_on
+                ],
+                "files": [self._file_digest(path) for path in files],
+                "settings": settings,
+            }
+        )
+
+    def link(self, name: str, source: str):
+        """
+        Give a stage the key of a stage that has already run, for an output
+        passed on in memory instead of being produced again.
+
+        Args:
+            name (str): Name of the stage, in the current section.
+            source (str): Full name of the stage that produced the output,
+                e.g. "preprocessing.read_unconstrained".
+        """
+        if source in self.keys:
+            self.keys[self._full_name(name)] = self.keys[source]
+
+    def _file_digest(self, path: str) -> str:
+        """Digest of a file, hashed once per run unless it changes."""
+        stamp = tuple(file_stamp(path))
+        if stamp not in self._file_digests:
+            self._file_digests[stamp] = file_digest(path)
+        return self._file_digests[stamp]
+
+    def run(
+        self,
+        name: str,
+        func: Callable,
+        *args,
+        depends_on: list = (),
+        files: list = (),
+        settings=None,
+        **kwargs,
+    ):
+        """
+        Load a stage's output from its checkpoint or the cache, or run it
+        and save it.
+
+        Args:
+            name (str): Name of the stage.
+            func (Callable): Function that runs the stage.
+            *args: Positional arguments passed on to func.
+            depends_on (list): Names of stages whose outputs are inputs.
+            files (list): Paths of files the stage reads.
+            settings: JSON serialisable settings used by the stage.
+            **kwargs: Keyword arguments passed on to func.
+
+        Returns:
+            The output of func.
+        """
+        if not self.enabled and self.cache is None:
+            return func(*args, **kwargs)
+
+        full_name = self._full_name(name)
+        key = self.stage_key(name, depends_on, files, settings)
+        self.keys[full_name] = key
+
+        checkpoint = self.manifest["stages"].get(full_name)
+        if (
+            self.enabled
+            and checkpoint is not None
+            and checkpoint["key"] == key
+        ):
+            try:
+                with open(
+                    os.path.join(self.folder, checkpoint["file"]), "rb"
+                ) as file:
+                    output = pickle.load(file)
+                logger.info(f"Loaded {full_name} from checkpoint")
+                return output
+            except (OSError, pickle.UnpicklingError, EOFError) as e:
+                logger.warning(
+                    f"Checkpoint of {full_name} could not be loaded, running"
+                    f" the stage again: {e}"
+                )
+
+        if self.cache is not None:
+            cache_key = hash_settings([key, code_fingerprint()])
+            cached, output = self.cache.get(cache_key)
+            if cached:
+                logger.info(f"Loaded {full_name} from the stage cache")
+                return output
+
+        output = func(*args, **kwargs)
+        saved_path = (
+            self._save(full_name, key, output) if self.enabled else None
+        )
+        if self.cache is not None:
+            self.cache.put(cache_key, output, source_path=saved_path)
+
+        return output
+
+    def _save(self, full_name: str, key: str, output) -> str:
+        """Save a stage output, record it in the manifest and return its
+        path."""
+        os.makedirs(self.folder, exist_ok=True)
+        filename = f"{full_name}.pkl"
+
+        # Write to a temporary file first so an interrupted save never
+        # leaves a partial checkpoint under the real name
+        temp_path = os.path.join(self.folder, filename + ".tmp")
+        with open(temp_path, "wb") as file:
+            pickle.dump(output, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, os.path.join(self.folder, filename))
+
+        self.manifest["stages"][full_name] = {
+            "key": key,
+            "file": filename,
+            "saved": datetime.now().isoformat(timespec="seconds"),
+        }
+        manifest_path = os.path.join(self.folder, MANIFEST_FILENAME)
+        with open(manifest_path + ".tmp", "w") as file:
+            json.dump(self.manifest, file, indent=2)
+        os.replace(manifest_path + ".tmp", manifest_path)
+
+        return os.path.join(self.folder, filename)
@@ -0,0 +1,285 @@
+"""Define loading, overriding and validation of the pipeline config.
+
+This module only uses the standard library and tomli, so the command line
+can check a config without importing pandas.
+"""
+
+import logging
+import os
+import pathlib
+from typing import Union
+
+import tomli  # tomli can be upgraded to tomllib in Python 3.11+
+
+# Settings every run needs, with their type
+REQUIRED_SETTINGS = {
+    "user_settings.local_or_shared": str,
+    "user_settings.start_year": int,
+    "user_settings.end_year": int,
+    "user_settings.output_data": bool,
+    "user_settings.output_data_prefix": str,
+    "user_settings.preprocessing": bool,
+    "user_settings.adjustment": bool,
+    "global.platform": str,
+    "log_filenames.run_report_suffix": str,
+    "pipeline_settings.schema_path": str,
+}
+
+# Settings with a default, checked only if they are set
+OPTIONAL_SETTINGS = {
+    "user_settings.user_dir": str,
+    "user_settings.save_checkpoints": bool,
+    "user_settings.use_cache": bool,
+    "user_settings.cache_max_mb": int,
+    "user_settings.profile_cpu": bool,
+    "user_settings.profile_memory": bool,
+    "user_settings.profile_top_n": int,
+    "user_settings.deep_memory": bool,
+    "user_settings.json_log": bool,
+    "user_settings.zscore_calculation": bool,
+    "user_settings.iqr_calculation": bool,
+    "user_settings.zscore_lower_threshold": float,
+    "user_settings.zscore_upper_threshold": float,
+    "user_settings.iqr_lower_quantile": float,
+    "user_settings.iqr_upper_quantile": float,
+    "user_settings.iqr_multiplier": float,
+    "user_settings.transaction_name": str,
+    "user_settings.preprocess_workers": int,
+    "user_settings.detector_threads": int,
+    "user_settings.save_preprocessing_outputs": bool,
+    "user_settings.memory_budget": bool,
+    "user_settings.float32_scores": bool,
+    "user_settings.sas_code_filter": str,
+    "user_settings.cord_code_filter": str,
+    "user_settings.credit_debit_filter": str,
+    "user_settings.imputation_method": str,
+    "user_settings.edge_policy": str,
+    "user_settings.apportion_strategy": str,
+    "user_settings.batch_components": bool,
+    "user_settings.batch_workers": int,
+    "user_settings.watch_adjustment": bool,
+    "user_settings.chain_adjustment": bool,
+}
+
+# Values a setting can take. The adjustment options match
+# APPORTION_STRATEGIES and EDGE_POLICIES in calc_adjustment.
+SETTING_CHOICES = {
+    "user_settings.local_or_shared": ("local", "shared"),
+    "global.platform": ("local", "shared"),
+    "user_settings.imputation_method": ("midpoint", "interpolate"),
+    "user_settings.edge_policy": ("carry", "extrapolate", "skip"),
+    "user_settings.apportion_strategy": (
+        "equal",
+        "gdhi",
+        "unconstrained",
+        "exclude_adjusted",
+    ),
+}
+
+POSITIVE_SETTINGS = (
+    "user_settings.cache_max_mb",
+    "user_settings.profile_top_n",
+    "user_settings.preprocess_workers",
+    "user_settings.detector_threads",
+    "user_settings.batch_workers",
+)
+
+# Schema files under pipeline_settings.schema_path
+SCHEMA_SETTINGS = (
+    "input_gdhi_schema_name",
+    "input_ra_lad_schema_name",
+    "input_adj_schema_name",
+    "input_constrained_schema_name",
+    "input_unconstrained_schema_name",
+    "output_preprocess_schema_path",
+    "output_adjustment_schema_path",
+)
+
+
+def load_toml_config(path: Union[str, pathlib.Path]) -> dict | None:
+    """Load a .toml file from a path, with logging and safe error handling.
+
+    Args:
+        path (Union[str, pathlib.Path]): The path to load the .toml file from.
+
+    Returns:
+        dict | None: The loaded toml file as a dictionary, or None on error.
+    """
+    logger = logging.getLogger("ConfigLoader")
+    if not os.path.exists(path):
+        logger.error(f"Config file does not exist: {path}")
+        return None
+    ext = os.path.splitext(path)[1]
+    if ext != ".toml":
+        logger.error(f"Expected a .toml file. Got {ext}")
+        return None
+    try:
+        with open(path, "rb") as f:
+            toml_dict = tomli.load(f)
+        return toml_dict
+    except tomli.TOMLDecodeError as e:
+        logger.error(f"Failed to decode TOML file: {e}")
+        return None
+    except Exception as e:
+        logger.error(f"Unexpected error loading TOML file: {e}")
+        return None
+
+
+def parse_override(override: str) -> tuple:
+    """
+    Parse a key=value override of a config setting.
+
+    The key is section.setting, or a user_settings setting if it has no
+    section. The value is read as a TOML value, e.g. 2012, true or
+    "midpoint", and as a string if it is not valid TOML.
+
+    Args:
+        override (str): Override such as "user_settings.start_year=2012".
+
+    Returns:
+        tuple: Section, setting and value.
+
+    Raises:
+        ValueError: If the override has no "=".
+    """
+    key, separator, raw_value = override.partition("=")
+    if not separator or not key.strip():
+        raise ValueError(
+            f"Override '{override}' is not of the form key=value."
+        )
+
+    section, _, name = key.strip().rpartition(".")
+    try:
+        value = tomli.loads(f"value = {raw_value.strip()}")["value"]
+    except tomli.TOMLDecodeError:
+        value = raw_value.strip()
+
+    return section or "user_settings", name, value
+
+
+def apply_overrides(config: dict, overrides: list) -> dict:
+    """
+    Override config settings, e.g. from --set on the command line.
+
+    Args:
+        config (dict): Configuration dictionary, changed in place.
+        overrides (list): Overrides of the form key=value, see
+            parse_override.
+
+    Returns:
+        dict: The configuration with the overrides applied.
+
+    Raises:
+        ValueError: If an override is malformed or names a section that is
+        not in the config.
+    """
+    for override in overrides or []:
+        section, name, value = parse_override(override)
+        if section not in config:
+            raise ValueError(
+                f"Override '{override}' is for section '{section}', which is"
+                " not in the config."
+            )
+        config[section][name] = value
+    return config
+
+
+def _get_setting(config: dict, key: str):
+    """Value of a section.setting key, None if it is not set."""
+    section, name = key.split(".")
+    return config.get(section, {}).get(name)
+
+
+def _is_type(value, expected_type: type) -> bool:
+    """Whether a TOML value has the expected type."""
+    if expected_type is float:
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    if expected_type is int:
+        return isinstance(value, int) and not isinstance(value, bool)
+    return isinstance(value, expected_type)
+
+
+def validate_config(config: dict) -> list:
+    """
+    Check a config has the settings a run needs, with valid values.
+
+    Args:
+        config (dict): Configuration dictionary.
+
+    Returns:
+        list: Description of each problem found, empty if the config is
+        valid.
+    """
+    errors = []
+
+    for key, expected_type in {
+        **REQUIRED_SETTINGS,
+        **OPTIONAL_SETTINGS,
+    }.items():
+        value = _get_setting(config, key)
+        if value is None:
+            if key in REQUIRED_SETTINGS:
+                errors.append(f"{key} is not set.")
+        elif not _is_type(value, expected_type):
+            errors.append(
+                f"{key} should be a {expected_type.__name__}, got"
+                f" {value!r}."
+            )
+        elif key in SETTING_CHOICES and value not in SETTING_CHOICES[key]:
+            errors.append(
+                f"{key} should be one of {SETTING_CHOICES[key]}, got"
+                f" {value!r}."
+            )
+        elif key in POSITIVE_SETTINGS and value < 1:
+            errors.append(f"{key} should be at least 1, got {value}.")
+    if errors:
+        return errors
+
+    settings = config["user_settings"]
+    if settings["start_year"] > settings["end_year"]:
+        errors.append(
+            f"user_settings.start_year ({settings['start_year']}) is after"
+            f" end_year ({settings['end_year']})."
+        )
+    if settings.get("zscore_lower_threshold", 0) >= settings.get(
+        "zscore_upper_threshold", 1
+    ):
+        errors.append(
+            "user_settings.zscore_lower_threshold should be below"
+            " zscore_upper_threshold."
+        )
+    if not (
+        0
+        <= settings.get("iqr_lower_quantile", 0)
+        < settings.get("iqr_upper_quantile", 1)
+        <= 1
+    ):
+        errors.append(
+            "user_settings.iqr_lower_quantile and iqr_upper_quantile should"
+            " be between 0 and 1, lower first."
+        )
+
+    required_sections = [f"{config['global']['platform']}_paths"]
+    for section in ("preprocessing", "adjustment"):
+        if settings[section]:
+            required_sections.append(
+                f"{section}_{settings['local_or_shared']}_settings"
+            )
+    errors.extend(
+        f"Section [{section}] is missing."
+        for section in required_sections
+        if section not in config
+    )
+
+    schema_path = config["pipeline_settings"]["schema_path"]
+    for name in SCHEMA_SETTINGS:
+        schema_name = config["pipeline_settings"].get(name)
+        if schema_name is None:
+            errors.append(f"pipeline_settings.{name} is not set.")
+        elif not os.path.exists(os.path.join(schema_path, schema_name)):
+            errors.append(
+                f"Schema file {os.path.join(schema_path, schema_name)} for"
+                f" pipeline_settings.{name} does not exist."
+            )
+
+    return errors
@@ -0,0 +1,157 @@
+"""Define compact dtypes for the long preprocessing frames.
+
+In memory budget mode the long frames are narrowed while they are worked on,
+and expanded back to the usual dtypes before they are saved, so the outputs
+are unchanged.
+"""
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from gdhi_adj.utils.logger import GDHI_adj_logger
+from gdhi_adj.utils.stage_recorder import frame_stats
+
+GDHI_adj_LOGGER = GDHI_adj_logger(__name__)
+logger = GDHI_adj_LOGGER.logger
+
+GEOGRAPHY_COLS = ["lsoa_code", "lsoa_name", "lad_code", "lad_name"]
+
+# Threshold descriptors from np.select, stored as their position
+THRESHOLD_DESCRIPTORS = (None, "upper", "lower")
+
+# Derived columns that may be stored as float32. GDHI values never are.
+SCORE_SUFFIXES = (
+    "_pct_change",
+    "_zscore",
+    "_q1",
+    "_q3",
+    "_iqr",
+    "_lower_bound",
+    "_upper_bound",
+)
+
+
+def encode_thresholds(descriptors: pd.Series) -> pd.Series:
+    """
+    Encode threshold descriptors as int8 codes.
+
+    Args:
+        descriptors (pd.Series): "upper", "lower" or None.
+
+    Returns:
+        pd.Series: Position of each descriptor in THRESHOLD_DESCRIPTORS.
+    """
+    codes = np.select(
+        [descriptors == "upper", descriptors == "lower"], [1, 2], default=0
+    )
+    return pd.Series(
+        codes.astype("int8"), index=descriptors.index, name=descriptors.name
+    )
+
+
+def decode_thresholds(codes: pd.Series) -> pd.Series:
+    """
+    Decode int8 threshold codes back to descriptors.
+
+    Args:
+        codes (pd.Series): Codes from encode_thresholds.
+
+    Returns:
+        pd.Series: "upper", "lower" or None, as object dtype.
+    """
+    descriptors = np.array(THRESHOLD_DESCRIPTORS, dtype=object)
+    return pd.Series(
+        descriptors[codes.to_numpy()], index=codes.index, name=codes.name
+    )
+
+
+def compact_dtypes(
+    df: pd.DataFrame, float32_scores: bool = False
+) -> pd.DataFrame:
+    """
+    Narrow the dtypes of a long preprocessing DataFrame.
+
+    Geography columns become categories, year becomes int16, threshold
+    descriptors become int8 codes and flag columns without missing values
+    become bools. Score columns become float32 only if float32_scores is
+    set. The sizes before and after, including string contents, are only
+    measured when logging at DEBUG level, as measuring them reads every
+    value.
+
+    Args:
+        df (pd.DataFrame): Long DataFrame, left unchanged.
+        float32_scores (bool): Whether to store score columns as float32.
+
+    Returns:
+        pd.DataFrame: DataFrame with compact dtypes.
+    """
+    dtypes = {}
+    for col in df.columns:
+        dtype = df[col].dtype
+        if col in GEOGRAPHY_COLS and dtype == object:
+            dtypes[col] = "category"
+        elif col == "year" and dtype != "int16":
+            dtypes[col] = "int16"
+        elif col.endswith("_flag") and dtype == object:
+            if df[col].notna().all():
+                dtypes[col] = "bool"
+        elif float32_scores and col.endswith(SCORE_SUFFIXES):
+            if dtype == "float64":
+                dtypes[col] = "float32"
+
+    compact = df.astype(dtypes, copy=False)
+    thresholds = [
+        col
+        for col in compact.columns
+        if col.endswith("_threshold") and compact[col].dtype == object
+    ]
+    if thresholds:
+        compact = compact.assign(
+            **{col: encode_thresholds(compact[col]) for col in thresholds}
+        )
+
+    if logger.isEnabledFor(logging.DEBUG):
+        _, before = frame_stats(df, deep=True)
+        _, after = frame_stats(compact, deep=True)
+        logger.debug(
+            f"Compacted from {before / 1024**2:.2f} MB to"
+            f" {after / 1024**2:.2f} MB"
+        )
+    return compact
+
+
+def expand_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Expand a DataFrame from compact_dtypes back to the usual dtypes.
+
+    Float32 score columns are left as they are, as their precision has
+    already been reduced.
+
+    Args:
+        df (pd.DataFrame): DataFrame with compact dtypes, left unchanged.
+
+    Returns:
+        pd.DataFrame: DataFrame with object geography columns, int64 year
+        and threshold descriptors.
+    """
+    dtypes = {
+        col: object
+        for col in GEOGRAPHY_COLS
+        if col in df.columns and isinstance(df[col].dtype, pd.CategoricalDtype)
+    }
+    if "year" in df.columns and df["year"].dtype == "int16":
+        dtypes["year"] = "int64"
+
+    expanded = df.astype(dtypes, copy=False)
+    thresholds = [
+        col
+        for col in expanded.columns
+        if col.endswith("_threshold") and expanded[col].dtype == "int8"
+    ]
+    if thresholds:
+        expanded = expanded.assign(
+            **{col: decode_thresholds(expanded[col]) for col in thresholds}
+        )
+    return expanded
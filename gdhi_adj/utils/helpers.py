@@ -2,12 +2,9 @@
 
 import logging
 import os
-import pathlib
-from typing import Union
 
 import pandas as pd
 import toml
-import tomli  # tomli can be upgraded to tomllib in Python 3.11+
 
 from gdhi_adj.utils.logger import GDHI_adj_logger
 
@@ -15,33 +12,19 @@ GDHI_adj_LOGGER = GDHI_adj_logger(__name__)
 logger = GDHI_adj_LOGGER.logger
 
 
-def load_toml_config(path: Union[str, pathlib.Path]) -> dict | None:
-    """Load a .toml file from a path, with logging and safe error handling.
+def get_user_dir(config: dict) -> str:
+    """Directory that the configured input and output paths are under.
 
     Args:
-        path (Union[str, pathlib.Path]): The path to load the .toml file from.
+        config (dict): Configuration dictionary.
 
     Returns:
-        dict | None: The loaded toml file as a dictionary, or None on error.
+        str: user_dir from user_settings if set, otherwise the user's
+        folder, C:/Users/<login>.
     """
-    logger = logging.getLogger("ConfigLoader")
-    if not os.path.exists(path):
-        logger.error(f"Config file does not exist: {path}")
-        return None
-    ext = os.path.splitext(path)[1]
-    if ext != ".toml":
-        logger.error(f"Expected a .toml file. Got {ext}")
-        return None
-    try:
-        with open(path, "rb") as f:
-            toml_dict = tomli.load(f)
-        return toml_dict
-    except tomli.TOMLDecodeError as e:
-        logger.error(f"Failed to decode TOML file: {e}")
-        return None
-    except Exception as e:
-        logger.error(f"Unexpected error loading TOML file: {e}")
-        return None
+    return config["user_settings"].get("user_dir") or (
+        "C:/Users/" + os.getlogin()
+    )
 
 
 def load_schema_from_toml(schema_path: str) -> dict:
@@ -107,18 +90,27 @@ def rename_columns(
         logger (logging.Logger): Logger for logging renaming actions.
 
     Returns:
-        pd.DataFrame: The DataFrame with renamed columns.
+        pd.DataFrame: A DataFrame with renamed columns, sharing the data of
+        df, which is left unchanged.
     """
+    columns = list(df.columns)
+    renamed = []
     for new_name, props in schema.items():
         old_name = props.get("old_name")
-        if old_name not in df.columns:
+        if old_name not in columns:
             raise ValueError(
                 f"Column '{old_name}' specified in schema does not exist"
                 " in DataFrame"
             )
-        elif old_name and old_name in df.columns and old_name != new_name:
-            df.rename(columns={old_name: new_name}, inplace=True)
-            logger.info(f"Renamed column '{old_name}' to '{new_name}'")
+        elif old_name and old_name != new_name:
+            columns = [new_name if col == old_name else col for col in columns]
+            renamed.append(f"'{old_name}' to '{new_name}'")
+    if renamed:
+        logger.info(f"Renamed {len(renamed)} columns: {', '.join(renamed)}")
+
+    # A shallow copy gets its own column labels without copying the data
+    df = df.copy(deep=False)
+    df.columns = columns
     return df
 
 
@@ -135,13 +127,18 @@ def convert_column_types(
         logger (logging.Logger): Logger for logging conversion actions.
 
     Returns:
-        pd.DataFrame: The DataFrame with converted column types.
+        pd.DataFrame: A DataFrame with converted column types, df is left
+        unchanged.
 
     Raises:
         Logger.warning: If a column's type conversion fails.
     """
     type_map = {"int": int, "float": float, "str": str, "bool": bool}
 
+    # Assigning a column to a shallow copy replaces it in the copy only
+    df = df.copy(deep=False)
+
+    converted, failed = [], []
     for column, props in schema.items():
         expected_type_str = props.get("Deduced_Data_Type")
         expected_type = type_map.get(expected_type_str)
@@ -161,17 +158,22 @@ def convert_column_types(
                     df[column] = df[column].astype(str)
                 elif expected_type == bool:
                     df[column] = df[column].astype(bool)
-                logger.info(
-                    f"Converted column '{column}' from {original_dtype} to "
-                    f"{expected_type_str}."
+                converted.append(
+                    f"'{column}' from {original_dtype} to {expected_type_str}"
                 )
             except Exception as e:
-                logger.warning(
-                    (
-                        f"Failed to convert column '{column}' from "
-                        f"{original_dtype} to {expected_type_str}: {e}"
-                    )
+                failed.append(
+                    f"'{column}' from {original_dtype} to "
+                    f"{expected_type_str}: {e}"
                 )
+    if converted:
+        logger.info(
+            f"Converted {len(converted)} columns: {', '.join(converted)}."
+        )
+    if failed:
+        logger.warning(
+            f"Failed to convert {len(failed)} columns: {'; '.join(failed)}"
+        )
     return df
 
 
@@ -198,9 +200,9 @@ def read_with_schema(
     logger.info(f"Schema path specified in config: {input_schema_path}")
     logger.info("Loading schema configuration from TOML file")
     expected_schema = load_schema_from_toml(input_schema_path)
-    rename_columns(df, expected_schema, logger)
+    df = rename_columns(df, expected_schema, logger)
     logger.debug(f"Renamed columns based on schema: {expected_schema}")
-    convert_column_types(df, expected_schema, logger)
+    df = convert_column_types(df, expected_schema, logger)
     logger.debug(f"Parsed expected schema: {expected_schema}")
     logger.info("Validating schema")
     # validate_schema(df, expected_schema)
@@ -238,7 +240,7 @@ def write_with_schema(
     logger.info(f"Schema path specified in config: {output_schema_path}")
     logger.info("Loading schema configuration from TOML file")
     expected_schema = load_schema_from_toml(output_schema_path)
-    rename_columns(df, expected_schema, logger)
+    df = rename_columns(df, expected_schema, logger)
     logger.debug(f"Renamed columns based on schema: {expected_schema}")
     logger.info("Validating schema")
     validate_schema(df, expected_schema)
@@ -1,4 +1,35 @@
+"""Define the logging set up shared by every module of the pipeline.
+
+Logging is configured once per process. Records are put on a queue by a
+QueueHandler on the root logger and written to the console, and optionally
+to a JSON-lines file, by a QueueListener thread, so the pipeline never waits
+on log output.
+"""
+
+import atexit
+import json
 import logging
+import logging.handlers
+import os
+import queue
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+
+FORMAT = logging.Formatter(
+    "%(asctime)s (%(levelname)s) %(message)s (%(name)s)",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+
+# Run and stage of the records logged in the current context
+_run_id = ContextVar("run_id", default=None)
+_stage = ContextVar("stage", default=None)
+_run_start = time.perf_counter()
+
+_queue_handler = None
+_listener = None
+_json_path = None
 
 
 class CustomFormatter(logging.Formatter):
@@ -19,16 +50,155 @@ class CustomFormatter(logging.Formatter):
         logging.CRITICAL: bold_red + format + reset,
     }
 
+    def __init__(self):
+        super().__init__()
+        self.formatters = {
+            level: logging.Formatter(log_fmt, datefmt="%Y-%m-%d - %H:%M:%S")
+            for level, log_fmt in self.FORMATS.items()
+        }
+
     def format(self, record):
         """Set color formatting for logger."""
-        log_fmt = self.FORMATS.get(record.levelno)
-        formatter = logging.Formatter(log_fmt, datefmt="%Y-%m-%d - %H:%M:%S")
+        formatter = self.formatters.get(record.levelno, FORMAT)
         return formatter.format(record)
 
 
+class JsonFormatter(logging.Formatter):
+    """Format each record as one line of JSON."""
+
+    def format(self, record):
+        """Format the record with its run ID, stage and elapsed time."""
+        entry = {
+            "time": (
+                datetime.fromtimestamp(record.created).isoformat(
+                    timespec="milliseconds"
+                )
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "run_id": getattr(record, "run_id", None),
+            "stage": getattr(record, "stage", None),
+            "elapsed_s": getattr(record, "elapsed_s", None),
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class ContextFilter(logging.Filter):
+    """Add the run ID, stage and seconds since the run started to records."""
+
+    def filter(self, record):
+        """Add the context fields, keeping any set on the record already."""
+        if not hasattr(record, "run_id"):
+            record.run_id = _run_id.get()
+        if not hasattr(record, "stage"):
+            record.stage = _stage.get()
+        if not hasattr(record, "elapsed_s"):
+            record.elapsed_s = round(time.perf_counter() - _run_start, 3)
+        return True
+
+
+def configure_logging(json_path: str = None, level: int = logging.INFO):
+    """
+    Set up logging through a queue to the console and optionally a file.
+
+    Calling it again replaces the handlers, e.g. to add a JSON-lines file
+    once the run ID is known, without adding handlers twice.
+
+    Args:
+        json_path (str, optional): File to append JSON-lines records to.
+        level (int): Lowest level of the records to write.
+    """
+    global _queue_handler, _listener, _json_path
+
+    _stop_listener()
+
+    handlers = [logging.StreamHandler()]
+    handlers[0].setFormatter(FORMAT)
+    if json_path:
+        os.makedirs(os.path.dirname(json_path) or ".", exist_ok=True)
+        handlers.append(logging.FileHandler(json_path, mode="a"))
+        handlers[1].setFormatter(JsonFormatter())
+    _json_path = json_path
+
+    log_queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(log_queue, *handlers)
+    _listener.start()
+
+    root = logging.getLogger()
+    if _queue_handler is not None:
+        root.removeHandler(_queue_handler)
+    _queue_handler = logging.handlers.QueueHandler(log_queue)
+    _queue_handler.addFilter(ContextFilter())
+    root.addHandler(_queue_handler)
+    root.setLevel(level)
+
+
+def _stop_listener():
+    """Write out queued records and close the listener's handlers."""
+    global _listener
+    if _listener is None:
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+
+
+def _restart_after_fork():
+    """Start a listener in a forked worker, whose thread was not copied."""
+    global _listener
+    if _listener is not None:
+        # The parent's listener thread and queue are not usable here
+        _listener = None
+        configure_logging(_json_path, logging.getLogger().level)
+
+        # multiprocessing workers exit without running atexit functions
+        from multiprocessing import util
+
+        util.Finalize(None, _stop_listener, exitpriority=0)
+
+
+atexit.register(_stop_listener)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def set_run_id(run_id: str):
+    """
+    Label the records logged from now on with a run ID.
+
+    Args:
+        run_id (str): ID of the run.
+    """
+    global _run_start
+    _run_id.set(run_id)
+    _run_start = time.perf_counter()
+
+
+@contextmanager
+def log_stage(stage: str):
+    """
+    Label the records logged inside the with block with a stage.
+
+    Args:
+        stage (str): Name of the stage, e.g. "preprocessing.pivot_long".
+    """
+    token = _stage.set(stage)
+    try:
+        yield
+    finally:
+        _stage.reset(token)
+
+
 class GDHI_adj_logger:
     """Custom logging class for use throughout the GDHI_adj pipeline.
 
+    Logging is configured the first time a logger is created, later
+    loggers share the same handlers.
+
     Parameters
     ----------
     name : str
@@ -37,35 +207,7 @@ class GDHI_adj_logger:
 
     def __init__(self, name):
         """Initialise the logger class."""
-        for handler in logging.root.handlers[:]:
-            logging.root.removeHandler(handler)
+        if _listener is None:
+            configure_logging()
 
         self.logger = logging.getLogger(name)
-
-        # self.LOG_FILE = "logfile.txt"
-        self.FORMAT = logging.Formatter(
-            "%(asctime)s (%(levelname)s) %(message)s (%(name)s)",
-            datefmt="%Y-%m-%d %H:%M:%S",
-        )
-
-        # Set root logging level to ensure handlers receive appropriate logs.
-        self.logger.root.setLevel(logging.INFO)
-        # Set the handlers initialised below.
-        # self._set_file_handler()
-        self._set_stream_handler()
-
-    def _set_file_handler(self):
-        """Set the file handler for the logger to append to text file."""
-        file_handler = logging.FileHandler(self.LOG_FILE, mode="a")
-        file_handler.setLevel(logging.INFO)
-        file_handler.setFormatter(self.FORMAT)
-
-        self.logger.addHandler(file_handler)
-
-    def _set_stream_handler(self):
-        """Set the stream handler for the logger to write to screen."""
-        stream_handler = logging.StreamHandler()
-        stream_handler.setLevel(logging.INFO)
-        stream_handler.setFormatter(self.FORMAT)
-
-        self.logger.addHandler(stream_handler)
@@ -0,0 +1,142 @@
+"""Define a profiler of CPU time and memory allocations per pipeline stage."""
+
+import cProfile
+import os
+import pstats
+import tracemalloc
+from contextlib import contextmanager
+
+from gdhi_adj.utils.logger import GDHI_adj_logger
+
+GDHI_adj_LOGGER = GDHI_adj_logger(__name__)
+logger = GDHI_adj_LOGGER.logger
+
+MB = 1024**2
+
+# Allocation lines written to each stage's allocation report
+REPORT_LINES = 50
+
+
+class StageProfiler:
+    """
+    Profile stages with cProfile and/or tracemalloc.
+
+    Each profiled stage writes <run_id>_<stage>.prof, readable with pstats
+    or snakeviz, and/or <run_id>_<stage>_alloc.txt with the peak traced
+    memory and the lines holding the most memory at the end of the stage.
+    The top hotspots of both are logged.
+
+    cProfile only profiles the thread that runs the stage, so work done in
+    worker threads or processes shows up as time waiting on them.
+    tracemalloc slows every allocation, so CPU times are inflated when both
+    are on.
+
+    Attributes:
+        folder (str): Directory the profiles are written to.
+        run_id (str): ID of the run, used to name the profiles.
+        cpu (bool): Whether stages are profiled with cProfile.
+        memory (bool): Whether allocations are traced with tracemalloc.
+        top_n (int): Number of hotspots logged per stage.
+        files (list): Paths of the profiles written so far.
+    """
+
+    def __init__(
+        self,
+        folder: str,
+        run_id: str,
+        cpu: bool = True,
+        memory: bool = False,
+        top_n: int = 10,
+    ):
+        self.folder = folder
+        self.run_id = run_id
+        self.cpu = cpu
+        self.memory = memory
+        self.top_n = top_n
+        self.files = []
+        os.makedirs(folder, exist_ok=True)
+
+    @contextmanager
+    def profile(self, name: str):
+        """
+        Profile the stage run inside the with block.
+
+        Args:
+            name (str): Name of the stage, e.g. "preprocessing.pivot_long".
+        """
+        prefix = os.path.join(self.folder, f"{self.run_id}_{name}")
+
+        if self.memory:
+            was_tracing = tracemalloc.is_tracing()
+            if was_tracing:
+                tracemalloc.clear_traces()
+                tracemalloc.reset_peak()
+            else:
+                tracemalloc.start()
+        if self.cpu:
+            profile = cProfile.Profile()
+            profile.enable()
+
+        try:
+            yield
+        finally:
+            if self.cpu:
+                profile.disable()
+            if self.memory:
+                snapshot = tracemalloc.take_snapshot()
+                peak = tracemalloc.get_traced_memory()[1]
+                if not was_tracing:
+                    tracemalloc.stop()
+
+            if self.cpu:
+                self._save_cpu_profile(profile, name, prefix + ".prof")
+            if self.memory:
+                self._save_allocations(
+                    snapshot, peak, name, prefix + "_alloc.txt"
+                )
+
+    def _save_cpu_profile(self, profile: cProfile.Profile, name, path):
+        """Dump a cProfile profile and log the functions with most time."""
+        profile.dump_stats(path)
+        self.files.append(path)
+
+        stats = pstats.Stats(profile).stats
+        hotspots = sorted(
+            stats.items(), key=lambda item: item[1][2], reverse=True
+        )[: self.top_n]
+        lines = [
+            f"{tottime:8.3f}s {cumtime:8.3f}s {ncalls:8d}  "
+            f"{pstats.func_std_string(func)}"
+            for func, (_, ncalls, tottime, cumtime, _) in hotspots
+        ]
+        logger.info(
+            f"CPU hotspots of {name} (own time, total time, calls), profile"
+            f" saved to {path}:\n" + "\n".join(lines)
+        )
+
+    def _save_allocations(
+        self, snapshot: tracemalloc.Snapshot, peak: int, name, path
+    ):
+        """Write an allocation report and log the lines with most memory."""
+        # Leave out memory used by the profilers themselves
+        statistics = snapshot.filter_traces(
+            [
+                tracemalloc.Filter(False, module.__file__)
+                for module in (tracemalloc, cProfile)
+            ]
+        ).statistics("lineno")
+        lines = [str(stat) for stat in statistics[:REPORT_LINES]]
+
+        with open(path, "w") as file:
+            file.write(
+                f"Peak traced memory of {name}: {peak / MB:.1f} MB\n"
+                "Memory held at the end of the stage by line:\n"
+                + "\n".join(lines)
+                + "\n"
+            )
+        self.files.append(path)
+
+        logger.info(
+            f"Memory hotspots of {name} (peak {peak / MB:.1f} MB), report"
+            f" saved to {path}:\n" + "\n".join(lines[: self.top_n])
+        )
@@ -0,0 +1,266 @@
+"""Define a SQLite store of run metrics for comparing runs over time."""
+
+import sqlite3
+from contextlib import closing
+
+import pandas as pd
+
+from gdhi_adj.utils.logger import GDHI_adj_logger
+
+GDHI_adj_LOGGER = GDHI_adj_logger(__name__)
+logger = GDHI_adj_LOGGER.logger
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    started TEXT,
+    version TEXT,
+    user TEXT,
+    vintage TEXT,
+    config_hash TEXT,
+    outcome TEXT,
+    error TEXT,
+    total_wall_s REAL,
+    peak_rss_mb REAL
+);
+CREATE TABLE IF NOT EXISTS inputs (
+    run_id TEXT,
+    section TEXT,
+    path TEXT,
+    size_bytes INTEGER
+);
+CREATE TABLE IF NOT EXISTS stages (
+    run_id TEXT,
+    section TEXT,
+    stage TEXT,
+    status TEXT,
+    wall_s REAL,
+    cpu_s REAL,
+    rows_in INTEGER,
+    rows_out INTEGER,
+    memory_in_mb REAL,
+    memory_out_mb REAL,
+    process_peak_rss_mb REAL,
+    peak_rss_increase_mb REAL
+);
+"""
+
+STAGE_COLUMNS = [
+    "section",
+    "stage",
+    "status",
+    "wall_s",
+    "cpu_s",
+    "rows_in",
+    "rows_out",
+    "memory_in_mb",
+    "memory_out_mb",
+    "process_peak_rss_mb",
+    "peak_rss_increase_mb",
+]
+
+
+def _migrate_stages(connection: sqlite3.Connection):
+    """
+    Bring a stages table saved by an earlier version up to date.
+
+    The per-stage peak_rss_mb was the process's peak so far, so it is
+    renamed process_peak_rss_mb, and the increase per stage is added.
+
+    Args:
+        connection (sqlite3.Connection): Connection to the database.
+    """
+    columns = [
+        row[1] for row in connection.execute("PRAGMA table_info(stages)")
+    ]
+    if "peak_rss_mb" in columns:
+        connection.execute(
+            "ALTER TABLE stages RENAME COLUMN peak_rss_mb TO"
+            " process_peak_rss_mb"
+        )
+    if "peak_rss_increase_mb" not in columns:
+        connection.execute(
+            "ALTER TABLE stages ADD COLUMN peak_rss_increase_mb REAL"
+        )
+
+
+class RunMetricsStore:
+    """
+    Metrics of every pipeline run, kept in a SQLite database.
+
+    Each run has one row in the runs table, its input file sizes in the
+    inputs table and its stage measurements in the stages table. Saving a
+    run again, e.g. after resuming it, replaces its previous metrics.
+
+    Attributes:
+        path (str): Path to the SQLite database file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with closing(sqlite3.connect(path)) as connection:
+            with connection:
+                connection.executescript(SCHEMA)
+                _migrate_stages(connection)
+
+    def save_run(
+        self,
+        report: dict,
+        config_hash: str,
+        outcome: str,
+        version: str = None,
+        user: str = None,
+        vintage: str = None,
+        error: str = None,
+    ):
+        """
+        Save the metrics of a run.
+
+        Args:
+            report (dict): Run report from StageRecorder.report.
+            config_hash (str): Hash of the run's config.
+            outcome (str): "completed" or "failed".
+            version (str, optional): Version of gdhi_adj.
+            user (str, optional): User who ran the pipeline.
+            vintage (str, optional): Data vintage of the run's inputs.
+            error (str, optional): Error message of a failed run.
+        """
+        run_id = report["run_id"]
+        with closing(sqlite3.connect(self.path)) as connection:
+            with connection:
+                for table in ["runs", "inputs", "stages"]:
+                    connection.execute(
+                        f"DELETE FROM {table} WHERE run_id = ?", (run_id,)
+                    )
+                connection.execute(
+                    "INSERT INTO runs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        run_id,
+                        report["started"],
+                        version,
+                        user,
+                        vintage,
+                        config_hash,
+                        outcome,
+                        error,
+                        report["total_wall_s"],
+                        report["peak_rss_mb"],
+                    ),
+                )
+                connection.executemany(
+                    "INSERT INTO inputs VALUES (?, ?, ?, ?)",
+                    [
+                        (
+                            run_id,
+                            file["section"],
+                            file["path"],
+                            file["size_bytes"],
+                        )
+                        for file in report.get("inputs", [])
+                    ],
+                )
+                connection.executemany(
+                    f"INSERT INTO stages (run_id, {', '.join(STAGE_COLUMNS)})"
+                    f" VALUES (?{', ?' * len(STAGE_COLUMNS)})",
+                    [
+                        (run_id, *[stage[col] for col in STAGE_COLUMNS])
+                        for stage in report["stages"]
+                    ],
+                )
+        logger.info(f"Run metrics saved to {self.path}")
+
+    def query(self, sql: str, params: tuple = ()) -> pd.DataFrame:
+        """
+        Run a SQL query against the store.
+
+        Args:
+            sql (str): SQL query.
+            params (tuple): Parameters of the query.
+
+        Returns:
+            pd.DataFrame: Result of the query.
+        """
+        with closing(sqlite3.connect(self.path)) as connection:
+            return pd.read_sql_query(sql, connection, params=params)
+
+    def run_history(self, vintage: str = None) -> pd.DataFrame:
+        """
+        Every saved run, oldest first, with its total input size.
+
+        Args:
+            vintage (str, optional): Only show runs of this data vintage.
+
+        Returns:
+            pd.DataFrame: One row per run.
+        """
+        return self.query(
+            """
+            SELECT runs.*, SUM(inputs.size_bytes) AS input_bytes
+            FROM runs LEFT JOIN inputs USING (run_id)
+            WHERE ? IS NULL OR runs.vintage = ?
+            GROUP BY runs.run_id
+            ORDER BY runs.started, runs.run_id
+            """,
+            (vintage, vintage),
+        )
+
+    def stage_trends(
+        self, stage: str = None, section: str = None
+    ) -> pd.DataFrame:
+        """
+        Durations of completed stages across runs, oldest run first.
+
+        Args:
+            stage (str, optional): Only show this stage.
+            section (str, optional): Only show stages of this section.
+
+        Returns:
+            pd.DataFrame: One row per run and stage with its wall time, rows,
+            the process's peak memory so far and how much the stage raised
+            it, and the change in wall time from the previous
+            run of the same stage as a ratio.
+        """
+        trends = self.query(
+            """
+            SELECT runs.run_id, runs.started, runs.version, runs.vintage,
+                stages.section, stages.stage, stages.wall_s, stages.cpu_s,
+                stages.rows_in, stages.rows_out,
+                stages.process_peak_rss_mb, stages.peak_rss_increase_mb
+            FROM stages JOIN runs USING (run_id)
+            WHERE stages.status = 'completed'
+                AND (? IS NULL OR stages.stage = ?)
+                AND (? IS NULL OR stages.section = ?)
+            ORDER BY runs.started, runs.run_id
+            """,
+            (stage, stage, section, section),
+        )
+        trends["wall_s_change"] = trends.groupby(
+            ["section", "stage"], dropna=False
+        )["wall_s"].pct_change()
+
+        return trends
+
+    def vintage_summary(self) -> pd.DataFrame:
+        """
+        Median wall time and peak memory increase of each stage by data
+        vintage.
+
+        Returns:
+            pd.DataFrame: One row per vintage and stage, with the number of
+            runs it completed in.
+        """
+        trends = self.stage_trends()
+
+        return (
+            trends.groupby(["vintage", "section", "stage"], dropna=False)
+            .agg(
+                runs=("run_id", "nunique"),
+                median_wall_s=("wall_s", "median"),
+                median_peak_rss_increase_mb=(
+                    "peak_rss_increase_mb",
+                    "median",
+                ),
+                median_rows_in=("rows_in", "median"),
+            )
+            .reset_index()
+        )
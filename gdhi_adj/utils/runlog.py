@@ -1,7 +1,13 @@
+"""Define the run log that creates and records run IDs."""
+
+import getpass
 import os
 import uuid
 from datetime import datetime
 
+from gdhi_adj.utils.checkpoint import hash_settings
+from gdhi_adj.utils.run_metrics import RunMetricsStore
+
 
 class RunLog:
     """Creates a runlog instance for the pipeline."""
@@ -17,6 +23,7 @@ class RunLog:
     ):
         # config based attrs
         self.config = config
+        self.version = version
         self.environment = config["global"]["platform"]
         self.logs_folder = config[f"{self.environment}_paths"][
             "logs_foldername"
@@ -37,6 +44,43 @@ class RunLog:
         if not self.file_exists_func(self.run_logs_folder):
             self.mkdir_func(self.run_logs_folder)
 
+    def metrics_store(self) -> RunMetricsStore:
+        """Returns the store of run metrics in the run_logs folder."""
+        return RunMetricsStore(
+            os.path.join(
+                self.run_logs_folder, self.log_filenames["metrics_filename"]
+            )
+        )
+
+    def save_run_metrics(
+        self, report: dict, outcome: str, error: str = None
+    ) -> RunMetricsStore:
+        """Saves the metrics of a run to the run metrics store.
+
+        Args:
+            report (dict): Run report from StageRecorder.report.
+            outcome (str): "completed" or "failed".
+            error (str, optional): Error message of a failed run.
+
+        Returns:
+            RunMetricsStore: Store the metrics were saved to.
+        """
+        store = self.metrics_store()
+        store.save_run(
+            report,
+            config_hash=hash_settings(self.config),
+            outcome=outcome,
+            version=self.version,
+            user=self.user,
+            vintage=self.config["user_settings"]["output_data_prefix"],
+            error=error,
+        )
+        return store
+
+    def _generate_username(self):
+        """Returns the name of the user running the pipeline."""
+        return getpass.getuser()
+
     def generate_and_save_run_id(self):
         """Generates a run ID and saves it to a text file in the run_logs
         folder."""
@@ -0,0 +1,160 @@
+"""Define a scheduler that runs independent pipeline stages on threads."""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import pandas as pd
+
+from gdhi_adj.utils.logger import GDHI_adj_logger
+
+GDHI_adj_LOGGER = GDHI_adj_logger(__name__)
+logger = GDHI_adj_LOGGER.logger
+
+
+def find_critical_path(report: pd.DataFrame, depends_on: dict) -> list:
+    """
+    Find the chain of dependent stages with the longest total duration.
+
+    Args:
+        report (pd.DataFrame): Stage report with stage and duration columns.
+        depends_on (dict): Names of the stages each stage depends on.
+
+    Returns:
+        list: Stage names on the critical path, in run order.
+    """
+    duration = dict(zip(report["stage"], report["duration"]))
+    path_time = {}
+    previous = {}
+    # Stages are in start order, so dependencies are always seen first
+    for stage in report["stage"]:
+        slowest = max(
+            depends_on[stage], key=lambda dep: path_time[dep], default=None
+        )
+        previous[stage] = slowest
+        path_time[stage] = duration[stage] + (
+            path_time[slowest] if slowest is not None else 0.0
+        )
+
+    stage = max(path_time, key=path_time.get, default=None)
+    path = []
+    while stage is not None:
+        path.append(stage)
+        stage = previous[stage]
+
+    return path[::-1]
+
+
+def run_stages(
+    stages: dict, max_workers: int = 1
+) -> tuple[dict, pd.DataFrame]:
+    """
+    Run stages as soon as the stages they depend on have finished.
+
+    Stages that do not depend on each other run concurrently on a thread
+    pool, so they should not modify shared inputs. With one worker the
+    stages run in order on the calling thread.
+
+    Args:
+        stages (dict): (function, kwargs, depends_on) keyed by stage name,
+            where depends_on lists stage names whose results are passed to
+            function as keyword arguments of the same name.
+        max_workers (int): Number of threads.
+
+    Returns:
+        tuple[dict, pd.DataFrame]: Results keyed by stage name, and a report
+        of each stage's start, end and duration in seconds, with whether it
+        is on the critical path.
+
+    Raises:
+        ValueError: If a stage depends on an unknown stage, or stages depend
+        on each other in a cycle.
+    """
+    depends_on = {name: list(stage[2]) for name, stage in stages.items()}
+    for name, deps in depends_on.items():
+        unknown = [dep for dep in deps if dep not in stages]
+        if unknown:
+            raise ValueError(
+                f"Stage '{name}' depends on unknown stage(s): {unknown}"
+            )
+
+    results = {}
+    timings = []
+    start_time = time.perf_counter()
+
+    def run_stage(name: str):
+        func, kwargs, deps = stages[name]
+        stage_start = time.perf_counter()
+        result = func(**kwargs, **{dep: results[dep] for dep in deps})
+        stage_end = time.perf_counter()
+        timings.append(
+            {
+                "stage": name,
+                "start": stage_start - start_time,
+                "end": stage_end - start_time,
+                "duration": stage_end - stage_start,
+            }
+        )
+        return result
+
+    def ready() -> list:
+        return [
+            name
+            for name in stages
+            if name not in results
+            and name not in running.values()
+            and all(dep in results for dep in depends_on[name])
+        ]
+
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while len(results) < len(stages):
+            for name in ready():
+                if max_workers == 1:
+                    results[name] = run_stage(name)
+                else:
+                    running[executor.submit(run_stage, name)] = name
+
+            if not running:
+                if len(results) < len(stages) and not ready():
+                    raise ValueError(
+                        "Stages depend on each other in a cycle: "
+                        f"{[name for name in stages if name not in results]}"
+                    )
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+
+    report = (
+        pd.DataFrame(timings, columns=["stage", "start", "end", "duration"])
+        .sort_values("start", kind="stable")
+        .reset_index(drop=True)
+    )
+    report["depends_on"] = report["stage"].map(
+        lambda name: ",".join(depends_on[name])
+    )
+    critical_path = find_critical_path(report, depends_on)
+    report["critical_path"] = report["stage"].isin(critical_path)
+
+    return results, report
+
+
+def log_stage_report(report: pd.DataFrame, title: str):
+    """
+    Log per-stage times and the critical path of a run_stages report.
+
+    Args:
+        report (pd.DataFrame): Stage report from run_stages.
+        title (str): Description of the stages for the log message.
+    """
+    critical = report[report["critical_path"]]
+    logger.info(
+        f"{title} stage times (seconds):\n"
+        + report.to_string(index=False, float_format="{:.3f}".format)
+    )
+    logger.info(
+        f"{title} critical path: {' -> '.join(critical['stage'])}"
+        f" ({critical['duration'].sum():.3f} seconds of"
+        f" {report['end'].max():.3f} seconds elapsed)"
+    )
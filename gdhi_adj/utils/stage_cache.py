@@ -0,0 +1,136 @@
+"""Define a cache of stage outputs shared between pipeline runs."""
+
+import functools
+import glob
+import hashlib
+import os
+import pickle
+import shutil
+
+import gdhi_adj
+from gdhi_adj import __version__
+from gdhi_adj.utils.logger import GDHI_adj_logger
+
+GDHI_adj_LOGGER = GDHI_adj_logger(__name__)
+logger = GDHI_adj_LOGGER.logger
+
+MB = 1024**2
+
+
+@functools.lru_cache(maxsize=None)
+def code_fingerprint() -> str:
+    """
+    Identify the version of the pipeline code.
+
+    Returns:
+        str: Hex digest of the package version and the source of every
+        module, so an edit to the code invalidates cached outputs even if
+        the version is unchanged.
+    """
+    package_dir = os.path.dirname(gdhi_adj.__file__)
+    digest = hashlib.sha1(__version__.encode())
+    for path in sorted(
+        glob.glob(os.path.join(package_dir, "**", "*.py"), recursive=True)
+    ):
+        digest.update(os.path.relpath(path, package_dir).encode())
+        with open(path, "rb") as file:
+            digest.update(file.read())
+    return digest.hexdigest()
+
+
+class StageCache:
+    """
+    Store stage outputs by key so later runs can reuse them.
+
+    Outputs are pickled to <key>.pkl. Loading an output marks it as
+    recently used, and the least recently used outputs are removed once
+    the cache is larger than max_bytes.
+
+    Attributes:
+        folder (str): Folder of the cached outputs.
+        max_bytes (int): Largest total size of the cached outputs.
+    """
+
+    def __init__(self, folder: str, max_bytes: int = 2048 * MB):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        os.makedirs(folder, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        """Path of the cached output of a key."""
+        return os.path.join(self.folder, f"{key}.pkl")
+
+    def get(self, key: str) -> tuple:
+        """
+        Load a cached output.
+
+        Args:
+            key (str): Key of the output.
+
+        Returns:
+            tuple: Whether the output was cached, and the output or None.
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as file:
+                output = pickle.load(file)
+        except FileNotFoundError:
+            return False, None
+        except (OSError, pickle.UnpicklingError, EOFError) as e:
+            logger.warning(f"Cached output {path} could not be loaded: {e}")
+            return False, None
+
+        # Mark as recently used for eviction
+        os.utime(path)
+        return True, output
+
+    def put(self, key: str, output, source_path: str = None):
+        """
+        Cache an output, then evict old outputs over the size limit.
+
+        Args:
+            key (str): Key of the output.
+            output: Output to cache.
+            source_path (str, optional): File already holding the pickled
+                output, copied instead of pickling it again. It is not
+                linked, so evicting the output frees its disk space even
+                while the source file is kept.
+        """
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        if source_path is None:
+            with open(temp_path, "wb") as file:
+                pickle.dump(output, file, protocol=pickle.HIGHEST_PROTOCOL)
+        else:
+            shutil.copyfile(source_path, temp_path)
+        os.replace(temp_path, path)
+
+        self.evict(keep=path)
+
+    def evict(self, keep: str = None):
+        """
+        Remove the least recently used outputs until the cache fits.
+
+        Args:
+            keep (str, optional): Path of an output not to remove, unless it
+                alone is over the size limit.
+        """
+        entries = []
+        for path in glob.glob(os.path.join(self.folder, "*.pkl")):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((path == keep, stat.st_mtime, stat.st_size, path))
+
+        total = sum(entry[2] for entry in entries)
+        # Evict the oldest outputs first, and the kept output last
+        for _, _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            logger.info(f"Evicted {path} from the stage cache")
@@ -0,0 +1,322 @@
+"""Define a recorder of time, rows and memory for each pipeline stage."""
+
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+
+from gdhi_adj.utils.logger import GDHI_adj_logger, log_stage
+from gdhi_adj.utils.profiler import StageProfiler
+
+GDHI_adj_LOGGER = GDHI_adj_logger(__name__)
+logger = GDHI_adj_LOGGER.logger
+
+MB = 1024**2
+
+
+def peak_rss_bytes() -> int | None:
+    """
+    Peak resident set size of the current process.
+
+    Returns:
+        int | None: Peak memory in bytes, or None if it cannot be read on
+        this platform.
+    """
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [
+                ("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t),
+            ]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        get_memory_info = ctypes.windll.psapi.GetProcessMemoryInfo
+        get_memory_info.argtypes = [
+            wintypes.HANDLE,
+            ctypes.POINTER(ProcessMemoryCounters),
+            wintypes.DWORD,
+        ]
+        handle = ctypes.windll.kernel32.GetCurrentProcess()
+        if not get_memory_info(handle, ctypes.byref(counters), counters.cb):
+            return None
+        return counters.PeakWorkingSetSize
+
+    try:
+        import resource
+    except ImportError:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def frame_stats(df: pd.DataFrame | None, deep: bool = False) -> tuple:
+    """
+    Row count and memory of a DataFrame.
+
+    Args:
+        df (pd.DataFrame | None): DataFrame to measure.
+        deep (bool): Whether to include the contents of object columns,
+            e.g. strings, which means reading every value.
+
+    Returns:
+        tuple: Number of rows and memory in bytes, both None if df is None.
+    """
+    if df is None:
+        return None, None
+    return len(df), int(df.memory_usage(deep=deep).sum())
+
+
+class StageRecord:
+    """
+    Measurements of one pipeline stage.
+
+    Attributes:
+        name (str): Name of the stage.
+        deep (bool): Whether memory includes the contents of object columns.
+        rows_in (int): Rows of the input DataFrame.
+        memory_in (int): Bytes of the input DataFrame.
+        rows_out (int): Rows of the output DataFrame.
+        memory_out (int): Bytes of the output DataFrame.
+    """
+
+    def __init__(
+        self, name: str, df_in: pd.DataFrame = None, deep: bool = False
+    ):
+        self.name = name
+        self.deep = deep
+        self.rows_in, self.memory_in = frame_stats(df_in, deep)
+        self.rows_out, self.memory_out = None, None
+
+    def output(self, df_out: pd.DataFrame):
+        """
+        Record the output DataFrame of the stage.
+
+        Args:
+            df_out (pd.DataFrame): DataFrame produced by the stage.
+        """
+        self.rows_out, self.memory_out = frame_stats(df_out, self.deep)
+
+
+class StageRecorder:
+    """
+    Record wall time, CPU time, rows, frame memory and peak memory of each
+    stage of a run.
+
+    Stages are recorded with the stage context manager:
+
+        with recorder.stage("join", df) as stage:
+            df = join(df)
+            stage.output(df)
+
+    Records logged inside a stage are labelled with its name. A disabled
+    recorder runs the stages without measuring them. Stages are also
+    profiled if the recorder has a profiler.
+
+    Peak memory is the process's peak so far, which never goes down, so
+    each stage also records how much it raised the peak. A stage with no
+    increase stayed below the peak of an earlier stage.
+
+    Attributes:
+        run_id (str): ID of the run the stages belong to.
+        enabled (bool): Whether stages are measured.
+        deep_memory (bool): Whether DataFrame memory includes the contents
+            of object columns, which is slower to measure.
+        profiler (StageProfiler): Profiler of each stage, None to not
+            profile.
+        stages (list): One dict of measurements per finished stage.
+        inputs (list): Section, path and size in bytes of each input file.
+        section (str): Part of the pipeline the next stages belong to.
+    """
+
+    def __init__(
+        self,
+        run_id: str = None,
+        enabled: bool = True,
+        profiler: StageProfiler = None,
+        deep_memory: bool = False,
+    ):
+        self.run_id = run_id
+        self.enabled = enabled
+        self.deep_memory = deep_memory
+        self.profiler = profiler
+        self.stages = []
+        self.inputs = []
+        self.section = None
+        self.started = datetime.now().isoformat(timespec="seconds")
+        self._start_time = time.perf_counter()
+
+    @contextmanager
+    def in_section(self, section: str):
+        """
+        Label the stages recorded inside the with block with a section.
+
+        Args:
+            section (str): Part of the pipeline, e.g. "preprocessing".
+        """
+        previous, self.section = self.section, section
+        try:
+            yield self
+        finally:
+            self.section = previous
+
+    @contextmanager
+    def stage(self, name: str, df_in: pd.DataFrame = None):
+        """
+        Measure the stage run inside the with block.
+
+        A stage that raises is recorded with status "failed" and the error
+        is raised again.
+
+        Args:
+            name (str): Name of the stage.
+            df_in (pd.DataFrame, optional): Input DataFrame of the stage.
+
+        Yields:
+            StageRecord: Record to pass the stage's output DataFrame to.
+        """
+        if not self.enabled:
+            yield StageRecord(name)
+            return
+
+        record = StageRecord(name, df_in, self.deep_memory)
+        qualified_name = f"{self.section}.{name}" if self.section else name
+        peak_rss_start = peak_rss_bytes()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        status = "failed"
+        try:
+            with log_stage(qualified_name):
+                if self.profiler is None:
+                    yield record
+                else:
+                    with self.profiler.profile(qualified_name):
+                        yield record
+            status = "completed"
+        finally:
+            peak_rss = peak_rss_bytes()
+            peak_rss_increase = (
+                None if peak_rss is None else peak_rss - peak_rss_start
+            )
+            self.stages.append(
+                {
+                    "section": self.section,
+                    "stage": name,
+                    "status": status,
+                    "start_s": wall_start - self._start_time,
+                    "wall_s": time.perf_counter() - wall_start,
+                    "cpu_s": time.process_time() - cpu_start,
+                    "rows_in": record.rows_in,
+                    "rows_out": record.rows_out,
+                    "memory_in_mb": _to_mb(record.memory_in),
+                    "memory_out_mb": _to_mb(record.memory_out),
+                    "process_peak_rss_mb": _to_mb(peak_rss),
+                    "peak_rss_increase_mb": _to_mb(peak_rss_increase),
+                }
+            )
+
+    def record_input(self, path: str):
+        """
+        Record the size of an input file read by the run.
+
+        Args:
+            path (str): Path to the input file.
+        """
+        if not self.enabled:
+            return
+        self.inputs.append(
+            {
+                "section": self.section,
+                "path": path,
+                "size_bytes": os.path.getsize(path),
+            }
+        )
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Measurements of every recorded stage as a table.
+
+        Returns:
+            pd.DataFrame: One row per stage, in the order they finished.
+        """
+        summary = pd.DataFrame(
+            self.stages,
+            columns=[
+                "section",
+                "stage",
+                "status",
+                "start_s",
+                "wall_s",
+                "cpu_s",
+                "rows_in",
+                "rows_out",
+                "memory_in_mb",
+                "memory_out_mb",
+                "process_peak_rss_mb",
+                "peak_rss_increase_mb",
+            ],
+        )
+
+        return summary.astype({"rows_in": "Int64", "rows_out": "Int64"})
+
+    def report(self) -> dict:
+        """
+        Machine-readable report of the run.
+
+        Returns:
+            dict: Run ID, start time, total wall time and peak memory, the
+            size of each input file and the measurements of each stage.
+        """
+        peak_rss = peak_rss_bytes()
+        return {
+            "run_id": self.run_id,
+            "started": self.started,
+            "total_wall_s": time.perf_counter() - self._start_time,
+            "peak_rss_mb": _to_mb(peak_rss),
+            "inputs": self.inputs,
+            "stages": self.stages,
+        }
+
+    def save_report(self, path: str):
+        """
+        Save the run report as JSON.
+
+        Args:
+            path (str): File path of the JSON report.
+        """
+        with open(path, "w") as file:
+            json.dump(self.report(), file, indent=2)
+        logger.info(f"Run report saved to {path}")
+
+    def log_summary(self):
+        """Log the stage measurements as a table."""
+        if not self.stages:
+            return
+        logger.info(
+            f"Stage summary for run {self.run_id}:\n"
+            + self.summary().to_string(
+                index=False, float_format="{:.2f}".format
+            )
+        )
+
+
+def _to_mb(size: int | None) -> float | None:
+    """Convert a size in bytes to megabytes."""
+    return None if size is None else size / MB
@@ -0,0 +1,442 @@
+"""Generate synthetic input files in the DAP, regional accounts and PowerBI
+formats.
+
+Real GDHI data can only be used inside the secure environment, so these
+files stand in for it when benchmarking the pipeline or testing that
+parallel runs match serial runs. Outliers and rollback years are injected
+into the unconstrained data and recorded in a ground truth table.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from gdhi_adj.utils.logger import GDHI_adj_logger
+
+GDHI_adj_LOGGER = GDHI_adj_logger(__name__)
+logger = GDHI_adj_LOGGER.logger
+
+# Roughly the number of LADs and LSOAs per LAD in England and Wales
+NATIONAL_SCALE = {"n_lads": 318, "lsoas_per_lad": 112}
+
+TRANSACTIONS = [
+    ("B.2g", "Imputed social contributions/Social benefits received"),
+    ("D.1", "Compensation of employees"),
+    ("D.4", "Property income, received"),
+]
+
+# The first component matches the default component filters in the config
+COMPONENTS = [
+    ("G866BTR", "D75", "D"),
+    ("G866BTR", "D75", "C"),
+    ("G861BTR", "D61", "D"),
+    ("G862BTR", "D62", "C"),
+    ("G870BTR", "D7", "D"),
+]
+
+TRUTH_COLUMNS = [
+    "lsoa_code",
+    "lad_code",
+    "year",
+    "kind",
+    "original_value",
+    "injected_value",
+]
+
+
+def generate_geography(n_lads: int, lsoas_per_lad: int) -> pd.DataFrame:
+    """
+    Generate LSOA and LAD codes and names.
+
+    Args:
+        n_lads (int): Number of LADs.
+        lsoas_per_lad (int): Number of LSOAs in each LAD.
+
+    Returns:
+        pd.DataFrame: One row per LSOA with lsoa_code, lsoa_name, lad_code and
+        lad_name, ordered by LAD.
+    """
+    lad_number = np.repeat(np.arange(1, n_lads + 1), lsoas_per_lad)
+    lsoa_number = np.tile(np.arange(1, lsoas_per_lad + 1), n_lads)
+
+    lad_name = pd.Series(lad_number).map("Area {:d}".format)
+    return pd.DataFrame(
+        {
+            "lsoa_code": [
+                f"E01{number:06d}" for number in range(1, len(lad_number) + 1)
+            ],
+            "lsoa_name": (
+                lad_name + pd.Series(lsoa_number).map(" {:03d}A".format)
+            ),
+            "lad_code": pd.Series(lad_number).map("E06{:06d}".format),
+            "lad_name": lad_name,
+        }
+    )
+
+
+def generate_unconstrained(
+    geography: pd.DataFrame,
+    years: list,
+    rng: np.random.Generator,
+    base_level: float = 20000.0,
+    noise: float = 0.02,
+) -> pd.DataFrame:
+    """
+    Generate wide unconstrained GDHI with a steady trend for each LAD.
+
+    Args:
+        geography (pd.DataFrame): Output of generate_geography.
+        years (list): Years to generate.
+        rng (np.random.Generator): Random number generator.
+        base_level (float): Typical value of an LSOA in the first year.
+        noise (float): Standard deviation of the yearly relative noise.
+
+    Returns:
+        pd.DataFrame: Geography columns and one column of values per year.
+    """
+    lad_index = pd.factorize(geography["lad_code"])[0]
+    level = rng.lognormal(np.log(base_level), 0.3, len(geography))
+    growth = rng.normal(1.03, 0.01, lad_index.max() + 1)[lad_index]
+    elapsed = np.arange(len(years))
+
+    values = (
+        level[:, None]
+        * growth[:, None] ** elapsed[None, :]
+        * rng.normal(1.0, noise, (len(geography), len(years)))
+    )
+
+    return pd.concat(
+        [
+            geography.reset_index(drop=True),
+            pd.DataFrame(
+                values.round(3), columns=[str(year) for year in years]
+            ),
+        ],
+        axis=1,
+    )
+
+
+def inject_outliers(
+    df: pd.DataFrame,
+    years: list,
+    n_outliers: int,
+    rng: np.random.Generator,
+    factor_range: tuple = (3.0, 6.0),
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Scale one year of randomly chosen LSOAs up or down.
+
+    Args:
+        df (pd.DataFrame): Wide unconstrained data.
+        years (list): Years the outliers can be in.
+        n_outliers (int): Number of LSOAs to give an outlier year.
+        rng (np.random.Generator): Random number generator.
+        factor_range (tuple): Range of the factor the value is scaled by.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: Data with the outliers, and the
+        ground truth of each outlier.
+    """
+    df = df.copy()
+    rows = rng.choice(len(df), size=n_outliers, replace=False)
+    outlier_years = rng.choice(years, size=n_outliers)
+    factors = rng.uniform(*factor_range, n_outliers)
+    factors = np.where(rng.random(n_outliers) < 0.5, factors, 1 / factors)
+
+    truth = []
+    for row, year, factor in zip(rows, outlier_years, factors):
+        original = df.at[row, str(year)]
+        df.at[row, str(year)] = round(original * factor, 3)
+        truth.append(
+            {
+                "lsoa_code": df.at[row, "lsoa_code"],
+                "lad_code": df.at[row, "lad_code"],
+                "year": int(year),
+                "kind": "outlier",
+                "original_value": original,
+                "injected_value": df.at[row, str(year)],
+            }
+        )
+
+    return df, pd.DataFrame(truth, columns=TRUTH_COLUMNS)
+
+
+def inject_rollback_years(
+    df: pd.DataFrame,
+    rollback_from: int,
+    first_year: int,
+    n_lsoas: int,
+    rng: np.random.Generator,
+    exclude: list = (),
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Copy one year's value back to earlier years, as when data is missing.
+
+    Args:
+        df (pd.DataFrame): Wide unconstrained data.
+        rollback_from (int): Year whose value is copied back.
+        first_year (int): First year of the data.
+        n_lsoas (int): Number of LSOAs to roll back.
+        rng (np.random.Generator): Random number generator.
+        exclude (list): LSOA codes not to roll back.
+
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: Data with the rollback years, and
+        the ground truth of each rolled back year.
+    """
+    df = df.copy()
+    candidates = np.flatnonzero(~df["lsoa_code"].isin(exclude).to_numpy())
+    rows = rng.choice(
+        candidates, size=min(n_lsoas, len(candidates)), replace=False
+    )
+    rollback_years = [str(year) for year in range(first_year, rollback_from)]
+
+    truth = df.loc[rows, ["lsoa_code", "lad_code"] + rollback_years].melt(
+        id_vars=["lsoa_code", "lad_code"],
+        var_name="year",
+        value_name="original_value",
+    )
+    truth["year"] = truth["year"].astype(int)
+    truth["kind"] = "rollback"
+    truth["injected_value"] = np.repeat(
+        df.loc[rows, str(rollback_from)].to_numpy()[None, :],
+        len(rollback_years),
+        axis=0,
+    ).ravel()
+
+    df.loc[rows, rollback_years] = np.repeat(
+        df.loc[rows, [str(rollback_from)]].to_numpy(),
+        len(rollback_years),
+        axis=1,
+    )
+
+    return df, truth[TRUTH_COLUMNS]
+
+
+def generate_constrained(
+    df_unconstrained: pd.DataFrame,
+    n_components: int,
+    rng: np.random.Generator,
+) -> pd.DataFrame:
+    """
+    Generate constrained data for several components.
+
+    Each component is the unconstrained data scaled by a factor per LAD and
+    year, as if it had been constrained to regional accounts.
+
+    Args:
+        df_unconstrained (pd.DataFrame): Wide unconstrained data.
+        n_components (int): Number of components, at most len(COMPONENTS).
+        rng (np.random.Generator): Random number generator.
+
+    Returns:
+        pd.DataFrame: Geography columns, sas_code, cord_code, credit_debit
+        and one column of values per year, one row per LSOA and component.
+    """
+    if not 1 <= n_components <= len(COMPONENTS):
+        raise ValueError(
+            f"n_components must be between 1 and {len(COMPONENTS)}."
+        )
+
+    geography_cols = ["lsoa_code", "lsoa_name", "lad_code", "lad_name"]
+    year_cols = [col for col in df_unconstrained.columns if col[0].isdigit()]
+    lad_index = pd.factorize(df_unconstrained["lad_code"])[0]
+    values = df_unconstrained[year_cols].to_numpy()
+
+    components = []
+    for sas_code, cord_code, credit_debit in COMPONENTS[:n_components]:
+        rates = rng.uniform(0.9, 1.1, (lad_index.max() + 1, len(year_cols)))
+        component = df_unconstrained[geography_cols].assign(
+            sas_code=sas_code, cord_code=cord_code, credit_debit=credit_debit
+        )
+        component[year_cols] = (values * rates[lad_index]).round(3)
+        components.append(component)
+
+    return pd.concat(components, ignore_index=True)
+
+
+def generate_regional_accounts(
+    df_unconstrained: pd.DataFrame,
+    transaction_name: str,
+    rng: np.random.Generator,
+) -> pd.DataFrame:
+    """
+    Generate LAD totals in the layout of regional accounts Table 7.
+
+    Values are formatted as strings with commas separating thousands, as in
+    the published table. The requested transaction is the LAD sum of the
+    unconstrained data scaled by a factor per LAD and year, the others are
+    unrelated.
+
+    Args:
+        df_unconstrained (pd.DataFrame): Wide unconstrained data.
+        transaction_name (str): Transaction the pipeline constrains to.
+        rng (np.random.Generator): Random number generator.
+
+    Returns:
+        pd.DataFrame: One row per LAD and transaction.
+    """
+    year_cols = [col for col in df_unconstrained.columns if col[0].isdigit()]
+    lad_totals = df_unconstrained.groupby("lad_code", sort=False)[
+        year_cols
+    ].sum()
+
+    transaction_codes = {name: code for code, name in TRANSACTIONS}
+    transactions = [
+        (transaction_codes.get(transaction_name, "B.2g"), transaction_name)
+    ] + [
+        transaction
+        for transaction in TRANSACTIONS
+        if transaction[1] != transaction_name
+    ][
+        :2
+    ]
+
+    tables = []
+    for transaction_code, name in transactions:
+        values = lad_totals.to_numpy() * rng.uniform(
+            0.95, 1.05, lad_totals.shape
+        )
+        if name != transaction_name:
+            values = values * rng.uniform(0.2, 2.0)
+        table = pd.DataFrame(
+            np.vectorize("{:,.0f}".format)(values), columns=year_cols
+        )
+        table.insert(0, "Region", "E12000001")
+        table.insert(1, "Region name", "North East")
+        table.insert(2, "LAD code", lad_totals.index)
+        table.insert(3, "Transaction code", transaction_code)
+        table.insert(4, "Transaction", name)
+        tables.append(table)
+
+    return pd.concat(tables, ignore_index=True)
+
+
+def generate_analyst(
+    geography: pd.DataFrame, truth: pd.DataFrame
+) -> pd.DataFrame:
+    """
+    Generate a PowerBI assessment file adjusting every injected outlier.
+
+    Args:
+        geography (pd.DataFrame): Output of generate_geography.
+        truth (pd.DataFrame): Ground truth of the injected changes.
+
+    Returns:
+        pd.DataFrame: One row per LSOA with the PowerBI column names, where
+        Adjust is TRUE and Year lists the outlier years of LSOAs to adjust.
+    """
+    outlier_years = (
+        truth[truth["kind"] == "outlier"]
+        .sort_values("year")
+        .groupby("lsoa_code")["year"]
+        .agg(lambda years: ",".join(str(year) for year in years))
+    )
+    years = geography["lsoa_code"].map(outlier_years)
+
+    return geography.rename(
+        columns={
+            "lsoa_code": "LSOA code",
+            "lsoa_name": "LSOA name",
+            "lad_code": "LAD code",
+            "lad_name": "LAD name",
+        }
+    ).assign(
+        Adjust=np.where(years.notna(), "TRUE", "FALSE"),
+        Year=years.fillna(""),
+    )
+
+
+def generate_dataset(
+    n_lads: int = 10,
+    lsoas_per_lad: int = 20,
+    start_year: int = 2010,
+    end_year: int = 2023,
+    n_components: int = 1,
+    outlier_rate: float = 0.01,
+    rollback_rate: float = 0.02,
+    rollback_from: int = 2015,
+    transaction_name: str = TRANSACTIONS[0][1],
+    seed: int = 0,
+) -> dict:
+    """
+    Generate a consistent set of pipeline inputs.
+
+    Args:
+        n_lads (int): Number of LADs.
+        lsoas_per_lad (int): Number of LSOAs in each LAD.
+        start_year (int): First year of the data.
+        end_year (int): Last year of the data.
+        n_components (int): Number of components in the constrained data.
+        outlier_rate (float): Share of LSOAs given an outlier year.
+        rollback_rate (float): Share of LSOAs whose years before
+            rollback_from are copies of it.
+        rollback_from (int): Year copied back to earlier years. No rollback
+            years are injected if it is not after start_year.
+        transaction_name (str): Regional accounts transaction to constrain
+            to.
+        seed (int): Seed of the random number generator.
+
+    Returns:
+        dict: DataFrames keyed by "unconstrained", "constrained",
+        "regional_accounts", "analyst" and "truth".
+    """
+    rng = np.random.default_rng(seed)
+    years = list(range(start_year, end_year + 1))
+
+    geography = generate_geography(n_lads, lsoas_per_lad)
+    df = generate_unconstrained(geography, years, rng)
+
+    n_lsoas = len(geography)
+    df, outliers = inject_outliers(
+        df, years, int(round(outlier_rate * n_lsoas)), rng
+    )
+    truth = [outliers]
+    if start_year < rollback_from <= end_year:
+        df, rollbacks = inject_rollback_years(
+            df,
+            rollback_from,
+            start_year,
+            int(round(rollback_rate * n_lsoas)),
+            rng,
+            exclude=outliers["lsoa_code"],
+        )
+        truth.append(rollbacks)
+    truth = pd.concat(truth, ignore_index=True)
+
+    logger.info(
+        f"Generated {n_lsoas} LSOAs in {n_lads} LADs for {len(years)} years,"
+        f" with {len(outliers)} outliers"
+    )
+
+    return {
+        "unconstrained": df,
+        "constrained": generate_constrained(df, n_components, rng),
+        "regional_accounts": generate_regional_accounts(
+            df, transaction_name, rng
+        ),
+        "analyst": generate_analyst(geography, truth),
+        "truth": truth,
+    }
+
+
+def write_dataset(dataset: dict, output_dir: str) -> dict:
+    """
+    Write each DataFrame of a generated dataset to a CSV file.
+
+    Args:
+        dataset (dict): Output of generate_dataset.
+        output_dir (str): Directory to write the files to.
+
+    Returns:
+        dict: File path of each DataFrame, with the same keys as dataset.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {}
+    for name, df in dataset.items():
+        paths[name] = os.path.join(output_dir, f"synthetic_{name}.csv")
+        df.to_csv(paths[name], index=False)
+    logger.info(f"Synthetic data saved to {output_dir}")
+
+    return paths
@@ -1,9 +1,11 @@
 """Main file to run pipeine"""
 
-from gdhi_adj.pipeline import run_pipeline
+import sys
 
-# config path
-config_path = "config/config.toml"
+from gdhi_adj.__main__ import main
 
-# Run the pipeline with config path
-run_pipeline(config_path)
+if __name__ == "__main__":
+    # Run the pipeline with the settings in config/config.toml, accepting
+    # the options of python -m gdhi_adj run. Guarded so that worker
+    # processes started for batch adjustment do not run the pipeline again
+    sys.exit(main(["run", *sys.argv[1:]]))
@@ -1,9 +1,16 @@
+import numpy as np
 import pandas as pd
+import pytest
 
 from gdhi_adj.adjustment.calc_adjustment import (
+    AdjustmentCheckError,
     apportion_adjustment,
+    calc_apportion_weights,
+    calc_interpolated_val,
     calc_midpoint_adjustment,
     calc_midpoint_val,
+    check_lad_totals,
+    neighbour_values,
 )
 
 
@@ -11,8 +18,8 @@ def test_calc_midpoint_val():
     """Test the calc_midpoint_val function returns the expected midpoint row.
 
     The function should:
-    - select rows where the row's `year` is contained in that row's
-      `year_to_adjust` value,
+    - select rows where the row's `year` is set in that row's
+      `year_to_adjust` year bitmask,
     - compute `prev_con_gdhi` and `next_con_gdhi` by looking up the
       same `lsoa_code` at year-1 and year+1,
     - compute `midpoint` as the mean of the two neighbouring values.
@@ -22,19 +29,19 @@ def test_calc_midpoint_val():
         "year": [2002, 2003, 2004, 2003],
         "uncon_gdhi": [10.0, 20.0, 26.0, 45.0],
         "con_gdhi": [5.0, 8.0, 10.0, 15.0],
-        # only the 2003 row for E1 should be flagged for adjustment
-        "year_to_adjust": [[], [2003], [], None],
+        # only the 2003 row for E1 should be flagged for adjustment, 2003 is
+        # bit 1 when the start year is 2002
+        "year_to_adjust": [2, 2, 2, 0],
     })
 
-    result_df = calc_midpoint_val(df)
+    result_df = calc_midpoint_val(df, start_year=2002)
 
     expected_df = pd.DataFrame({
         "lsoa_code": ["E1"],
         "year": [2003],
         "uncon_gdhi": [20.0],
         "con_gdhi": [8.0],
-        # only the 2003 row for E1 should be flagged for adjustment
-        "year_to_adjust": [[2003]],
+        "year_to_adjust": [2],
         "prev_year": [2002],
         "prev_con_gdhi": [5.0],
         "next_year": [2004],
@@ -45,6 +52,109 @@ def test_calc_midpoint_val():
     pd.testing.assert_frame_equal(result_df, expected_df, check_dtype=False)
 
 
+def test_calc_midpoint_val_unsorted_with_gap():
+    """Test calc_midpoint_val on unsorted rows and a gap in the series.
+
+    A neighbour is only used when it is the same LSOA exactly one year away,
+    so the 2005 row for E2 (no 2004 row) only has a next value.
+    """
+    df = pd.DataFrame({
+        "lsoa_code": ["E2", "E1", "E2", "E1", "E2", "E1"],
+        "year": [2006, 2003, 2005, 2002, 2003, 2004],
+        "con_gdhi": [30.0, 8.0, 20.0, 5.0, 10.0, 10.0],
+        # 2005 for E2 and 2003 for E1, with bit 0 as 2002
+        "year_to_adjust": [8, 2, 8, 2, 8, 2],
+    })
+
+    result_df = calc_midpoint_val(df, start_year=2002)
+
+    assert result_df["lsoa_code"].tolist() == ["E1", "E2"]
+    assert result_df["year"].tolist() == [2003, 2005]
+    assert result_df["prev_con_gdhi"].tolist()[0] == 5.0
+    assert pd.isna(result_df["prev_con_gdhi"].tolist()[1])
+    assert result_df["next_con_gdhi"].tolist() == [10.0, 30.0]
+    assert result_df["midpoint"].tolist() == [7.5, 30.0]
+
+
+def test_neighbour_values():
+    """Test neighbour_values reads previous and next years within LSOA."""
+    df = pd.DataFrame({
+        "lsoa_code": ["E1", "E2", "E1", "E2"],
+        "year": [2003, 2002, 2002, 2003],
+        "con_gdhi": [2.0, 3.0, 1.0, 4.0],
+    })
+
+    prev_vals = neighbour_values(df, "con_gdhi", -1)
+    next_vals = neighbour_values(df, "con_gdhi", 1)
+
+    pd.testing.assert_series_equal(
+        pd.Series(prev_vals), pd.Series([1.0, None, None, 3.0])
+    )
+    pd.testing.assert_series_equal(
+        pd.Series(next_vals), pd.Series([None, 4.0, 2.0, None])
+    )
+
+
+class TestCalcInterpolatedVal:
+    """Tests for calc_interpolated_val function."""
+
+    @pytest.fixture
+    def df(self) -> pd.DataFrame:
+        """E1 has a run in the middle of its series, E2 a run at the end."""
+        return pd.DataFrame({
+            "lsoa_code": ["E1"] * 6 + ["E2"] * 4,
+            "year": [2010, 2011, 2012, 2013, 2014, 2015,
+                     2010, 2011, 2012, 2013],
+            "con_gdhi": [10.0, 99.0, 98.0, 40.0, 50.0, 60.0,
+                         5.0, 6.0, 7.0, 100.0],
+            # 2011 and 2012 for E1, 2012 and 2013 for E2 from 2010
+            "year_to_adjust": [6] * 6 + [12] * 4,
+        })
+
+    def test_calc_interpolated_val_carry(self, df):
+        """Test runs are interpolated between anchors and the end run carries
+        the last unflagged value."""
+        result_df = calc_interpolated_val(df, 2010, edge_policy="carry")
+
+        assert result_df["year"].tolist() == [2011, 2012, 2012, 2013]
+        assert result_df["run_length"].tolist() == [2, 2, 2, 2]
+        assert result_df["prev_anchor_year"].tolist() == [
+            2010, 2010, 2011, 2011
+        ]
+        assert result_df["midpoint"].tolist() == [20.0, 30.0, 6.0, 6.0]
+
+    def test_calc_interpolated_val_extrapolate(self, df):
+        """Test the end run follows the trend of the last two anchors."""
+        result_df = calc_interpolated_val(df, 2010, edge_policy="extrapolate")
+
+        assert result_df["midpoint"].tolist() == [20.0, 30.0, 7.0, 8.0]
+
+    def test_calc_interpolated_val_skip(self, df):
+        """Test the end run is left without an imputed value."""
+        result_df = calc_interpolated_val(df, 2010, edge_policy="skip")
+
+        assert result_df["midpoint"].tolist()[:2] == [20.0, 30.0]
+        assert result_df["midpoint"].isna().tolist()[2:] == [True, True]
+
+    def test_calc_interpolated_val_matches_midpoint(self):
+        """Test a single outlier year gives the same value as the midpoint."""
+        df = pd.DataFrame({
+            "lsoa_code": ["E1", "E1", "E1"],
+            "year": [2002, 2003, 2004],
+            "con_gdhi": [5.0, 8.0, 10.0],
+            "year_to_adjust": [2, 2, 2],
+        })
+
+        result_df = calc_interpolated_val(df, start_year=2002)
+
+        assert result_df["midpoint"].tolist() == [7.5]
+
+    def test_calc_interpolated_val_invalid_policy(self, df):
+        """Test an unknown edge policy raises a ValueError."""
+        with pytest.raises(ValueError, match="Edge policy 'nearest'"):
+            calc_interpolated_val(df, 2010, edge_policy="nearest")
+
+
 def test_calc_midpoint_adjustment():
     """Test calc_midpoint_adjustment computes midpoint_diff and apportions
     the summed adjustment_val across all rows for the same LSOA.
@@ -112,3 +222,167 @@ def test_apportion_adjustment():
     })
 
     pd.testing.assert_frame_equal(result_df, expected_df, check_dtype=False)
+
+
+def test_apportion_adjustment_does_not_modify_input():
+    """Test apportion_adjustment leaves the input DataFrame unchanged."""
+    df = pd.DataFrame({
+        "lsoa_code": ["E1", "E2"],
+        "lad_code": ["E01", "E01"],
+        "year": [2002, 2002],
+        "con_gdhi": [5.0, 8.0],
+        "midpoint": [None, 7.0],
+        "adjustment_val": [1.0, 1.0],
+    })
+    original_df = df.copy()
+
+    apportion_adjustment(df)
+
+    pd.testing.assert_frame_equal(df, original_df)
+
+
+def test_apportion_adjustment_sorts_rows():
+    """Test apportion_adjustment returns rows sorted by LAD and year,
+    whatever their input order."""
+    df = pd.DataFrame({
+        "lsoa_code": ["E3", "E1", "E2", "E1"],
+        "lad_code": ["E02", "E01", "E01", "E01"],
+        "year": [2002, 2003, 2002, 2002],
+        "con_gdhi": [20.0, 15.0, 8.0, 5.0],
+        "midpoint": [None, None, 7.0, None],
+        "adjustment_val": [None, None, 1.0, 1.0],
+    })
+
+    result_df = apportion_adjustment(df)
+
+    assert result_df["lad_code"].tolist() == ["E01", "E01", "E01", "E02"]
+    assert result_df["year"].tolist() == [2002, 2002, 2003, 2002]
+    assert result_df.index.tolist() == [0, 1, 2, 3]
+    adjusted = result_df.set_index(["lsoa_code", "year"])["adjusted_con_gdhi"]
+    assert adjusted.to_dict() == {
+        ("E1", 2002): 5.5,
+        ("E2", 2002): 7.5,
+        ("E1", 2003): 15.0,
+        ("E3", 2002): 20.0,
+    }
+
+
+def test_apportion_adjustment_missing_lad_code():
+    """Test a row missing its lad_code is apportioned as its own group
+    rather than raising."""
+    df = pd.DataFrame({
+        "lsoa_code": ["E1", "E2", "E3"],
+        "lad_code": ["E01", "E01", None],
+        "year": [2002, 2002, 2002],
+        "con_gdhi": [5.0, 8.0, 10.0],
+        "midpoint": [None, None, None],
+        "adjustment_val": [None, None, None],
+    })
+
+    result_df = apportion_adjustment(df)
+
+    assert result_df["lsoa_count"].tolist() == [2, 2, 1]
+    assert result_df["adjusted_con_gdhi"].tolist() == [5.0, 8.0, 10.0]
+
+
+def test_apportion_adjustment_reports_failing_groups():
+    """Test apportion_adjustment reports every unbalanced (LAD, year).
+
+    Midpoints are imputed without a matching adjustment value, so the E01
+    2002 and E02 2003 totals both change, while E01 2003 is untouched.
+    """
+    df = pd.DataFrame({
+        "lsoa_code": ["E1", "E2", "E1", "E3"],
+        "lad_code": ["E01", "E01", "E01", "E02"],
+        "year": [2002, 2002, 2003, 2003],
+        "con_gdhi": [5.0, 8.0, 15.0, 20.0],
+        "midpoint": [None, 7.5, None, 18.0],
+        "adjustment_val": [None, None, None, None],
+    })
+
+    with pytest.raises(
+        AdjustmentCheckError,
+        match="LAD sums do not match after adjustment for 2",
+    ) as excinfo:
+        apportion_adjustment(df)
+
+    failures = excinfo.value.failures
+    assert failures["lad_code"].tolist() == ["E01", "E02"]
+    assert failures["year"].tolist() == [2002, 2003]
+    assert failures["adjustment_check"].tolist() == [-0.5, -2.0]
+    assert isinstance(excinfo.value, ValueError)
+
+
+def test_check_lad_totals():
+    """Test check_lad_totals returns one row per (LAD, year) group."""
+    df = pd.DataFrame({
+        "lsoa_code": ["E1", "E2", "E1"],
+        "lad_code": ["E01", "E01", "E01"],
+        "year": [2002, 2002, 2003],
+        "con_gdhi": [5.0, 8.0, 15.0],
+        "adjusted_con_gdhi": [6.0, 7.0, 15.0],
+    })
+
+    result_df = check_lad_totals(df, np.array([0, 0, 1]))
+
+    expected_df = pd.DataFrame({
+        "lad_code": ["E01", "E01"],
+        "year": [2002, 2003],
+        "lsoa_count": [2, 1],
+        "unadjusted_sum": [13.0, 15.0],
+        "adjusted_sum": [13.0, 15.0],
+        "adjustment_check": [0.0, 0.0],
+    })
+
+    pd.testing.assert_frame_equal(result_df, expected_df)
+
+
+class TestApportionStrategies:
+    """Tests for apportion_adjustment strategies."""
+
+    @pytest.fixture
+    def df(self) -> pd.DataFrame:
+        """E2 is imputed from 8.0 to 7.0, a LAD adjustment of 1.0."""
+        return pd.DataFrame({
+            "lsoa_code": ["E1", "E2", "E3"],
+            "lad_code": ["E01", "E01", "E01"],
+            "year": [2002, 2002, 2002],
+            "uncon_gdhi": [10.0, 20.0, 70.0],
+            "con_gdhi": [5.0, 8.0, 12.0],
+            "midpoint": [None, 7.0, None],
+            "adjustment_val": [1.0, 1.0, 1.0],
+        })
+
+    @pytest.mark.parametrize(
+        "strategy, expected",
+        [
+            ("equal", [5.0 + 1 / 3, 7.0 + 1 / 3, 12.0 + 1 / 3]),
+            ("gdhi", [5.0 + 5 / 24, 7.0 + 7 / 24, 12.0 + 12 / 24]),
+            ("unconstrained", [5.1, 7.2, 12.7]),
+            ("exclude_adjusted", [5.5, 7.0, 12.5]),
+        ],
+    )
+    def test_apportion_adjustment_strategy(self, df, strategy, expected):
+        """Test each strategy shares the adjustment and keeps LAD totals."""
+        result_df = apportion_adjustment(df, strategy=strategy)
+
+        pd.testing.assert_series_equal(
+            result_df["adjusted_con_gdhi"],
+            pd.Series(expected, name="adjusted_con_gdhi"),
+        )
+        assert result_df["adjusted_con_gdhi"].sum() == pytest.approx(25.0)
+
+    def test_calc_apportion_weights_falls_back_to_equal(self, df):
+        """Test groups where every LSOA was adjusted are shared equally."""
+        df["midpoint"] = [4.0, 7.0, 11.0]
+
+        result = calc_apportion_weights(
+            df, np.array([0, 0, 0]), strategy="exclude_adjusted"
+        )
+
+        np.testing.assert_allclose(result, [1 / 3, 1 / 3, 1 / 3])
+
+    def test_calc_apportion_weights_unknown_strategy(self, df):
+        """Test an unknown strategy raises a ValueError."""
+        with pytest.raises(ValueError, match="Apportion strategy 'median'"):
+            calc_apportion_weights(df, np.array([0, 0, 0]), "median")
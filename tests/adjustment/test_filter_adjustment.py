@@ -5,6 +5,7 @@ from gdhi_adj.adjustment.filter_adjustment import (
     filter_adjust,
     filter_component,
     filter_year,
+    partition_components,
 )
 
 
@@ -103,3 +104,28 @@ class TestFilterComponent:
                 cord_code_filter="Y",
                 credit_debit_filter="Z",
             )
+
+
+def test_partition_components():
+    """Test partition_components splits data by component in key order."""
+    df = pd.DataFrame({
+        "lsoa_code": ["E1", "E1", "E2", "E2"],
+        "sas_code": ["B", "A", "B", "A"],
+        "cord_code": ["D75", "D75", "D75", "D75"],
+        "credit_debit": ["D", "D", "D", "D"],
+        "2002": [1.0, 2.0, 3.0, 4.0],
+    })
+
+    result = partition_components(df)
+
+    assert list(result) == [("A", "D75", "D"), ("B", "D75", "D")]
+    pd.testing.assert_frame_equal(
+        result[("A", "D75", "D")],
+        pd.DataFrame({
+            "lsoa_code": ["E1", "E2"],
+            "sas_code": ["A", "A"],
+            "cord_code": ["D75", "D75"],
+            "credit_debit": ["D", "D"],
+            "2002": [2.0, 4.0],
+        }),
+    )
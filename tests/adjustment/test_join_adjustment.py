@@ -2,6 +2,8 @@ import pandas as pd
 import pytest
 
 from gdhi_adj.adjustment.join_adjustment import (
+    JoinKeyError,
+    build_join_index,
     join_analyst_constrained_data,
     join_analyst_unconstrained_data,
 )
@@ -63,7 +65,8 @@ def test_join_analyst_constrained_data_adjust_failed_merge():
 
 def test_join_analyst_constrained_data_row_increase():
     """Test the join_analyst_constrained_data function where merging the
-    analyst data increases the number of rows."""
+    analyst data would increase the number of rows, so the duplicated keys
+    are reported before joining."""
     df_constrained = pd.DataFrame({
         "lsoa_code": ["E1", "E2"],
         "lad_code": ["E01", "E01"],
@@ -79,11 +82,21 @@ def test_join_analyst_constrained_data_row_increase():
     })
 
     with pytest.raises(
-        expected_exception=ValueError,
-        match="Number of rows of constrained data after join has increased."
-    ):
+        expected_exception=JoinKeyError,
+        match="Duplicate \\(lsoa_code, lad_code\\) keys found in analyst data"
+    ) as excinfo:
         join_analyst_constrained_data(df_constrained, df_analyst)
 
+    expected_diagnostics = pd.DataFrame({
+        "lsoa_code": ["E1"],
+        "lad_code": ["E01"],
+        "row_count": [2],
+    })
+
+    pd.testing.assert_frame_equal(
+        excinfo.value.diagnostics, expected_diagnostics
+    )
+
 
 def test_join_analyst_unconstrained_data():
     """Test the join_analyst_unconstrained_data function."""
@@ -157,7 +170,8 @@ def test_join_analyst_unconstrained_data_adjust_failed_merge():
 
 def test_join_analyst_unconstrained_data_row_increase():
     """Test the join_analyst_unconstrained_data function where merging the
-    analyst data increases the number of rows."""
+    analyst data would increase the number of rows, so the duplicated keys
+    are reported before joining."""
     df_constrained = pd.DataFrame({
         "lsoa_code": ["E1", "E2"],
         "lsoa_name": ["AA", "BB"],
@@ -179,7 +193,93 @@ def test_join_analyst_unconstrained_data_row_increase():
     })
 
     with pytest.raises(
-        expected_exception=ValueError,
-        match="Number of rows of unconstrained data after join has increased."
+        expected_exception=JoinKeyError,
+        match="Duplicate .* keys found in analyst data"
     ):
         join_analyst_unconstrained_data(df_constrained, df_analyst)
+
+
+def test_join_analyst_constrained_data_reports_unmatched():
+    """Test analyst rows to adjust that are missing from the constrained data
+    are listed in the error diagnostics."""
+    df_constrained = pd.DataFrame({
+        "lsoa_code": ["E1", "E2"],
+        "lad_code": ["E01", "E01"],
+        "2002": [10.0, 11.0],
+    })
+
+    df_analyst = pd.DataFrame({
+        "lsoa_code": ["E1", "E3", "E4"],
+        "lad_code": ["E01", "E01", "E01"],
+        "adjust": [True, True, False],
+        "year": [1, 1, 0],
+    })
+
+    with pytest.raises(JoinKeyError) as excinfo:
+        join_analyst_constrained_data(df_constrained, df_analyst)
+
+    expected_diagnostics = pd.DataFrame({
+        "lsoa_code": ["E3"],
+        "lad_code": ["E01"],
+    })
+
+    pd.testing.assert_frame_equal(
+        excinfo.value.diagnostics, expected_diagnostics
+    )
+
+
+def test_join_analyst_constrained_data_with_prebuilt_index():
+    """Test a prebuilt analyst index gives the same result as building it
+    inside the join."""
+    df_constrained = pd.DataFrame({
+        "lsoa_code": ["E2", "E1"],
+        "lad_code": ["E01", "E01"],
+        "2002": [11.0, 10.0],
+    })
+
+    df_analyst = pd.DataFrame({
+        "lsoa_code": ["E1", "E2"],
+        "lad_code": ["E01", "E01"],
+        "adjust": [True, False],
+        "year": [1, 0],
+    })
+
+    analyst_index = build_join_index(df_analyst, ["lsoa_code", "lad_code"])
+
+    result_df = join_analyst_constrained_data(
+        df_constrained, df_analyst, analyst_index
+    )
+
+    expected_df = pd.DataFrame({
+        "lsoa_code": ["E2", "E1"],
+        "lad_code": ["E01", "E01"],
+        "CON_2002": [11.0, 10.0],
+        "adjust": [False, True],
+        "year": [0, 1],
+    })
+
+    pd.testing.assert_frame_equal(result_df, expected_df)
+
+
+def test_join_analyst_constrained_data_empty_analyst():
+    """Test joining analyst data with no rows leaves every row unmatched."""
+    df_constrained = pd.DataFrame({
+        "lsoa_code": ["E1", "E2"],
+        "lad_code": ["E01", "E01"],
+        "2002": [10.0, 11.0],
+    })
+
+    df_analyst = pd.DataFrame({
+        "lsoa_code": pd.Series([], dtype=str),
+        "lad_code": pd.Series([], dtype=str),
+        "adjust": pd.Series([], dtype=bool),
+        "year": pd.Series([], dtype="Int64"),
+    })
+
+    result_df = join_analyst_constrained_data(df_constrained, df_analyst)
+
+    assert result_df.columns.tolist() == [
+        "lsoa_code", "lad_code", "CON_2002", "adjust", "year"
+    ]
+    assert result_df["CON_2002"].tolist() == [10.0, 11.0]
+    assert result_df[["adjust", "year"]].isna().all().all()
@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+
+from gdhi_adj.adjustment.mask_adjustment import (
+    check_mask_range,
+    count_year_mask,
+    decode_year_mask,
+    encode_year_mask,
+    union_year_masks,
+    year_mask_contains,
+)
+
+
+def test_encode_year_mask():
+    """Test encode_year_mask sets one bit per year for each row label."""
+    rows = pd.Series([10, 10, 30])
+    years = pd.Series([2010, 2012, 2011])
+
+    result = encode_year_mask(rows, years, pd.Index([10, 20, 30]), 2010)
+
+    expected = pd.Series([5, 0, 2], index=[10, 20, 30], dtype="int64")
+
+    pd.testing.assert_series_equal(result, expected)
+
+
+def test_year_mask_contains():
+    """Test year_mask_contains tests each row's year against its mask."""
+    mask = pd.Series([5, 5, 5, 5, 0])
+    years = pd.Series([2010, 2011, 2012, 2009, 2010])
+
+    result = year_mask_contains(mask, years, 2010)
+
+    assert result.tolist() == [True, False, True, False, False]
+
+
+def test_union_year_masks():
+    """Test union_year_masks sets a year if it is set in any mask."""
+    result = union_year_masks(pd.Series([1, 4]), pd.Series([2, 4]))
+
+    pd.testing.assert_series_equal(result, pd.Series([3, 4]))
+
+
+def test_count_year_mask():
+    """Test count_year_mask counts the years set in each mask."""
+    result = count_year_mask(pd.Series([0, 1, 5, 2**62 + 3]))
+
+    pd.testing.assert_series_equal(result, pd.Series([0, 1, 2, 3]))
+
+
+def test_decode_year_mask():
+    """Test decode_year_mask returns comma separated analyst years."""
+    result = decode_year_mask(pd.Series([0, 1, 12]), 2010)
+
+    pd.testing.assert_series_equal(
+        result, pd.Series(["", "2010", "2012,2013"])
+    )
+
+
+def test_check_mask_range():
+    """Test check_mask_range rejects ranges longer than the mask."""
+    check_mask_range(2000, 2062)
+
+    with pytest.raises(ValueError, match="longer than 63 years"):
+        check_mask_range(2000, 2063)
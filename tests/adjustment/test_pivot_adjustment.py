@@ -29,7 +29,8 @@ def test_pivot_adjustment_long():
         "lad_code": ["E01", "E01", "E01", "E01"],
         "lad_name": ["AAA", "AAA", "AAA", "AAA"],
         "adjust": [True, float("NaN"), True, float("NaN")],
-        "year_to_adjust": [2002, float("NaN"), 2002, float("NaN")],
+        # missing year masks are filled with an empty mask
+        "year_to_adjust": [2002, 0, 2002, 0],
         "year": [2002, 2002, 2003, 2003],
         "uncon_gdhi": [10.0, 11.0, 20.0, 21.0],
         "con_gdhi": [30.0, 31.0, 40.0, 41.0]
@@ -3,9 +3,10 @@ import pandas as pd
 import pytest
 
 from gdhi_adj.adjustment.reformat_adjustment import (
+    YearColumnError,
+    parse_year_lists,
     reformat_adjust_col,
     reformat_year_col,
-    to_int_list,
 )
 
 
@@ -24,50 +25,33 @@ def test_reformat_adjust_col():
     pd.testing.assert_frame_equal(result_df, expected_df)
 
 
-def test_to_int_list():
-    """Test various inputs to to_int_list behave as implemented.
-
-    Note: the function treats list-like inputs differently from scalar
-    inputs. For scalar empty or 'nan' strings it returns an empty list; for
-    list-like inputs it returns an empty list when all items are NA.
-    """
-
-    # comma-separated string
-    assert to_int_list("2010,2011, 2012") == [2010, 2011, 2012]
-
-    # list of strings
-    assert to_int_list(["2010", "2011"]) == [2010, 2011]
-
-    # list containing numeric types
-    assert to_int_list([2010, 2011]) == [2010, 2011]
-
-    # numpy array
-    assert to_int_list(np.array(["2010", "2011"])) == [2010, 2011]
-
-    # list with None/NaN items -> they are skipped
-    assert to_int_list(["2010", None, float("nan"), "2012"]) == [2010, 2012]
+def test_reformat_adjust_col_read_as_bool():
+    """Test adjust values read from CSV as booleans are reformatted."""
+    df = pd.DataFrame({
+        "adjust": [True, False, np.nan, True],
+    }).astype(str)
 
-    # float tokens should be converted via int(float(token))
-    assert to_int_list("2010.0, 2011.0") == [2010, 2011]
+    result_df = reformat_adjust_col(df)
 
-    # empty string and explicit nan scalar return None (per current impl)
-    assert to_int_list("") == []
-    assert to_int_list(float("nan")) == []
+    expected_df = pd.DataFrame({
+        "adjust": [True, False, False, True],
+    })
 
-    # invalid token raises ValueError
-    with pytest.raises(ValueError):
-        to_int_list("20a,2010")
+    pd.testing.assert_frame_equal(result_df, expected_df)
 
 
 class TestReformatYearCol:
     """Test reformat_year_col function."""
     def test_reformat_year_col_correct(self):
-        """Test reformat_year_col normalises year cell formats to tuples
+        """Test reformat_year_col normalises year cell formats to bitmasks
 
         It should turn:
-        - single year strings into single-element tuples,
-        - comma-separated year strings into tuples of ints,
-        - missing/empty values into empty tuples.
+        - single year strings into a mask with one bit set,
+        - comma-separated year strings into a mask with each year's bit set,
+        - missing/empty values into an empty (zero) mask.
+
+        Bit 0 is the start year, so 2002 is 1, 2003 is 2, 2004 is 4 and 2005
+        is 8.
         """
 
         df = pd.DataFrame({
@@ -80,7 +64,7 @@ class TestReformatYearCol:
         result_df = reformat_year_col(df, start_year, end_year)
 
         expected_df = pd.DataFrame({
-            "year": [(2002,), (2002, 2003), (), (), (2004, 2005)],
+            "year": [1, 3, 0, 0, 12],
         })
 
         # sort/index are preserved; compare allowing dtype differences
@@ -117,3 +101,41 @@ class TestReformatYearCol:
             match=("Year 2006 in year column is out of valid range 2002-2005.")
         ):
             reformat_year_col(df, start_year, end_year)
+
+    def test_reformat_year_col_reports_all_errors(self):
+        """Test reformat_year_col reports every offending row at once."""
+        df = pd.DataFrame({
+            "lsoa_code": ["E1", "E2", "E3", "E4"],
+            "year": ["2002,2002", "20a, 2003", "2001", None],
+        })
+
+        with pytest.raises(
+            YearColumnError,
+            match="Invalid years found in year column in 3 row"
+        ) as excinfo:
+            reformat_year_col(df, 2002, 2005)
+
+        errors = excinfo.value.errors
+        assert errors["row"].tolist() == [0, 1, 2]
+        assert errors["lsoa_code"].tolist() == ["E1", "E2", "E3"]
+        assert errors["token"].tolist() == ["2002", "20a", "2001"]
+        assert errors["problem"].tolist() == [
+            "Duplicate years found in year column within LSOA.",
+            "Cannot convert value '20a' to int.",
+            "Year 2001 in year column is out of valid range 2002-2005.",
+        ]
+
+
+def test_parse_year_lists():
+    """Test parse_year_lists explodes year lists into (row, year) rows."""
+    years = pd.Series(["2002", " 2003 ,2004", None, "", "2005.0"])
+
+    result_df = parse_year_lists(years)
+
+    expected_df = pd.DataFrame({
+        "row": [0, 1, 1, 4],
+        "token": ["2002", "2003", "2004", "2005.0"],
+        "year": [2002.0, 2003.0, 2004.0, 2005.0],
+    })
+
+    pd.testing.assert_frame_equal(result_df, expected_df)
@@ -0,0 +1,110 @@
+import pandas as pd
+import pytest
+
+from gdhi_adj.adjustment.filter_adjustment import partition_components
+from gdhi_adj.adjustment.run_adjustment import (
+    adjust_component,
+    adjust_components,
+)
+
+
+@pytest.fixture
+def ids() -> dict:
+    """Geography columns shared by all test inputs."""
+    return {
+        "lsoa_code": ["E1", "E2", "E3"],
+        "lsoa_name": ["AA", "BB", "CC"],
+        "lad_code": ["E01", "E01", "E01"],
+        "lad_name": ["AAA", "AAA", "AAA"],
+    }
+
+
+@pytest.fixture
+def df_analyst(ids) -> pd.DataFrame:
+    """Analyst data marking 2003 (bit 1 from 2002) of E1 for adjustment."""
+    return pd.DataFrame({
+        "lsoa_code": ["E1"],
+        "lad_code": ["E01"],
+        "adjust": [True],
+        "year": pd.array([2], dtype="Int64"),
+    })
+
+
+@pytest.fixture
+def df_unconstrained(ids) -> pd.DataFrame:
+    """Unconstrained data for three LSOAs."""
+    return pd.DataFrame({
+        **ids,
+        "2002": [1.0, 2.0, 3.0],
+        "2003": [1.0, 2.0, 3.0],
+        "2004": [1.0, 2.0, 3.0],
+    })
+
+
+@pytest.fixture
+def df_constrained(ids) -> pd.DataFrame:
+    """Constrained data for two components, the second with an outlier."""
+    component_a = pd.DataFrame({
+        **ids,
+        "sas_code": ["A"] * 3,
+        "cord_code": ["D75"] * 3,
+        "credit_debit": ["D"] * 3,
+        "2002": [10.0, 20.0, 30.0],
+        "2003": [10.0, 20.0, 30.0],
+        "2004": [10.0, 20.0, 30.0],
+    })
+    component_b = component_a.assign(sas_code="B")
+    component_b["2003"] = [16.0, 20.0, 30.0]
+
+    return pd.concat([component_a, component_b], ignore_index=True)
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_adjust_components(
+    df_constrained, df_analyst, df_unconstrained, max_workers
+):
+    """Test every component is adjusted, in or out of process, with the same
+    result as adjusting the component on its own."""
+    partitions = partition_components(df_constrained)
+
+    adjusted, qa_summary = adjust_components(
+        partitions,
+        df_analyst,
+        df_unconstrained,
+        max_workers=max_workers,
+        start_year=2002,
+        end_year=2004,
+    )
+
+    assert list(adjusted) == [("A", "D75", "D"), ("B", "D75", "D")]
+    for key, df in adjusted.items():
+        expected_df = adjust_component(
+            partitions[key], df_analyst, df_unconstrained, 2002, 2004
+        )
+        pd.testing.assert_frame_equal(df, expected_df)
+
+    assert qa_summary["status"].tolist() == ["adjusted", "adjusted"]
+    assert qa_summary["years_imputed"].tolist() == [1, 1]
+    assert qa_summary["total_abs_adjustment"].tolist() == [0.0, 6.0]
+
+
+def test_adjust_components_records_failures(
+    df_constrained, df_analyst, df_unconstrained
+):
+    """Test a failing component is reported without stopping the others."""
+    partitions = partition_components(df_constrained)
+    partitions[("A", "D75", "D")] = partitions[("A", "D75", "D")].assign(
+        lad_code="E02"
+    )
+
+    adjusted, qa_summary = adjust_components(
+        partitions,
+        df_analyst,
+        df_unconstrained,
+        start_year=2002,
+        end_year=2004,
+    )
+
+    assert list(adjusted) == [("B", "D75", "D")]
+    assert qa_summary["status"][0].startswith("failed: JoinKeyError")
+    assert qa_summary["status"][1] == "adjusted"
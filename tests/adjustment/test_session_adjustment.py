@@ -0,0 +1,288 @@
+import os
+
+import pandas as pd
+import pytest
+
+from gdhi_adj.adjustment import session_adjustment
+from gdhi_adj.adjustment.join_adjustment import JoinKeyError
+from gdhi_adj.adjustment.run_adjustment import (
+    adjust_component,
+    prepare_analyst_data,
+)
+from gdhi_adj.adjustment.session_adjustment import (
+    AdjustmentSession,
+    diff_adjusted_output,
+    watch_adjustment,
+)
+from gdhi_adj.utils.config import apply_overrides, load_toml_config
+from gdhi_adj.utils.synthetic_data import generate_dataset, write_dataset
+
+
+@pytest.fixture
+def session() -> AdjustmentSession:
+    """Session holding constrained data with an outlier in 2003 for E1."""
+    ids = {
+        "lsoa_code": ["E1", "E2"],
+        "lsoa_name": ["AA", "BB"],
+        "lad_code": ["E01", "E01"],
+        "lad_name": ["AAA", "AAA"],
+    }
+    df_constrained = pd.DataFrame({
+        **ids,
+        "2002": [10.0, 20.0],
+        "2003": [16.0, 20.0],
+        "2004": [10.0, 20.0],
+    })
+    df_unconstrained = pd.DataFrame({
+        **ids,
+        "2002": [1.0, 2.0],
+        "2003": [1.0, 2.0],
+        "2004": [1.0, 2.0],
+    })
+
+    return AdjustmentSession(
+        df_constrained,
+        df_unconstrained,
+        {"start_year": 2002, "end_year": 2004},
+    )
+
+
+def analyst_data(years: str) -> pd.DataFrame:
+    """Analyst data adjusting the given years of E1."""
+    return pd.DataFrame({
+        "lsoa_code": ["E1", "E2"],
+        "lad_code": ["E01", "E01"],
+        "adjust": ["TRUE", "FALSE"],
+        "year": [years, None],
+    })
+
+
+def test_diff_adjusted_output():
+    """Test changed, added and removed LSOAs are listed with the years that
+    changed."""
+    previous = pd.DataFrame({
+        "lsoa_code": ["E1", "E2", "E3"],
+        "lsoa_name": ["AA", "BB", "CC"],
+        "lad_code": ["E01", "E01", "E01"],
+        "lad_name": ["AAA", "AAA", "AAA"],
+        2002: [1.0, 2.0, 3.0],
+        2003: [1.0, None, 3.0],
+    })
+    current = pd.DataFrame({
+        "lsoa_code": ["E1", "E2", "E4"],
+        "lsoa_name": ["AA", "BB", "DD"],
+        "lad_code": ["E01", "E01", "E01"],
+        "lad_name": ["AAA", "AAA", "AAA"],
+        2002: [1.0, 2.0, 4.0],
+        2003: [1.5, None, 4.0],
+    })
+
+    result_df = diff_adjusted_output(previous, current)
+
+    assert result_df["lsoa_code"].tolist() == ["E1", "E3", "E4"]
+    assert result_df["change"].tolist() == ["changed", "removed", "added"]
+    assert result_df["changed_years"].tolist() == [
+        "2003",
+        "2002,2003",
+        "2002,2003",
+    ]
+    assert result_df["max_abs_change"][0] == 0.5
+
+
+def test_adjustment_session_reports_changes(session):
+    """Test the first adjustment reports every LSOA, and later adjustments
+    report only the LSOAs whose adjusted values changed."""
+    _, first_changes = session.adjust(analyst_data("2003"))
+    assert first_changes["change"].tolist() == ["added", "added"]
+
+    _, same_changes = session.adjust(analyst_data("2003"))
+    assert same_changes.empty
+
+    df, changes = session.adjust(analyst_data("2002,2003"))
+    assert changes["lsoa_code"].tolist() == ["E1", "E2"]
+    assert changes["changed_years"].tolist() == ["2002", "2002"]
+    assert df["year_to_adjust"].max() == 3
+
+
+@pytest.fixture
+def lad_inputs() -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Constrained and unconstrained data for two LSOAs in each of three
+    LADs."""
+    ids = {
+        "lsoa_code": ["E1", "E2", "E3", "E4", "E5", "E6"],
+        "lsoa_name": ["AA", "BB", "CC", "DD", "EE", "FF"],
+        "lad_code": ["E02", "E02", "E01", "E01", "E03", "E03"],
+        "lad_name": ["BBB", "BBB", "AAA", "AAA", "CCC", "CCC"],
+    }
+    df_constrained = pd.DataFrame({
+        **ids,
+        "2002": [10.0, 20.0, 30.0, 40.0, 50.0, 60.0],
+        "2003": [16.0, 20.0, 38.0, 40.0, 50.0, 66.0],
+        "2004": [10.0, 20.0, 30.0, 40.0, 50.0, 60.0],
+    })
+    df_unconstrained = pd.DataFrame({
+        **ids,
+        "2002": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+        "2003": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+        "2004": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+    })
+
+    return df_constrained, df_unconstrained
+
+
+def lad_analyst_data(years: list) -> pd.DataFrame:
+    """Analyst data adjusting the given years of E1, E3 and E6."""
+    return pd.DataFrame({
+        "lsoa_code": ["E1", "E3", "E6"],
+        "lad_code": ["E02", "E01", "E03"],
+        "adjust": ["TRUE", "TRUE", "TRUE"],
+        "year": years,
+    })
+
+
+def test_adjustment_session_matches_full_adjustment(lad_inputs):
+    """Test the output stitched from LAD partitions matches adjusting all
+    LADs together."""
+    df_constrained, df_unconstrained = lad_inputs
+    settings = {"start_year": 2002, "end_year": 2004}
+    session = AdjustmentSession(df_constrained, df_unconstrained, settings)
+
+    result_df, _ = session.adjust(
+        lad_analyst_data(["2003", "2003", "2003"])
+    )
+
+    expected_df = adjust_component(
+        df_constrained,
+        prepare_analyst_data(
+            lad_analyst_data(["2003", "2003", "2003"]), 2002, 2004
+        ),
+        df_unconstrained,
+        **settings,
+    )
+    pd.testing.assert_frame_equal(result_df, expected_df)
+
+
+def test_adjustment_session_recomputes_changed_lads(lad_inputs):
+    """Test only LADs whose analyst rows changed are adjusted again."""
+    session = AdjustmentSession(
+        *lad_inputs, {"start_year": 2002, "end_year": 2004}
+    )
+
+    session.adjust(lad_analyst_data(["2003", "2003", "2003"]))
+    assert session.recomputed_lads == ["E01", "E02", "E03"]
+
+    _, changes = session.adjust(
+        lad_analyst_data(["2003", "2003,2004", "2003"])
+    )
+    assert session.recomputed_lads == ["E01"]
+    assert changes["lsoa_code"].tolist() == ["E3", "E4"]
+
+    _, changes = session.adjust(
+        lad_analyst_data(["2003", "2003,2004", "2003"])
+    )
+    assert session.recomputed_lads == []
+    assert changes.empty
+
+
+def test_adjustment_session_unknown_lad(lad_inputs):
+    """Test analyst rows in LADs missing from the constrained data raise."""
+    session = AdjustmentSession(
+        *lad_inputs, {"start_year": 2002, "end_year": 2004}
+    )
+    df_analyst = lad_analyst_data(["2003", "2003", "2003"])
+    df_analyst.loc[2, "lad_code"] = "E09"
+
+    with pytest.raises(JoinKeyError, match="not found in constrained data"):
+        session.adjust(df_analyst)
+
+
+@pytest.fixture
+def watch_config(tmp_path) -> dict:
+    """Config to watch synthetic analyst data in tmp_path."""
+    write_dataset(generate_dataset(n_lads=2, lsoas_per_lad=5), str(tmp_path))
+    return apply_overrides(
+        load_toml_config("config/config.toml"),
+        [
+            f'user_dir="{tmp_path}"',
+            'local_or_shared="local"',
+            'adjustment_local_settings.input_adj_file_path='
+            '"/synthetic_analyst.csv"',
+            'adjustment_local_settings.input_constrained_file_path='
+            '"/synthetic_constrained.csv"',
+            'adjustment_local_settings.input_unconstrained_file_path='
+            '"/synthetic_unconstrained.csv"',
+            'adjustment_local_settings.output_dir="/"',
+        ],
+    )
+
+
+def test_watch_adjustment_survives_missing_files(
+    tmp_path, watch_config, monkeypatch
+):
+    """Test the watch keeps polling while the analyst file is replaced and
+    while an output cannot be written."""
+    analyst_path = tmp_path / "synthetic_analyst.csv"
+    changes_path = tmp_path / "test_manual_adj_adjustments_changes.csv"
+
+    # Fail the first save, as if an output were open in Excel
+    save_adjustment_outputs = session_adjustment.save_adjustment_outputs
+    saves = []
+
+    def save_once_locked(*args):
+        saves.append(args)
+        if len(saves) == 1:
+            raise PermissionError("output is open")
+        save_adjustment_outputs(*args)
+
+    # Between polls, remove the analyst file and put it back newer, as an
+    # editor saving through a temporary file does
+    polls = []
+
+    def replace_analyst_file(seconds):
+        polls.append(seconds)
+        if len(polls) == 1:
+            os.rename(analyst_path, tmp_path / "analyst.tmp")
+        elif len(polls) == 2:
+            os.rename(tmp_path / "analyst.tmp", analyst_path)
+            modified = os.path.getmtime(analyst_path) + 10
+            os.utime(analyst_path, (modified, modified))
+
+    monkeypatch.setattr(
+        session_adjustment, "save_adjustment_outputs", save_once_locked
+    )
+    monkeypatch.setattr(session_adjustment.time, "sleep", replace_analyst_file)
+
+    watch_adjustment(watch_config, poll_interval=0, max_runs=2)
+
+    # The failed save is retried on the next poll, before the analyst file
+    # is replaced, and the second adjustment is saved too
+    assert len(polls) == 2
+    assert len(saves) == 3
+    assert saves[1][0] is saves[0][0]
+    assert changes_path.exists()
+
+
+def test_watch_adjustment_rereads_locked_analyst_file(
+    tmp_path, watch_config, monkeypatch
+):
+    """Test an analyst file that cannot be read is read again on the next
+    poll, even though it has not been saved again."""
+    read_with_schema = session_adjustment.read_with_schema
+    reads = []
+
+    def read_once_locked(path, schema_path):
+        if path.endswith("synthetic_analyst.csv"):
+            reads.append(path)
+            if len(reads) == 1:
+                raise PermissionError("analyst file is open")
+        return read_with_schema(path, schema_path)
+
+    monkeypatch.setattr(
+        session_adjustment, "read_with_schema", read_once_locked
+    )
+    monkeypatch.setattr(session_adjustment.time, "sleep", lambda seconds: None)
+
+    watch_adjustment(watch_config, poll_interval=0, max_runs=1)
+
+    assert len(reads) == 2
+    assert (tmp_path / "test_manual_adj_adjustments_changes.csv").exists()
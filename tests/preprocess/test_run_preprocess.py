@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from gdhi_adj.preprocess.calc_preprocess import calc_rate_of_change
+from gdhi_adj.preprocess.flag_preprocess import flag_rollback_years
+from gdhi_adj.preprocess.run_preprocess import (
+    flag_outliers,
+    partition_lads_balanced,
+    preprocess_lad_partitions,
+    preprocess_lads,
+)
+
+FLAG_SETTINGS = {
+    "zscore_calculation": True,
+    "iqr_calculation": True,
+    "zscore_upper_threshold": 2.0,
+    "zscore_lower_threshold": -2.0,
+    "iqr_lower_quantile": 0.25,
+    "iqr_upper_quantile": 0.75,
+    "iqr_multiplier": 1.0,
+}
+
+
+@pytest.fixture
+def df_long() -> pd.DataFrame:
+    """Long GDHI data with rate of change and rollback flags for LADs with
+    different numbers of LSOAs."""
+    rng = np.random.default_rng(7)
+    lsoas_per_lad = {"E01": 6, "E02": 3, "E03": 8, "E04": 2, "E05": 5}
+    years = list(range(2010, 2021))
+
+    rows = []
+    for lad_code, n_lsoas in lsoas_per_lad.items():
+        for i in range(n_lsoas):
+            values = rng.lognormal(6, 0.2, len(years))
+            if i == 0:
+                # Years before 2015 rolled back from 2015
+                values[:5] = values[5]
+            if i == 1:
+                values[7] *= 3
+            for year, value in zip(years, values):
+                rows.append({
+                    "lsoa_code": f"{lad_code}{i:03d}",
+                    "lsoa_name": f"{lad_code} LSOA {i}",
+                    "lad_code": lad_code,
+                    "lad_name": f"LAD {lad_code}",
+                    "year": year,
+                    "uncon_gdhi": value,
+                })
+    df = pd.DataFrame(rows).sample(frac=1, random_state=1)
+
+    for ascending in [False, True]:
+        df = calc_rate_of_change(
+            df,
+            ascending=ascending,
+            sort_cols=["lsoa_code", "year"],
+            group_col="lsoa_code",
+            val_col="uncon_gdhi",
+        )
+
+    return flag_rollback_years(df)
+
+
+@pytest.fixture
+def ra_lad() -> pd.DataFrame:
+    """Long regional accounts data for every LAD and year."""
+    lad_years = pd.MultiIndex.from_product(
+        [["E01", "E02", "E03", "E04", "E05"], range(2010, 2021)],
+        names=["lad_code", "year"],
+    ).to_frame(index=False)
+
+    return lad_years.assign(
+        **{
+            "Region": "NE",
+            "Region name": "North East",
+            "Transaction code": "B.2g",
+            "transaction_name": "Operating surplus",
+            "uncon_gdhi": np.arange(len(lad_years)) * 10.0 + 1000.0,
+        }
+    )
+
+
+def test_partition_lads_balanced(df_long):
+    """Test LADs are kept whole and spread evenly across partitions."""
+    partitions = partition_lads_balanced(df_long, 3)
+
+    assert [part["lad_code"].unique().tolist() for part in partitions] == [
+        ["E03"],
+        ["E01", "E04"],
+        ["E02", "E05"],
+    ]
+    assert sum(len(part) for part in partitions) == len(df_long)
+
+
+@pytest.mark.parametrize("max_workers", [2, 3, 8])
+def test_preprocess_lad_partitions_matches_serial(
+    df_long, ra_lad, max_workers
+):
+    """Test partitioned preprocessing is identical to the serial path."""
+    expected_interim, expected_constrained = preprocess_lads(
+        df_long.copy(), ra_lad, "Operating surplus", **FLAG_SETTINGS
+    )
+
+    result_interim, result_constrained = preprocess_lad_partitions(
+        df_long.copy(),
+        ra_lad,
+        "Operating surplus",
+        max_workers,
+        **FLAG_SETTINGS,
+    )
+
+    assert expected_constrained["master_flag"].eq("TRUE").any()
+    pd.testing.assert_frame_equal(
+        result_interim, expected_interim, check_exact=True
+    )
+    pd.testing.assert_frame_equal(
+        result_constrained, expected_constrained, check_exact=True
+    )
+
+
+def test_flag_outliers_threads_match_serial(df_long):
+    """Test running the detectors on threads gives the same flags."""
+    expected_df = flag_outliers(df_long.copy(), **FLAG_SETTINGS)
+
+    result_df = flag_outliers(
+        df_long.copy(), detector_threads=3, **FLAG_SETTINGS
+    )
+
+    pd.testing.assert_frame_equal(result_df, expected_df, check_exact=True)
@@ -0,0 +1,118 @@
+"""Unit tests for the in-memory pipeline API."""
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas.testing as pdt
+import pytest
+
+from gdhi_adj.api import adjust, preprocess
+from gdhi_adj.utils.config import load_toml_config
+from gdhi_adj.utils.helpers import read_with_schema
+from gdhi_adj.utils.synthetic_data import (
+    TRANSACTIONS,
+    generate_dataset,
+    write_dataset,
+)
+
+SCHEMA_PATH = "config/schemas/"
+
+
+@pytest.fixture(scope="module")
+def frames(tmp_path_factory):
+    """Inputs of both steps, read with their schemas."""
+    dataset = generate_dataset(
+        n_lads=4, lsoas_per_lad=15, n_components=2, outlier_rate=0.1, seed=3
+    )
+    paths = write_dataset(dataset, str(tmp_path_factory.mktemp("api")))
+    schemas = {
+        "unconstrained": "input_gdhi_schema.toml",
+        "ra_lad": "input_ra_lad_schema.toml",
+        "analyst": "input_adj_schema.toml",
+        "constrained": "input_constrained_schema.toml",
+    }
+    frames = {
+        name: read_with_schema(
+            paths["regional_accounts" if name == "ra_lad" else name],
+            SCHEMA_PATH + schema,
+        )
+        for name, schema in schemas.items()
+    }
+    frames["adj_unconstrained"] = read_with_schema(
+        paths["unconstrained"],
+        SCHEMA_PATH + "input_unconstrained_schema.toml",
+    )
+    return frames
+
+
+@pytest.fixture
+def settings():
+    """User settings of the default config for the synthetic data."""
+    user_settings = load_toml_config("config/config.toml")["user_settings"]
+    return {**user_settings, "transaction_name": TRANSACTIONS[0][1]}
+
+
+def adjust_frames_of(frames: dict) -> dict:
+    """Inputs of adjust from the shared frames."""
+    return {
+        "analyst": frames["analyst"],
+        "constrained": frames["constrained"],
+        "unconstrained": frames["adj_unconstrained"],
+    }
+
+
+def test_api_does_not_change_inputs(frames, settings):
+    """Test preprocess and adjust leave the input DataFrames unchanged."""
+    before = {name: df.copy() for name, df in frames.items()}
+
+    preprocess(frames, settings)
+    adjust(adjust_frames_of(frames), settings)
+    adjust(adjust_frames_of(frames), {**settings, "batch_components": True})
+
+    for name, df in frames.items():
+        pdt.assert_frame_equal(df, before[name])
+
+
+def test_adjust_returns_outputs_by_component(frames, settings):
+    """Test adjust returns the filtered component, or every component in a
+    batch."""
+    result = adjust(adjust_frames_of(frames), settings)
+
+    key = ("G866BTR", "D75", "D")
+    assert list(result["output"]) == [key]
+    assert result["qa_summary"]["status"].tolist() == ["adjusted"]
+    interim = result["interim"][key]
+    assert interim["year_to_adjust"].str.fullmatch(r"[\d,]*").all()
+
+    batch = adjust(
+        adjust_frames_of(frames), {**settings, "batch_components": True}
+    )
+    assert len(batch["output"]) == 2
+    pdt.assert_frame_equal(batch["output"][key], result["output"][key])
+
+
+def test_concurrent_runs_match_serial_runs(frames, settings):
+    """Test runs with different settings on threads over shared inputs give
+    the same outputs as running them one at a time."""
+    runs = [
+        {**settings, "iqr_multiplier": multiplier, "detector_threads": 1}
+        for multiplier in (1.0, 1.5, 3.0)
+    ] + [
+        {**settings, "imputation_method": "interpolate"},
+        {**settings, "apportion_strategy": "gdhi"},
+    ]
+
+    def run(run_settings):
+        return (
+            preprocess(frames, run_settings),
+            adjust(adjust_frames_of(frames), run_settings),
+        )
+
+    serial = [run(run_settings) for run_settings in runs]
+    with ThreadPoolExecutor(max_workers=len(runs)) as executor:
+        concurrent = list(executor.map(run, runs))
+
+    for (pre, adj), (serial_pre, serial_adj) in zip(concurrent, serial):
+        for name in ("interim", "constrained", "output"):
+            pdt.assert_frame_equal(pre[name], serial_pre[name])
+        for key, df in adj["output"].items():
+            pdt.assert_frame_equal(df, serial_adj["output"][key])
+    assert not serial[0][0]["output"].equals(serial[2][0]["output"])
@@ -0,0 +1,141 @@
+"""Unit tests for the benchmark runner."""
+import pytest
+
+from gdhi_adj.bench import cases
+from gdhi_adj.bench.__main__ import main
+from gdhi_adj.bench.compare import compare_results, format_comparison
+from gdhi_adj.bench.runner import (
+    load_results,
+    results_table,
+    run_benchmarks,
+    save_results,
+    summarise_times,
+)
+from gdhi_adj.utils.config import load_toml_config
+
+
+def test_summarise_times():
+    """Test the median, range and interquartile range of repeat times."""
+    summary = summarise_times([1.0, 2.0, 3.0, 4.0, 10.0])
+
+    assert summary["median"] == 3.0
+    assert summary["min"] == 1.0
+    assert summary["max"] == 10.0
+    assert summary["iqr"] == pytest.approx(5.5)
+
+
+def test_run_benchmarks_every_case(tmp_path, monkeypatch):
+    """Test every case runs on a small scale and the results are saved."""
+    monkeypatch.setitem(cases.SCALES, "1x", {"n_lads": 3, "lsoas_per_lad": 8})
+    config = load_toml_config("config/config.toml")
+
+    results = run_benchmarks(config, scales=["1x"], repeats=2)
+
+    table = results_table(results)
+    assert sorted(table["case"]) == sorted(cases.CASES)
+    assert (table["scale"] == "1x").all()
+    assert (table["min"] > 0).all()
+    assert all(len(result["times"]) == 2 for result in results["results"])
+    assert results["machine"]["machine_class"]
+
+    path = str(tmp_path / "results.json")
+    save_results(results, path)
+    assert load_results(path) == results
+
+
+def test_run_benchmarks_unknown_case():
+    """Test unknown cases are rejected before any data is generated."""
+    with pytest.raises(ValueError, match="not_a_case"):
+        run_benchmarks({}, cases=["not_a_case"])
+
+
+def bench_results(medians, iqr=0.001, machine_class="linux-x86_64-4cpu"):
+    """Benchmark results with the given median time of each case."""
+    return {
+        "machine": {"machine_class": machine_class},
+        "results": [
+            {"case": case, "scale": "1x", "median": median, "iqr": iqr}
+            for case, median in medians.items()
+        ],
+    }
+
+
+def test_compare_results_status():
+    """Test slowdowns beyond tolerance and noise are regressions."""
+    baseline = bench_results(
+        {
+            "apportion_adjustment": 0.1,
+            "calc_midpoint_val": 0.1,
+            "calc_interpolated_val": 0.1,
+            "read_with_schema": 0.1,
+            "pivot_wide_final_dataframe": 0.0001,
+            "dropped": 0.1,
+        }
+    )
+    results = bench_results(
+        {
+            "apportion_adjustment": 2.0,
+            "calc_midpoint_val": 0.105,
+            "calc_interpolated_val": 0.05,
+            "read_with_schema": 0.12,
+            "pivot_wide_final_dataframe": 0.0005,
+            "added": 0.1,
+        }
+    )
+
+    comparison = compare_results(baseline, results).set_index("case")
+
+    assert comparison["status"].to_dict() == {
+        "apportion_adjustment": "regressed",
+        "calc_midpoint_val": "unchanged",
+        "calc_interpolated_val": "faster",
+        # Within the wider tolerance of file reads
+        "read_with_schema": "unchanged",
+        # Five times slower but within the noise
+        "pivot_wide_final_dataframe": "unchanged",
+        "dropped": "missing",
+        "added": "new",
+    }
+    assert comparison.loc["apportion_adjustment", "ratio"] == 20.0
+    assert "+1900.0%" in format_comparison(comparison.reset_index())
+
+
+def test_compare_results_noise():
+    """Test a slowdown within the interquartile range is not a regression."""
+    baseline = bench_results({"calc_midpoint_val": 0.1}, iqr=0.05)
+    results = bench_results({"calc_midpoint_val": 0.14}, iqr=0.01)
+
+    assert compare_results(baseline, results)["status"][0] == "unchanged"
+    assert (
+        compare_results(baseline, results, min_seconds=0.0)["status"][0]
+        == "unchanged"
+    )
+
+
+def test_main_compare_exit_code(tmp_path, capsys):
+    """Test compare exits non-zero only when a case regresses."""
+    baseline = str(tmp_path / "baseline.json")
+    slower = str(tmp_path / "slower.json")
+    same = str(tmp_path / "same.json")
+    save_results(bench_results({"apportion_adjustment": 0.1}), baseline)
+    save_results(bench_results({"apportion_adjustment": 0.5}), slower)
+    save_results(bench_results({"apportion_adjustment": 0.1}), same)
+
+    args = ["compare", "--baseline", baseline, "--results"]
+    assert main(args + [same]) == 0
+    assert main(args + [slower]) == 1
+    assert "apportion_adjustment (1x)" in capsys.readouterr().out
+
+
+def test_main_compare_other_machine_class(tmp_path):
+    """Test results are not compared with another machine class."""
+    baseline = str(tmp_path / "baseline.json")
+    results = str(tmp_path / "results.json")
+    save_results(bench_results({"apportion_adjustment": 0.1}), baseline)
+    save_results(
+        bench_results({"apportion_adjustment": 0.1}, machine_class="other"),
+        results,
+    )
+
+    with pytest.raises(SystemExit):
+        main(["compare", "--baseline", baseline, "--results", results])
@@ -0,0 +1,170 @@
+"""Unit tests for stage checkpoints."""
+import json
+import os
+
+import pandas as pd
+import pandas.testing as pdt
+
+from gdhi_adj.utils import checkpoint
+from gdhi_adj.utils.checkpoint import MANIFEST_FILENAME, Checkpointer
+from gdhi_adj.utils.stage_cache import StageCache
+
+
+def make_stages(checkpoints, input_path, calls, multiplier=2):
+    """Run a read stage and a dependent scale stage, counting calls."""
+
+    def read(path):
+        calls.append("read")
+        return pd.read_csv(path)
+
+    def scale(df, multiplier):
+        calls.append("scale")
+        return df.assign(value=df["value"] * multiplier)
+
+    with checkpoints.in_section("preprocessing"):
+        df = checkpoints.run("read", read, input_path, files=[input_path])
+        return checkpoints.run(
+            "scale",
+            scale,
+            df,
+            multiplier,
+            depends_on=("read",),
+            settings=multiplier,
+        )
+
+
+def test_checkpointer_resumes_unchanged_stages(tmp_path):
+    """Test unchanged stages are loaded and changed stages run again."""
+    input_path = str(tmp_path / "input.csv")
+    pd.DataFrame({"lsoa_code": ["E1", "E2"], "value": [1, 2]}).to_csv(
+        input_path, index=False
+    )
+    folder = str(tmp_path / "checkpoints" / "run_1")
+
+    calls = []
+    first = make_stages(Checkpointer(folder, "run_1"), input_path, calls)
+    assert calls == ["read", "scale"]
+
+    manifest = json.loads(open(os.path.join(folder, MANIFEST_FILENAME)).read())
+    assert list(manifest["stages"]) == [
+        "preprocessing.read",
+        "preprocessing.scale",
+    ]
+
+    calls = []
+    resumed = make_stages(Checkpointer(folder, "run_1"), input_path, calls)
+    assert calls == []
+    pdt.assert_frame_equal(resumed, first)
+
+    calls = []
+    changed = make_stages(
+        Checkpointer(folder, "run_1"), input_path, calls, multiplier=3
+    )
+    assert calls == ["scale"]
+    assert changed["value"].tolist() == [3, 6]
+
+
+def test_checkpointer_reruns_after_input_file_changes(tmp_path):
+    """Test a changed input file runs its stage and every later stage."""
+    input_path = str(tmp_path / "input.csv")
+    pd.DataFrame({"lsoa_code": ["E1"], "value": [1]}).to_csv(
+        input_path, index=False
+    )
+    folder = str(tmp_path / "run_1")
+    make_stages(Checkpointer(folder, "run_1"), input_path, [])
+
+    pd.DataFrame({"lsoa_code": ["E1", "E2"], "value": [1, 5]}).to_csv(
+        input_path, index=False
+    )
+    calls = []
+    df = make_stages(Checkpointer(folder, "run_1"), input_path, calls)
+
+    assert calls == ["read", "scale"]
+    assert df["value"].tolist() == [2, 10]
+
+
+def test_checkpointer_reruns_unreadable_checkpoint(tmp_path):
+    """Test a corrupt checkpoint file is replaced by running the stage."""
+    input_path = str(tmp_path / "input.csv")
+    pd.DataFrame({"lsoa_code": ["E1"], "value": [1]}).to_csv(
+        input_path, index=False
+    )
+    folder = str(tmp_path / "run_1")
+    make_stages(Checkpointer(folder, "run_1"), input_path, [])
+
+    with open(os.path.join(folder, "preprocessing.scale.pkl"), "wb") as file:
+        file.write(b"not a pickle")
+    calls = []
+    df = make_stages(Checkpointer(folder, "run_1"), input_path, calls)
+
+    assert calls == ["scale"]
+    assert df["value"].tolist() == [2]
+
+
+def test_checkpointer_disabled(tmp_path):
+    """Test a disabled checkpointer runs every stage and saves nothing."""
+    input_path = str(tmp_path / "input.csv")
+    pd.DataFrame({"lsoa_code": ["E1"], "value": [1]}).to_csv(
+        input_path, index=False
+    )
+
+    calls = []
+    make_stages(Checkpointer(enabled=False), input_path, calls)
+    make_stages(Checkpointer(enabled=False), input_path, calls)
+
+    assert calls == ["read", "scale", "read", "scale"]
+    assert sorted(os.listdir(tmp_path)) == ["input.csv"]
+
+
+def write_input(tmp_path) -> str:
+    """Write a small input file and return its path."""
+    input_path = str(tmp_path / "input.csv")
+    pd.DataFrame({"lsoa_code": ["E1", "E2"], "value": [1, 2]}).to_csv(
+        input_path, index=False
+    )
+    return input_path
+
+
+def test_cache_is_shared_between_runs(tmp_path):
+    """Test a new run with unchanged inputs loads every stage from cache."""
+    input_path = write_input(tmp_path)
+    cache = StageCache(str(tmp_path / "cache"))
+
+    calls = []
+    first = make_stages(
+        Checkpointer(str(tmp_path / "run_1"), "run_1", cache=cache),
+        input_path,
+        calls,
+    )
+    assert calls == ["read", "scale"]
+
+    # Rewriting the same contents changes the modified time only
+    pd.read_csv(input_path).to_csv(input_path, index=False)
+    calls = []
+    second = make_stages(
+        Checkpointer(enabled=False, cache=cache), input_path, calls
+    )
+    assert calls == []
+    pd.testing.assert_frame_equal(second, first)
+
+    calls = []
+    make_stages(
+        Checkpointer(enabled=False, cache=cache),
+        input_path,
+        calls,
+        multiplier=3,
+    )
+    assert calls == ["scale"]
+
+
+def test_cache_misses_after_code_change(tmp_path, monkeypatch):
+    """Test outputs cached by other code are not reused."""
+    input_path = write_input(tmp_path)
+    cache = StageCache(str(tmp_path / "cache"))
+    make_stages(Checkpointer(enabled=False, cache=cache), input_path, [])
+
+    monkeypatch.setattr(checkpoint, "code_fingerprint", lambda: "changed")
+    calls = []
+    make_stages(Checkpointer(enabled=False, cache=cache), input_path, calls)
+
+    assert calls == ["read", "scale"]
@@ -0,0 +1,95 @@
+"""Unit tests for loading, overriding and validating the config."""
+import pytest
+
+from gdhi_adj.adjustment.calc_adjustment import (
+    APPORTION_STRATEGIES,
+    EDGE_POLICIES,
+)
+from gdhi_adj.utils.config import (
+    SETTING_CHOICES,
+    apply_overrides,
+    load_toml_config,
+    parse_override,
+    validate_config,
+)
+
+
+@pytest.fixture
+def config() -> dict:
+    """The repo's config."""
+    return load_toml_config("config/config.toml")
+
+
+def test_parse_override():
+    """Test overrides are read as TOML values, in user_settings by default."""
+    assert parse_override("start_year=2012") == (
+        "user_settings",
+        "start_year",
+        2012,
+    )
+    assert parse_override("global.platform = \"shared\"") == (
+        "global",
+        "platform",
+        "shared",
+    )
+    assert parse_override("user_settings.adjustment=true")[2] is True
+    assert parse_override("edge_policy=skip")[2] == "skip"
+
+    with pytest.raises(ValueError, match="key=value"):
+        parse_override("start_year")
+
+
+def test_apply_overrides(config):
+    """Test overrides change the config and unknown sections are rejected."""
+    apply_overrides(config, ["start_year=2012", "global.platform=shared"])
+
+    assert config["user_settings"]["start_year"] == 2012
+    assert config["global"]["platform"] == "shared"
+
+    with pytest.raises(ValueError, match="not_a_section"):
+        apply_overrides(config, ["not_a_section.setting=1"])
+
+
+def test_validate_config_repo_config(config):
+    """Test the repo's config is valid."""
+    assert validate_config(config) == []
+
+
+@pytest.mark.parametrize(
+    "overrides, error",
+    [
+        (["start_year=\"2010\""], "start_year should be a int"),
+        (["edge_policy=\"nearest\""], "edge_policy should be one of"),
+        (["batch_workers=0"], "batch_workers should be at least 1"),
+        (["start_year=2024"], "start_year (2024) is after end_year"),
+        (["iqr_lower_quantile=0.9"], "iqr_lower_quantile"),
+        (["pipeline_settings.schema_path=\"missing/\""], "does not exist"),
+    ],
+)
+def test_validate_config_errors(config, overrides, error):
+    """Test invalid settings are reported."""
+    errors = validate_config(apply_overrides(config, overrides))
+
+    assert errors
+    assert all(error in message for message in errors)
+
+
+def test_validate_config_missing(config):
+    """Test missing settings and sections are reported."""
+    del config["user_settings"]["end_year"]
+    assert validate_config(config) == ["user_settings.end_year is not set."]
+
+    config["user_settings"]["end_year"] = 2023
+    del config["adjustment_shared_settings"]
+    config["user_settings"]["adjustment"] = True
+    assert validate_config(config) == [
+        "Section [adjustment_shared_settings] is missing."
+    ]
+
+
+def test_setting_choices_match_adjustment():
+    """Test the allowed adjustment settings match the adjustment code."""
+    assert SETTING_CHOICES["user_settings.edge_policy"] == EDGE_POLICIES
+    assert set(SETTING_CHOICES["user_settings.apportion_strategy"]) == set(
+        APPORTION_STRATEGIES
+    )
@@ -0,0 +1,148 @@
+"""Unit tests for the compact dtypes of the memory budget mode."""
+import logging
+
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from gdhi_adj.api import preprocess
+from gdhi_adj.utils.config import load_toml_config
+from gdhi_adj.utils.dtypes import compact_dtypes, expand_dtypes
+from gdhi_adj.utils.helpers import read_with_schema
+from gdhi_adj.utils.stage_recorder import frame_stats
+from gdhi_adj.utils.synthetic_data import (
+    TRANSACTIONS,
+    generate_dataset,
+    write_dataset,
+)
+
+SCHEMA_PATH = "config/schemas/"
+
+
+@pytest.fixture
+def long_df() -> pd.DataFrame:
+    """Long DataFrame with the kinds of columns of the interim data."""
+    return pd.DataFrame(
+        {
+            "lsoa_code": ["E01", "E01", "E02", "E02"],
+            "lad_code": ["E06", "E06", "E06", "E06"],
+            "year": [2010, 2011, 2010, 2011],
+            "uncon_gdhi": [10.123456789, 11.0, 12.0, 13.0],
+            "bkwd_zscore": [0.123456789, -3.5, 1.0, np.nan],
+            "bkwd_zscore_threshold": [None, "lower", "upper", None],
+            "z_bkwd_flag": np.array([False, True, True, False], dtype=object),
+        }
+    )
+
+
+def test_compact_dtypes(long_df):
+    """Test compact_dtypes narrows each kind of column and only narrows
+    scores to float32 if asked."""
+    result = compact_dtypes(long_df)
+
+    assert isinstance(result["lsoa_code"].dtype, pd.CategoricalDtype)
+    assert isinstance(result["lad_code"].dtype, pd.CategoricalDtype)
+    assert result["year"].dtype == "int16"
+    assert result["bkwd_zscore_threshold"].tolist() == [0, 2, 1, 0]
+    assert result["bkwd_zscore_threshold"].dtype == "int8"
+    assert result["z_bkwd_flag"].dtype == bool
+    assert result["bkwd_zscore"].dtype == "float64"
+    assert (
+        frame_stats(result, deep=True)[1]
+        < frame_stats(long_df, deep=True)[1]
+    )
+
+    result = compact_dtypes(long_df, float32_scores=True)
+    assert result["bkwd_zscore"].dtype == "float32"
+    assert result["uncon_gdhi"].dtype == "float64"
+
+
+def test_compact_dtypes_logs_sizes_only_at_debug(long_df, caplog):
+    """Test the sizes before and after are only measured and logged at
+    DEBUG level."""
+    caplog.set_level(logging.INFO, logger="gdhi_adj.utils.dtypes")
+    compact_dtypes(long_df)
+    assert "Compacted" not in caplog.text
+
+    caplog.set_level(logging.DEBUG, logger="gdhi_adj.utils.dtypes")
+    compact_dtypes(long_df)
+    assert "Compacted from" in caplog.text
+
+
+def test_compact_dtypes_keeps_flags_with_missing_values(long_df):
+    """Test flag columns with missing values are not made bool, as missing
+    values would become True."""
+    long_df["z_bkwd_flag"] = [True, None, False, False]
+
+    result = compact_dtypes(long_df)
+
+    assert result["z_bkwd_flag"].dtype == object
+
+
+def test_expand_dtypes_round_trip(long_df):
+    """Test expand_dtypes restores a compacted DataFrame, and neither
+    function changes its input."""
+    expected = long_df.copy()
+    expected["z_bkwd_flag"] = expected["z_bkwd_flag"].astype(bool)
+    before = long_df.copy()
+
+    compact = compact_dtypes(long_df)
+    compact_before = compact.copy()
+    result = expand_dtypes(compact)
+
+    pdt.assert_frame_equal(result, expected)
+    pdt.assert_frame_equal(long_df, before)
+    pdt.assert_frame_equal(compact, compact_before)
+
+
+def test_memory_budget_matches_full_dtypes(tmp_path):
+    """Test preprocessing with compact dtypes flags the same LSOAs and gives
+    the same outputs, with float32 scores within tolerance."""
+    dataset = generate_dataset(
+        n_lads=4, lsoas_per_lad=15, outlier_rate=0.1, seed=3
+    )
+    paths = write_dataset(dataset, str(tmp_path))
+    frames = {
+        "unconstrained": read_with_schema(
+            paths["unconstrained"], SCHEMA_PATH + "input_gdhi_schema.toml"
+        ),
+        "ra_lad": read_with_schema(
+            paths["regional_accounts"],
+            SCHEMA_PATH + "input_ra_lad_schema.toml",
+        ),
+    }
+    settings = {
+        **load_toml_config("config/config.toml")["user_settings"],
+        "transaction_name": TRANSACTIONS[0][1],
+    }
+
+    expected = preprocess(frames, settings)
+    for float32_scores in (False, True):
+        result = preprocess(
+            frames,
+            {
+                **settings,
+                "memory_budget": True,
+                "float32_scores": float32_scores,
+            },
+        )
+
+        pdt.assert_frame_equal(result["constrained"], expected["constrained"])
+        pdt.assert_frame_equal(result["output"], expected["output"])
+
+        interim = expand_dtypes(result["interim"])
+        flag_cols = [col for col in interim.columns if col.endswith("_flag")]
+        pdt.assert_frame_equal(
+            interim[flag_cols], expected["interim"][flag_cols]
+        )
+        pdt.assert_frame_equal(
+            interim,
+            expected["interim"],
+            check_dtype=not float32_scores,
+            rtol=1e-6,
+        )
+        assert (
+            frame_stats(result["interim"], deep=True)[1]
+            < frame_stats(expected["interim"], deep=True)[1]
+        )
@@ -108,6 +108,17 @@ def test_rename_columns(input_data, test_schema, expout_data):
         renamed_df["Old col name"]
 
 
+def test_rename_columns_logs_one_line(input_data, test_schema, caplog):
+    """Test the renamed columns of a frame are logged on one line."""
+    with caplog.at_level("INFO", logger=__name__):
+        rename_columns(input_data, toml.loads(test_schema), logger)
+
+    assert caplog.messages == [
+        "Renamed 2 columns: 'Old col name' to 'new_col_name', "
+        "'LSOA code' to 'lsoa_code'"
+    ]
+
+
 # def test_rename_columns_missing_col(input_data, test_schema_wrong_col):
 #     """Test renaming columns when the columns in data do not match schema."""
 #     with pytest.raises(
@@ -0,0 +1,64 @@
+"""Unit tests for the logging set up."""
+import json
+import logging
+import logging.handlers
+
+from gdhi_adj.utils.logger import (
+    GDHI_adj_logger,
+    configure_logging,
+    log_stage,
+    set_run_id,
+)
+
+
+def queue_handlers() -> list:
+    """Queue handlers on the root logger."""
+    return [
+        handler
+        for handler in logging.getLogger().handlers
+        if isinstance(handler, logging.handlers.QueueHandler)
+    ]
+
+
+def test_loggers_share_one_handler():
+    """Test creating loggers does not add or remove handlers."""
+    GDHI_adj_logger("first")
+    handlers = queue_handlers()
+
+    logger = GDHI_adj_logger("second").logger
+
+    assert queue_handlers() == handlers
+    assert len(handlers) == 1
+    assert logger.name == "second"
+    assert logger.handlers == []
+
+
+def test_json_log_has_run_and_stage(tmp_path):
+    """Test the JSON-lines log records the run ID, stage and elapsed time."""
+    path = tmp_path / "run_1_log.jsonl"
+    logger = GDHI_adj_logger(__name__).logger
+
+    configure_logging(str(path))
+    try:
+        set_run_id("run_1")
+        logger.info("before stage")
+        with log_stage("preprocessing.pivot_long"):
+            logger.warning("in stage")
+    finally:
+        # Replacing the handlers writes out the queued records
+        configure_logging()
+        set_run_id(None)
+
+    records = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [record["message"] for record in records] == [
+        "before stage",
+        "in stage",
+    ]
+    assert [record["stage"] for record in records] == [
+        None,
+        "preprocessing.pivot_long",
+    ]
+    assert records[1]["level"] == "WARNING"
+    assert all(record["run_id"] == "run_1" for record in records)
+    assert all(record["elapsed_s"] >= 0 for record in records)
+    assert len(queue_handlers()) == 1
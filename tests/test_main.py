@@ -0,0 +1,57 @@
+"""Unit tests for the command line entry point."""
+import subprocess
+import sys
+
+import pytest
+
+from gdhi_adj.__main__ import main
+
+# Modules the entry point should only import for commands that use them
+HEAVY_MODULES = ["pandas", "numpy", "gdhi_adj.pipeline"]
+
+
+def test_validate_config(capsys):
+    """Test validate-config reports a valid config and exits zero."""
+    assert main(["validate-config"]) == 0
+    assert "is valid" in capsys.readouterr().out
+
+
+def test_validate_config_invalid(capsys):
+    """Test invalid overrides are reported and exit non-zero."""
+    assert main(["validate-config", "--set", "edge_policy=nearest"]) == 1
+    assert "edge_policy should be one of" in capsys.readouterr().err
+
+    assert main(["validate-config", "--config", "missing.toml"]) == 1
+    assert "Could not load config" in capsys.readouterr().err
+
+
+def test_bench_help(capsys):
+    """Test bench arguments are passed to the benchmark command line."""
+    with pytest.raises(SystemExit):
+        main(["bench", "--help"])
+    assert "gdhi_adj.bench" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize(
+    "args", [["--help"], ["--version"], ["validate-config"]]
+)
+def test_startup_is_light(args):
+    """Test the entry point starts without importing pandas, NumPy or the
+    pipeline."""
+    script = (
+        "import sys\n"
+        "from gdhi_adj.__main__ import main\n"
+        "try:\n"
+        f"    main({args!r})\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        f"print([name for name in {HEAVY_MODULES!r} if name in sys.modules])\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    assert result.stdout.splitlines()[-1] == "[]"
@@ -0,0 +1,101 @@
+"""Unit tests for running the whole pipeline."""
+import os
+import sqlite3
+
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from gdhi_adj.pipeline import run_pipeline
+from gdhi_adj.utils.runlog import RunLog
+from gdhi_adj.utils.synthetic_data import (
+    TRANSACTIONS,
+    generate_dataset,
+    write_dataset,
+)
+
+
+@pytest.fixture
+def overrides(tmp_path) -> list:
+    """Overrides of the default config to run on synthetic data in
+    tmp_path."""
+    dataset = generate_dataset(
+        n_lads=3, lsoas_per_lad=10, outlier_rate=0.1, seed=4
+    )
+    write_dataset(dataset, str(tmp_path / "data"))
+    for folder in ["pre", "adj"]:
+        os.makedirs(tmp_path / folder)
+
+    return [
+        f'user_dir="{tmp_path}"',
+        'local_or_shared="local"',
+        "preprocessing=true",
+        "adjustment=true",
+        "use_cache=false",
+        "save_checkpoints=true",
+        f'transaction_name="{TRANSACTIONS[0][1]}"',
+        'global.platform="local"',
+        f'local_paths.logs_foldername="{tmp_path / "logs"}"',
+        'preprocessing_local_settings.input_dir="/data/"',
+        'preprocessing_local_settings.input_unconstrained_file_path='
+        '"synthetic_unconstrained.csv"',
+        'preprocessing_local_settings.input_ra_lad_file_path='
+        '"synthetic_regional_accounts.csv"',
+        'preprocessing_local_settings.output_dir="/pre/"',
+        'adjustment_local_settings.input_adj_file_path='
+        '"/data/synthetic_analyst.csv"',
+        'adjustment_local_settings.input_constrained_file_path='
+        '"/data/synthetic_constrained.csv"',
+        'adjustment_local_settings.input_unconstrained_file_path='
+        '"/data/synthetic_unconstrained.csv"',
+        'adjustment_local_settings.output_dir="/adj/"',
+    ]
+
+
+def test_chained_run_matches_run_through_files(tmp_path, overrides):
+    """Test adjusting the unconstrained data passed on from preprocessing
+    gives the same output as reading it from file, without reading the
+    file."""
+    output_path = tmp_path / "adj" / "test_gdhi_manual_adj_adjusted_output.csv"
+
+    assert run_pipeline("config/config.toml", overrides=overrides) == (
+        "completed"
+    )
+    expected = pd.read_csv(output_path)
+    os.remove(output_path)
+    for filename in os.listdir(tmp_path / "pre"):
+        os.remove(tmp_path / "pre" / filename)
+
+    assert (
+        run_pipeline(
+            "config/config.toml",
+            overrides=overrides
+            + [
+                "chain_adjustment=true",
+                "save_preprocessing_outputs=false",
+                # Would fail if adjustment read its unconstrained file
+                "adjustment_local_settings.input_unconstrained_file_path="
+                '"/data/missing.csv"',
+            ],
+        )
+        == "completed"
+    )
+
+    pdt.assert_frame_equal(pd.read_csv(output_path), expected)
+    assert os.listdir(tmp_path / "pre") == []
+
+
+def test_unsaved_metrics_do_not_fail_run(tmp_path, overrides, monkeypatch):
+    """Test a run whose metrics cannot be saved still completes."""
+
+    def locked(*args):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(RunLog, "save_run_metrics", locked)
+
+    assert (
+        run_pipeline(
+            "config/config.toml", overrides=overrides + ["adjustment=false"]
+        )
+        == "completed"
+    )
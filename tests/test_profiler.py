@@ -0,0 +1,63 @@
+"""Unit tests for the stage profiler."""
+import os
+import pstats
+import tracemalloc
+
+import pandas as pd
+import pytest
+
+from gdhi_adj.utils.profiler import StageProfiler
+from gdhi_adj.utils.stage_recorder import StageRecorder
+
+
+def test_profiled_stages_write_reports(tmp_path):
+    """Test profiles are named by run ID and stage, including failed ones."""
+    profiler = StageProfiler(str(tmp_path), "run_1", cpu=True, memory=True)
+    recorder = StageRecorder("run_1", profiler=profiler)
+
+    with recorder.in_section("preprocessing"):
+        with recorder.stage("pivot_long") as stage:
+            df = pd.DataFrame({"value": range(100_000)})
+            df = df.assign(double=df["value"] * 2)
+            stage.output(df)
+
+        with pytest.raises(ValueError):
+            with recorder.stage("fail"):
+                raise ValueError("failed stage")
+
+    assert sorted(os.listdir(tmp_path)) == [
+        "run_1_preprocessing.fail.prof",
+        "run_1_preprocessing.fail_alloc.txt",
+        "run_1_preprocessing.pivot_long.prof",
+        "run_1_preprocessing.pivot_long_alloc.txt",
+    ]
+    assert [stage["status"] for stage in recorder.stages] == [
+        "completed",
+        "failed",
+    ]
+
+    stats = pstats.Stats(str(tmp_path / "run_1_preprocessing.pivot_long.prof"))
+    assert stats.total_calls > 0
+
+    report_path = tmp_path / "run_1_preprocessing.pivot_long_alloc.txt"
+    report = report_path.read_text()
+    assert report.startswith("Peak traced memory of preprocessing.pivot_long")
+    # The frame held at the end of the stage is the largest allocation
+    assert "pandas" in report.splitlines()[2]
+    assert "cProfile.py" not in report
+    assert not tracemalloc.is_tracing()
+
+
+def test_profiler_keeps_existing_tracing(tmp_path):
+    """Test tracemalloc is left running if it was started before a stage."""
+    profiler = StageProfiler(str(tmp_path), "run_1", cpu=False, memory=True)
+
+    tracemalloc.start()
+    try:
+        with profiler.profile("stage"):
+            [0] * 1000
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+
+    assert profiler.files == [str(tmp_path / "run_1_stage_alloc.txt")]
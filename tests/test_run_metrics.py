@@ -0,0 +1,112 @@
+"""Unit tests for the run metrics store."""
+import sqlite3
+from contextlib import closing
+
+import pytest
+
+from gdhi_adj.utils.run_metrics import RunMetricsStore
+
+
+def make_report(run_id, started, wall_s, rows=10, size_bytes=100):
+    """Run report with one input file and two stages."""
+    stage = {
+        "section": "preprocessing",
+        "status": "completed",
+        "cpu_s": wall_s,
+        "rows_in": rows,
+        "rows_out": rows,
+        "memory_in_mb": 1.0,
+        "memory_out_mb": 1.0,
+        "process_peak_rss_mb": 50.0,
+        "peak_rss_increase_mb": 5.0,
+    }
+    return {
+        "run_id": run_id,
+        "started": started,
+        "total_wall_s": 2 * wall_s,
+        "peak_rss_mb": 50.0,
+        "inputs": [
+            {
+                "section": "preprocessing",
+                "path": "uncon.csv",
+                "size_bytes": size_bytes,
+            }
+        ],
+        "stages": [
+            {**stage, "stage": "read_inputs", "wall_s": wall_s},
+            {**stage, "stage": "pivot_long", "wall_s": wall_s},
+        ],
+    }
+
+
+def test_run_metrics_store_trends(tmp_path):
+    """Test runs are saved and stage durations compared across runs."""
+    store = RunMetricsStore(str(tmp_path / "run_metrics.db"))
+    store.save_run(
+        make_report("run_1", "2025-01-01T09:00:00", 1.0),
+        "hash_1",
+        "completed",
+        vintage="2023",
+    )
+    store.save_run(
+        make_report("run_2", "2025-01-02T09:00:00", 3.0, size_bytes=300),
+        "hash_1",
+        "completed",
+        vintage="2024",
+    )
+
+    history = store.run_history()
+    assert history["run_id"].tolist() == ["run_1", "run_2"]
+    assert history["input_bytes"].tolist() == [100, 300]
+    assert store.run_history(vintage="2024")["run_id"].tolist() == ["run_2"]
+
+    trends = store.stage_trends(stage="pivot_long")
+    assert trends["run_id"].tolist() == ["run_1", "run_2"]
+    assert trends["wall_s"].tolist() == [1.0, 3.0]
+    assert trends["wall_s_change"].iloc[1] == pytest.approx(2.0)
+
+    summary = store.vintage_summary()
+    assert len(summary) == 4
+    assert summary.loc[
+        summary["vintage"] == "2024", "median_wall_s"
+    ].tolist() == [3.0, 3.0]
+
+
+def test_run_metrics_store_replaces_resumed_run(tmp_path):
+    """Test saving a run again replaces its previous metrics."""
+    store = RunMetricsStore(str(tmp_path / "run_metrics.db"))
+    report = make_report("run_1", "2025-01-01T09:00:00", 1.0)
+    store.save_run(report, "hash_1", "failed", error="apportion failed")
+    store.save_run(report, "hash_1", "completed")
+
+    history = store.run_history()
+    assert history["outcome"].tolist() == ["completed"]
+    assert history["input_bytes"].tolist() == [100]
+    assert len(store.stage_trends()) == 2
+
+
+def test_run_metrics_store_migrates_stages(tmp_path):
+    """Test a stages table with the per-stage peak_rss_mb of an earlier
+    version is renamed and extended, keeping its rows."""
+    path = str(tmp_path / "run_metrics.db")
+    with closing(sqlite3.connect(path)) as connection, connection:
+        connection.execute(
+            "CREATE TABLE stages (run_id TEXT, section TEXT, stage TEXT,"
+            " status TEXT, wall_s REAL, cpu_s REAL, rows_in INTEGER,"
+            " rows_out INTEGER, memory_in_mb REAL, memory_out_mb REAL,"
+            " peak_rss_mb REAL)"
+        )
+        connection.execute(
+            "INSERT INTO stages VALUES"
+            " ('run_0', NULL, 'read', 'completed', 1, 1, 1, 1, 1, 1, 40)"
+        )
+
+    store = RunMetricsStore(path)
+    store.save_run(
+        make_report("run_1", "2025-01-01T09:00:00", 1.0), "hash_1", "completed"
+    )
+
+    stages = store.query("SELECT * FROM stages ORDER BY run_id")
+    assert stages["process_peak_rss_mb"].tolist() == [40.0, 50.0, 50.0]
+    assert stages["peak_rss_increase_mb"].tolist()[1:] == [5.0, 5.0]
+    assert "peak_rss_mb" not in stages.columns
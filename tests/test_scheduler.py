@@ -0,0 +1,68 @@
+"""Unit tests for the stage scheduler."""
+import time
+
+import pytest
+
+from gdhi_adj.utils.scheduler import run_stages
+
+
+def wait_and_return(value, seconds: float = 0.0, **inputs):
+    """Sleep, then return value with the results of any dependencies."""
+    time.sleep(seconds)
+    return [value] + [item for dep in inputs.values() for item in dep]
+
+
+def test_run_stages_passes_results_to_dependents():
+    """Test each stage gets the results of the stages it depends on."""
+    stages = {
+        "a": (wait_and_return, {"value": "a"}, []),
+        "b": (wait_and_return, {"value": "b"}, []),
+        "c": (wait_and_return, {"value": "c"}, ["a", "b"]),
+    }
+
+    results, report = run_stages(stages)
+
+    assert results["c"] == ["c", "a", "b"]
+    assert report["stage"].tolist() == ["a", "b", "c"]
+    assert report["depends_on"].tolist() == ["", "", "a,b"]
+
+
+def test_run_stages_concurrently():
+    """Test independent stages overlap on threads and the critical path
+    follows the slowest chain."""
+    stages = {
+        "slow": (wait_and_return, {"value": "slow", "seconds": 0.3}, []),
+        "fast": (wait_and_return, {"value": "fast", "seconds": 0.1}, []),
+        "join": (wait_and_return, {"value": "join"}, ["slow", "fast"]),
+    }
+
+    _, report = run_stages(stages, max_workers=2)
+
+    times = report.set_index("stage")
+    assert times.loc["fast", "start"] < times.loc["slow", "end"]
+    assert times.loc["slow", "start"] < times.loc["fast", "end"]
+    assert times.loc["join", "start"] >= times.loc["slow", "end"]
+    assert report.set_index("stage")["critical_path"].to_dict() == {
+        "slow": True,
+        "fast": False,
+        "join": True,
+    }
+
+
+def test_run_stages_unknown_dependency():
+    """Test a dependency on a stage that does not exist raises."""
+    stages = {"a": (wait_and_return, {"value": "a"}, ["missing"])}
+
+    with pytest.raises(ValueError, match="depends on unknown stage"):
+        run_stages(stages)
+
+
+def test_run_stages_cycle():
+    """Test stages that depend on each other raise instead of waiting."""
+    stages = {
+        "a": (wait_and_return, {"value": "a"}, ["b"]),
+        "b": (wait_and_return, {"value": "b"}, ["a"]),
+    }
+
+    with pytest.raises(ValueError, match="cycle"):
+        run_stages(stages, max_workers=2)
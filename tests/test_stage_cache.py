@@ -0,0 +1,33 @@
+"""Unit tests for the stage output cache."""
+import os
+
+from gdhi_adj.utils.stage_cache import StageCache
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    """Test the oldest unused outputs are removed beyond the size limit."""
+    folder = tmp_path / "cache"
+    cache = StageCache(str(folder), max_bytes=2500)
+    for i, key in enumerate(["a", "b"]):
+        cache.put(key, b"x" * 1000)
+        os.utime(folder / f"{key}.pkl", (i, i))
+
+    # Using "a" makes "b" the least recently used
+    assert cache.get("a") == (True, b"x" * 1000)
+    cache.put("c", b"x" * 1000)
+
+    assert sorted(os.listdir(folder)) == ["a.pkl", "c.pkl"]
+    assert cache.get("b") == (False, None)
+
+
+def test_cache_copies_source_file(tmp_path):
+    """Test an output saved elsewhere is copied rather than linked, so
+    evicting it frees its space."""
+    source = tmp_path / "checkpoint.pkl"
+    source.write_bytes(b"saved output")
+    cache = StageCache(str(tmp_path / "cache"))
+
+    cache.put("a", None, source_path=str(source))
+
+    assert os.stat(source).st_nlink == 1
+    assert (tmp_path / "cache" / "a.pkl").read_bytes() == b"saved output"
@@ -0,0 +1,65 @@
+"""Unit tests for the stage recorder."""
+import json
+
+import pandas as pd
+import pytest
+
+from gdhi_adj.utils.stage_recorder import StageRecorder
+
+
+def test_stage_recorder_records_stages(tmp_path):
+    """Test rows, status and section of each stage are recorded and saved."""
+    recorder = StageRecorder("run_1")
+    df = pd.DataFrame({"lsoa_code": ["E1", "E2", "E3"], "value": [1, 2, 3]})
+
+    with recorder.in_section("preprocessing"):
+        with recorder.stage("filter", df) as stage:
+            df = df[df["value"] > 1]
+            stage.output(df)
+
+    with pytest.raises(ValueError):
+        with recorder.stage("fail", df):
+            raise ValueError("failed stage")
+
+    summary = recorder.summary()
+    assert summary["stage"].tolist() == ["filter", "fail"]
+    assert summary["section"].tolist() == ["preprocessing", None]
+    assert summary["status"].tolist() == ["completed", "failed"]
+    assert summary["rows_in"].tolist() == [3, 2]
+    assert summary["rows_out"][0] == 2
+    assert (summary["wall_s"] >= 0).all()
+    assert summary["memory_out_mb"][0] > 0
+    assert (summary["process_peak_rss_mb"] > 0).all()
+    assert (summary["peak_rss_increase_mb"] >= 0).all()
+
+    path = tmp_path / "run_1_run_report.json"
+    recorder.save_report(str(path))
+    report = json.loads(path.read_text())
+    assert report["run_id"] == "run_1"
+    assert [stage["stage"] for stage in report["stages"]] == [
+        "filter",
+        "fail",
+    ]
+
+
+def test_stage_recorder_disabled():
+    """Test a disabled recorder runs stages without recording them."""
+    recorder = StageRecorder(enabled=False)
+
+    with recorder.stage("filter", pd.DataFrame({"a": [1]})) as stage:
+        stage.output(pd.DataFrame({"a": [1]}))
+
+    assert recorder.stages == []
+
+
+def test_stage_recorder_deep_memory():
+    """Test string contents are only measured with deep_memory."""
+    df = pd.DataFrame({"lsoa_code": ["E01000001"] * 1000})
+    memory_out = []
+    for deep_memory in (False, True):
+        recorder = StageRecorder(deep_memory=deep_memory)
+        with recorder.stage("copy", df) as stage:
+            stage.output(df)
+        memory_out.append(recorder.stages[0]["memory_out_mb"])
+
+    assert memory_out[0] < memory_out[1]
@@ -0,0 +1,137 @@
+"""Unit tests for the synthetic data generator."""
+import pandas as pd
+
+from gdhi_adj.adjustment.filter_adjustment import filter_component
+from gdhi_adj.adjustment.run_adjustment import (
+    adjust_component,
+    prepare_analyst_data,
+)
+from gdhi_adj.preprocess.calc_preprocess import calc_rate_of_change
+from gdhi_adj.preprocess.flag_preprocess import flag_rollback_years
+from gdhi_adj.preprocess.pivot_preprocess import pivot_years_long_dataframe
+from gdhi_adj.utils.helpers import read_with_schema
+from gdhi_adj.utils.synthetic_data import generate_dataset, write_dataset
+
+SCHEMA_PATH = "config/schemas/"
+
+
+def test_generate_dataset_shapes_and_truth():
+    """Test the generated tables have the requested scale and truth."""
+    dataset = generate_dataset(
+        n_lads=4,
+        lsoas_per_lad=25,
+        start_year=2010,
+        end_year=2020,
+        n_components=3,
+        outlier_rate=0.05,
+        rollback_rate=0.04,
+        seed=1,
+    )
+
+    unconstrained = dataset["unconstrained"]
+    assert len(unconstrained) == 100
+    assert unconstrained["lad_code"].nunique() == 4
+    assert [col for col in unconstrained.columns if col[0].isdigit()] == [
+        str(year) for year in range(2010, 2021)
+    ]
+
+    constrained = dataset["constrained"]
+    assert len(constrained) == 300
+    assert (
+        constrained[["sas_code", "cord_code", "credit_debit"]]
+        .drop_duplicates()
+        .shape[0]
+        == 3
+    )
+
+    truth = dataset["truth"]
+    outliers = truth[truth["kind"] == "outlier"]
+    assert len(outliers) == 5
+    for row in outliers.itertuples():
+        value = unconstrained.loc[
+            unconstrained["lsoa_code"] == row.lsoa_code, str(row.year)
+        ].item()
+        assert value == row.injected_value != row.original_value
+
+    rollbacks = truth[truth["kind"] == "rollback"]
+    assert rollbacks["lsoa_code"].nunique() == 4
+    assert sorted(rollbacks["year"].unique()) == list(range(2010, 2015))
+    assert not set(rollbacks["lsoa_code"]) & set(outliers["lsoa_code"])
+
+    regional_accounts = dataset["regional_accounts"]
+    assert len(regional_accounts) == 12
+    assert regional_accounts["2010"].str.contains(",").all()
+
+    analyst = dataset["analyst"]
+    adjusted = analyst[analyst["Adjust"] == "TRUE"]
+    assert sorted(adjusted["LSOA code"]) == sorted(outliers["lsoa_code"])
+
+
+def test_generate_dataset_is_seeded():
+    """Test the same seed generates the same data."""
+    first = generate_dataset(n_lads=2, lsoas_per_lad=5, seed=7)
+    second = generate_dataset(n_lads=2, lsoas_per_lad=5, seed=7)
+
+    for name in first:
+        pd.testing.assert_frame_equal(first[name], second[name])
+
+
+def test_written_dataset_runs_through_pipeline_steps(tmp_path):
+    """Test written files read with the schemas, flag the rollback years
+    and adjust the outliers."""
+    dataset = generate_dataset(
+        n_lads=3, lsoas_per_lad=10, outlier_rate=0.1, seed=2
+    )
+    paths = write_dataset(dataset, str(tmp_path))
+
+    df = read_with_schema(
+        paths["unconstrained"], SCHEMA_PATH + "input_gdhi_schema.toml"
+    )
+    df = pivot_years_long_dataframe(df, "year", "uncon_gdhi")
+    for ascending in [False, True]:
+        df = calc_rate_of_change(
+            df, ascending, ["lsoa_code", "year"], "lsoa_code", "uncon_gdhi"
+        )
+    df = flag_rollback_years(df)
+    truth = dataset["truth"]
+    rollback_lsoas = truth.loc[truth["kind"] == "rollback", "lsoa_code"]
+    assert set(df.loc[df["rollback_flag"], "lsoa_code"]) == set(
+        rollback_lsoas
+    )
+
+    ra_lad = read_with_schema(
+        paths["regional_accounts"], SCHEMA_PATH + "input_ra_lad_schema.toml"
+    )
+    assert {"lad_code", "transaction_name"} <= set(ra_lad.columns)
+
+    df_analyst = prepare_analyst_data(
+        read_with_schema(
+            paths["analyst"], SCHEMA_PATH + "input_adj_schema.toml"
+        ),
+        2010,
+        2023,
+    )
+    outliers = truth[truth["kind"] == "outlier"]
+    assert sorted(df_analyst["lsoa_code"]) == sorted(outliers["lsoa_code"])
+
+    df_constrained = filter_component(
+        read_with_schema(
+            paths["constrained"],
+            SCHEMA_PATH + "input_constrained_schema.toml",
+        ),
+        "G866BTR",
+        "D75",
+        "D",
+    )
+    df_unconstrained = read_with_schema(
+        paths["unconstrained"],
+        SCHEMA_PATH + "input_unconstrained_schema.toml",
+    )
+    result = adjust_component(
+        df_constrained, df_analyst, df_unconstrained, 2010, 2023
+    )
+    assert len(result) == len(df_constrained) * 14
+    assert result["adjusted_con_gdhi"].notna().all()
+    adjusted = result.merge(outliers, on=["lsoa_code", "year"])
+    assert len(adjusted) == len(outliers)
+    assert (adjusted["adjusted_con_gdhi"] != adjusted["con_gdhi"]).all()